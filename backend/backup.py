@@ -0,0 +1,292 @@
+"""Online, compressed database snapshots
+
+Snapshots are copied with SQLite's online backup API from a connection that
+holds one read transaction for the whole copy. In WAL mode that pins a
+consistent view of the database: the copy proceeds in small page steps
+while crawlers keep writing, and their commits never force it to restart.
+The copy is then compressed (zstd when the zstandard package is installed,
+gzip otherwise) into BACKUP_DIR, from where it is served with Range support
+so interrupted downloads can resume.
+
+Restores go the other way: the upload is decompressed next to the live
+database and checked, then connections are drained through the database
+gate and the file is swapped in with one rename.
+"""
+import asyncio
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import database
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Where snapshots are written and served from
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "backups")
+
+# Hours between scheduled snapshots (0 disables them)
+BACKUP_INTERVAL_HOURS = float(os.environ.get("BACKUP_INTERVAL_HOURS", "0"))
+
+# Snapshots of each kind (scheduled, manual) kept before the oldest are deleted
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", "7"))
+
+# Pages copied per backup step; writers are never blocked, readers barely
+BACKUP_STEP_PAGES = 1024
+
+# zstd level: 3 compresses a corpus about 4x at several hundred MB/s
+ZSTD_LEVEL = 3
+
+# Bytes read per compression step
+COMPRESS_CHUNK_BYTES = 1024 * 1024
+
+# Seconds a restore waits for open connections to close before giving up
+RESTORE_DRAIN_TIMEOUT = 60
+
+# Tables a file must have to be restored
+REQUIRED_TABLES = ("batch_tasks", "terms")
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# One snapshot at a time; each holds a read snapshot and a full copy on disk
+_backup_lock = asyncio.Lock()
+
+
+def compressed_suffix() -> str:
+    return ".db.zst" if ZSTD_AVAILABLE else ".db.gz"
+
+
+def _copy_database(target_path: str):
+    """Copy the live database to target_path in page steps from one read snapshot"""
+    source = sqlite3.connect(database.DATABASE_FILE, timeout=database.DB_BUSY_TIMEOUT,
+                             isolation_level=None)
+    target = sqlite3.connect(target_path)
+    try:
+        # Reading inside an explicit transaction pins the WAL snapshot until COMMIT
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=BACKUP_STEP_PAGES, sleep=0.001)
+        source.execute("COMMIT")
+        # A self-contained file: no -wal sidecar needed to open it
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+
+
+def _compress(source_path: str, target_path: str):
+    with open(source_path, "rb") as src:
+        if ZSTD_AVAILABLE:
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+            with open(target_path, "wb") as out:
+                compressor.copy_stream(src, out, size=os.path.getsize(source_path),
+                                       read_size=COMPRESS_CHUNK_BYTES, write_size=COMPRESS_CHUNK_BYTES)
+        else:
+            with gzip.open(target_path, "wb", compresslevel=6) as out:
+                shutil.copyfileobj(src, out, COMPRESS_CHUNK_BYTES)
+
+
+def _take_snapshot(kind: str) -> Dict:
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    name = f"corpus-{kind}-{datetime.now().strftime('%Y%m%d-%H%M%S')}{compressed_suffix()}"
+    path = os.path.join(BACKUP_DIR, name)
+    raw_path = path + ".copy"
+    partial_path = path + ".partial"
+    started = time.perf_counter()
+    try:
+        _copy_database(raw_path)
+        raw_size = os.path.getsize(raw_path)
+        _compress(raw_path, partial_path)
+        os.replace(partial_path, path)
+    finally:
+        for leftover in (raw_path, partial_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return {**_describe(name), "database_size": raw_size,
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+def _describe(name: str) -> Dict:
+    stat = os.stat(os.path.join(BACKUP_DIR, name))
+    kind = name.split("-")[1] if name.count("-") >= 2 else "manual"
+    return {
+        "name": name,
+        "kind": kind,
+        "size": stat.st_size,
+        "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+    }
+
+
+async def create_backup(kind: str = "manual") -> Dict:
+    """Take a compressed snapshot of the live database; returns its description"""
+    async with _backup_lock, database.db_gate.hold():
+        snapshot = await asyncio.to_thread(_take_snapshot, kind)
+        prune_backups(kind)
+    print(f"✓ Backup {snapshot['name']} written ({snapshot['database_size']} -> "
+          f"{snapshot['size']} bytes, {snapshot['seconds']}s)")
+    return snapshot
+
+
+def list_backups() -> List[Dict]:
+    """Finished snapshots in BACKUP_DIR, newest first"""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    names = [n for n in os.listdir(BACKUP_DIR)
+             if n.startswith("corpus-") and n.endswith((".db.zst", ".db.gz"))]
+    backups = [_describe(name) for name in names]
+    backups.sort(key=lambda b: b["created_at"], reverse=True)
+    return backups
+
+
+def backup_path(name: str) -> Optional[str]:
+    """Path of a finished snapshot, or None for unknown names (no path traversal)"""
+    if name not in {b["name"] for b in list_backups()}:
+        return None
+    return os.path.join(BACKUP_DIR, name)
+
+
+def prune_backups(kind: str, keep: int = None):
+    """Delete all but the newest `keep` snapshots of a kind"""
+    keep = BACKUP_KEEP if keep is None else keep
+    for backup in [b for b in list_backups() if b["kind"] == kind][keep:]:
+        try:
+            os.remove(os.path.join(BACKUP_DIR, backup["name"]))
+        except OSError as e:
+            print(f"✗ Could not delete old backup {backup['name']}: {e}")
+
+
+async def run_backup_scheduler(interval_hours: float = BACKUP_INTERVAL_HOURS):
+    """Take a snapshot every interval_hours, keeping the newest BACKUP_KEEP"""
+    if interval_hours <= 0:
+        return
+    interval = interval_hours * 3600
+    while True:
+        # Count from the newest scheduled snapshot, so restarts don't take extra ones
+        scheduled = [b for b in list_backups() if b["kind"] == "scheduled"]
+        last = os.path.getmtime(os.path.join(BACKUP_DIR, scheduled[0]["name"])) if scheduled else 0
+        await asyncio.sleep(max(0, last + interval - time.time()))
+        try:
+            await create_backup("scheduled")
+        except Exception as e:
+            print(f"✗ Scheduled backup failed: {str(e)}")
+            await asyncio.sleep(min(interval, 600))
+
+
+# ========== Restore ==========
+
+class RestoreError(Exception):
+    """An upload that can't be restored; the message is meant for the user"""
+
+
+def _decompress(upload_path: str, target_path: str):
+    """Write the database contained in an upload (plain, zstd or gzip) to target_path"""
+    with open(upload_path, "rb") as src:
+        magic = src.read(len(SQLITE_MAGIC))
+        src.seek(0)
+        with open(target_path, "wb") as out:
+            if magic.startswith(ZSTD_MAGIC):
+                if not ZSTD_AVAILABLE:
+                    raise RestoreError("This backup is zstd-compressed; install the zstandard package to restore it")
+                zstandard.ZstdDecompressor().copy_stream(src, out, read_size=COMPRESS_CHUNK_BYTES,
+                                                         write_size=COMPRESS_CHUNK_BYTES)
+            elif magic.startswith(GZIP_MAGIC):
+                with gzip.open(src) as unzipped:
+                    shutil.copyfileobj(unzipped, out, COMPRESS_CHUNK_BYTES)
+            elif magic == SQLITE_MAGIC:
+                shutil.copyfileobj(src, out, COMPRESS_CHUNK_BYTES)
+            else:
+                raise RestoreError("File is not a SQLite database or a compressed backup of one")
+
+
+def _validate(path: str) -> Dict:
+    """Check the schema and page structure of a database to restore; returns its counts"""
+    conn = sqlite3.connect(path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        for table in REQUIRED_TABLES:
+            if table not in tables:
+                raise RestoreError(f"Invalid backup file: missing required table '{table}'")
+        problems = [row[0] for row in conn.execute("PRAGMA quick_check(5)")]
+        if problems != ["ok"]:
+            raise RestoreError(f"Backup failed the integrity check: {'; '.join(problems)}")
+        return {
+            "tasks_restored": conn.execute("SELECT COUNT(*) FROM batch_tasks").fetchone()[0],
+            "terms_restored": conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0],
+        }
+    except sqlite3.DatabaseError as e:
+        raise RestoreError(f"Invalid SQLite database: {str(e)}")
+    finally:
+        conn.close()
+
+
+def _swap(staged_path: str) -> str:
+    """Put staged_path in place of the live database; returns where the old one went
+    
+    Runs with no connection of this process open. The old file keeps its
+    inode as corpus_before_restore.db (a hard link, or a rename where links
+    aren't supported), then one rename replaces the live path.
+    """
+    live = database.DATABASE_FILE
+    previous = os.path.join(os.path.dirname(os.path.abspath(live)), "corpus_before_restore.db")
+    if os.path.exists(live):
+        # Fold the WAL into the main file; closing the last connection removes it
+        conn = sqlite3.connect(live)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        if os.path.exists(live + "-wal"):
+            raise RestoreError("The database is still open in another process; stop standalone workers and retry")
+        for path in (previous, previous + "-wal", previous + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        try:
+            os.link(live, previous)
+        except OSError:
+            os.replace(live, previous)
+    os.replace(staged_path, live)
+    return previous
+
+
+async def restore_backup(upload_path: str) -> Dict:
+    """Replace the live database with an uploaded backup
+    
+    The upload is decompressed and validated first, without touching the
+    live database. Then local crawls and ingestions stop, connections drain,
+    the file is swapped and migrated, and interrupted crawls resume from the
+    restored data.
+    """
+    from scheduler import shutdown_crawlers, resume_unfinished_tasks
+    from term_upload import shutdown_ingests
+
+    # Same directory as the live file, so the swap is a rename
+    staged = database.DATABASE_FILE + ".restore"
+    try:
+        await asyncio.to_thread(_decompress, upload_path, staged)
+        counts = await asyncio.to_thread(_validate, staged)
+
+        async with _backup_lock:
+            await shutdown_ingests()
+            await shutdown_crawlers()
+            try:
+                async with database.db_gate.exclusive(RESTORE_DRAIN_TIMEOUT):
+                    previous = await asyncio.to_thread(_swap, staged)
+                    # Backups from older versions get the current schema
+                    await database.init_database()
+            except asyncio.TimeoutError:
+                raise RestoreError("Database connections did not close in time; retry when the server is less busy")
+            finally:
+                await resume_unfinished_tasks()
+    finally:
+        if os.path.exists(staged):
+            os.remove(staged)
+
+    print(f"✓ Database restored ({counts['tasks_restored']} tasks, {counts['terms_restored']} terms)")
+    return {**counts, "previous_backup": previous}
@@ -0,0 +1,69 @@
+"""Helpers shared by the benchmark scripts"""
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Benchmarks import the backend modules directly
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None on Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def write_results(prefix: str, results: list, output: str = None, **meta) -> str:
+    """Save results with environment metadata as JSON; returns the path"""
+    output = output or os.path.join(RESULTS_DIR, f"{prefix}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **meta,
+            "results": results,
+        }, f, indent=2)
+    print(f"✓ Results written to {output}")
+    return output
+
+
+def compare_results(results: list, baseline_path: str, key: str, metric: str,
+                    tolerance: float, higher_is_better: bool) -> bool:
+    """Print metric changes against a baseline; returns False if any regressed beyond tolerance"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r[key]: r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\nCompared with {baseline_path} ({metric}):")
+    for result in results:
+        old = baseline.get(result[key])
+        if not old or not old.get(metric) or result.get(metric) is None:
+            print(f"  {result[key]:<36} (no baseline)")
+            continue
+        change = (result[metric] - old[metric]) / old[metric]
+        regressed = (change < -tolerance) if higher_is_better else (change > tolerance)
+        ok = ok and not regressed
+        print(f"  {result[key]:<36} {old[metric]:>10} -> {result[metric]:<10} "
+              f"{change:+.1%}{'  ✗ REGRESSION' if regressed else ''}")
+    return ok
@@ -0,0 +1,188 @@
+"""End-to-end crawl throughput benchmark against a local fake MediaWiki
+
+Starts benchmarks/fake_wiki.py, runs BatchCrawler tasks of several sizes,
+depths and language counts against it and reports terms/sec, per-term
+latency (p50/p99), time spent in database writes and peak RSS. Each
+scenario runs in a fresh process with its own database.
+
+    python benchmarks/crawl_bench.py
+    python benchmarks/crawl_bench.py --scenario 500:1:en,zh,de --latency 80 --error-rate 0.02
+    python benchmarks/crawl_bench.py --compare benchmarks/results/crawl-20260101-120000.json
+
+A scenario is TERMS:DEPTH:LANGUAGES. Results are written as JSON to
+benchmarks/results/ (or --output) and can be compared against a saved
+baseline; --compare exits with status 1 when throughput drops by more than
+--tolerance.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_utils import peak_rss_mb, percentile, write_results, compare_results
+
+DEFAULT_SCENARIOS = ["100:1:en,zh", "300:1:en,zh,zh-tw,de,fr", "50:2:en,zh"]
+
+# Database functions the crawler writes through; their time is reported as
+# db_write_s (summed over concurrently crawled terms, so it can exceed wall time)
+DB_WRITE_FUNCTIONS = [
+    "update_term_status", "record_term_failure", "save_term_associations",
+    "add_terms_to_task", "update_task_counters", "index_term_signatures"
+]
+
+
+def serve_fake_wiki(port, config):
+    import uvicorn
+    from fake_wiki import FakeWikiConfig, create_app
+    uvicorn.run(create_app(FakeWikiConfig(**config)), host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_fake_wiki(port, config):
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve_fake_wiki, args=(port, config), daemon=True
+    )
+    process.start()
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Fake MediaWiki did not start on port {port}")
+
+
+def run_scenario(spec, env):
+    """Run one scenario in this (fresh) process and return its measurements"""
+    os.environ.update(env)
+    os.chdir(tempfile.mkdtemp(prefix="crawl-bench-"))
+    return asyncio.run(_run_scenario(spec, env.get("BENCH_MARKDOWN", "off")))
+
+
+async def _run_scenario(spec, markdown_mode):
+    import database
+    import scheduler
+    from markdown_writer import close_markdown_writer
+    from throttle import get_throttle_status
+    from wiki_client import close_wiki_clients
+    from zh_convert import close_zh_converter
+
+    terms, depth, languages = spec.split(":")
+    terms, depth = int(terms), int(depth)
+
+    # Time every database write the crawler makes
+    db_time = [0.0]
+
+    def timed(fn):
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                db_time[0] += time.perf_counter() - started
+        return wrapper
+
+    for name in DB_WRITE_FUNCTIONS:
+        if hasattr(scheduler, name):
+            setattr(scheduler, name, timed(getattr(scheduler, name)))
+
+    term_latencies = []
+
+    class TimedCrawler(scheduler.BatchCrawler):
+        async def process_term(self, term_record):
+            started = time.perf_counter()
+            await super().process_term(term_record)
+            term_latencies.append(time.perf_counter() - started)
+
+    await database.init_database()
+    await database.update_system_setting("markdown_output", markdown_mode)
+    task_id = await database.create_batch_task(terms, 0, depth, languages)
+    await database.add_terms_to_task(task_id, [f"Term {i}" for i in range(terms)])
+
+    await database.acquire_job(task_id, scheduler.WORKER_ID, scheduler.LEASE_SECONDS)
+    crawler = TimedCrawler(task_id)
+    started = time.perf_counter()
+    await crawler.run()
+    wall = time.perf_counter() - started
+
+    await close_markdown_writer()
+    close_zh_converter()
+    await close_wiki_clients()
+
+    status = await database.get_task_status(task_id)
+    hosts = get_throttle_status()
+    return {
+        "scenario": spec,
+        "terms": terms,
+        "depth": depth,
+        "languages": languages,
+        "total_terms": status["total_terms"],
+        "completed": status["completed_terms"],
+        "failed": status["failed_terms"],
+        "requests": sum(h["success"] + h["throttled"] + h["errors"] for h in hosts),
+        "throttled": sum(h["throttled"] for h in hosts),
+        "wall_s": round(wall, 3),
+        "terms_per_sec": round(len(term_latencies) / wall, 2) if wall else None,
+        "p50_term_ms": round(percentile(term_latencies, 50) * 1000, 1) if term_latencies else None,
+        "p99_term_ms": round(percentile(term_latencies, 99) * 1000, 1) if term_latencies else None,
+        "db_write_s": round(db_time[0], 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl throughput benchmark")
+    parser.add_argument("--scenario", action="append", help="TERMS:DEPTH:LANGUAGES (repeatable)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=30.0, help="Mean fake server latency in ms")
+    parser.add_argument("--jitter", type=float, default=10.0, help="Latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--maxlag-rate", type=float, default=0.0, help="Share of requests answered with maxlag")
+    parser.add_argument("--rate", type=float, default=1000.0, help="RATE_LIMIT_PER_HOST for the crawler")
+    parser.add_argument("--markdown", choices=["off", "files", "archive"], default="off",
+                        help="Markdown output mode during the run")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed throughput drop for --compare")
+    args = parser.parse_args()
+
+    server_config = {"latency_ms": args.latency, "jitter_ms": args.jitter,
+                     "error_rate": args.error_rate, "maxlag_rate": args.maxlag_rate}
+    env = {
+        "WIKI_API_URL": f"http://127.0.0.1:{args.port}/{{lang}}/w/api.php",
+        "RATE_LIMIT_PER_HOST": str(args.rate),
+        "RATE_LIMIT_BURST": str(args.rate),
+        "CORPUS_DB": "bench.db",
+        "BENCH_MARKDOWN": args.markdown,
+    }
+
+    server = start_fake_wiki(args.port, server_config)
+    results = []
+    try:
+        print(f"{'scenario':<28} {'terms/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'db s':>7} {'rss MB':>7} {'done':>6} {'fail':>5}")
+        for spec in args.scenario or DEFAULT_SCENARIOS:
+            # Fresh process per scenario: clean module state and a per-scenario peak RSS
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                result = pool.submit(run_scenario, spec, env).result()
+            results.append(result)
+            print(f"{spec:<28} {result['terms_per_sec']:>8} {result['p50_term_ms']:>8} {result['p99_term_ms']:>8} "
+                  f"{result['db_write_s']:>7} {result['peak_rss_mb']:>7} {result['completed']:>6} {result['failed']:>5}")
+    finally:
+        server.terminate()
+
+    write_results("crawl", results, args.output, server=server_config,
+                  rate_limit_per_host=args.rate, markdown=args.markdown)
+
+    if args.compare and not compare_results(results, args.compare, "scenario", "terms_per_sec",
+                                            args.tolerance, higher_is_better=True):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
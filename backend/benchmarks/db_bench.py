@@ -0,0 +1,218 @@
+"""Database-layer benchmark on synthetic corpora
+
+Times the heavy database functions and the export/graph endpoints against
+databases generated by make_corpus.py, recording peak memory:
+
+    python benchmarks/make_corpus.py --terms 100000
+    python benchmarks/db_bench.py --db benchmarks/data/corpus-100000.db
+    python benchmarks/db_bench.py --db benchmarks/data/corpus-100000.db --only export_csv,graph
+    python benchmarks/db_bench.py --db ... --compare benchmarks/results/db-20260101-120000.json
+
+Every operation runs in a fresh process, so peak RSS is per operation;
+rss_delta_mb is the growth over the process's footprint right before the
+operation. Destructive operations (clean, delete) run on a copy of the
+database. Task-level operations use the first task of the corpus.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_utils import peak_rss_mb, write_results, compare_results
+
+# Terms looked up by check_existing_terms: half existing, half new
+CHECK_EXISTING_SAMPLE = 10_000
+
+
+async def op_get_task_terms(ctx):
+    from database import get_task_terms
+    return len(await get_task_terms(ctx['task_id']))
+
+
+async def op_get_task_terms_completed(ctx):
+    from database import get_task_terms
+    return len(await get_task_terms(ctx['task_id'], 'completed'))
+
+
+async def op_corpus_statistics(ctx):
+    from database import get_corpus_statistics
+    return (await get_corpus_statistics()).get('total_terms')
+
+
+async def op_analyze_quality_corpus(ctx):
+    from database import analyze_data_quality
+    return (await analyze_data_quality()).get('total_terms')
+
+
+async def op_analyze_quality_task(ctx):
+    from database import analyze_data_quality
+    return (await analyze_data_quality(ctx['task_id'])).get('total_terms')
+
+
+async def op_quality_issues(ctx):
+    from database import get_terms_by_quality_issue
+    return len(await get_terms_by_quality_issue(ctx['task_id'], 'all', 1000))
+
+
+async def op_check_existing_terms(ctx):
+    from database import check_existing_terms
+    half = CHECK_EXISTING_SAMPLE // 2
+    terms = [f"Term {i}" for i in range(0, ctx['total_terms'], max(1, ctx['total_terms'] // half))][:half]
+    terms += [f"New term {i}" for i in range(CHECK_EXISTING_SAMPLE - len(terms))]
+    result = await check_existing_terms(terms)
+    return len(result.get('existing', []))
+
+
+async def op_clean_task(ctx):
+    from database import clean_task_data
+    result = await clean_task_data(ctx['task_id'], remove_failed=True, remove_missing_chinese=True,
+                                   remove_short_summaries=True)
+    return result['total_removed']
+
+
+async def op_delete_task(ctx):
+    from database import delete_task
+    return await delete_task(ctx['task_id'])
+
+
+def _endpoint(path):
+    async def op(ctx):
+        import httpx
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            size = 0
+            async with client.stream("GET", path.format(**ctx)) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+            return size
+    return op
+
+
+# name: (operation, destructive)
+OPERATIONS = {
+    "get_task_terms": (op_get_task_terms, False),
+    "get_task_terms_completed": (op_get_task_terms_completed, False),
+    "corpus_statistics": (op_corpus_statistics, False),
+    "analyze_quality_corpus": (op_analyze_quality_corpus, False),
+    "analyze_quality_task": (op_analyze_quality_task, False),
+    "quality_issues": (op_quality_issues, False),
+    "check_existing_terms": (op_check_existing_terms, False),
+    "export_json": (_endpoint("/api/batch/{task_id}/export?format=json"), False),
+    "export_csv": (_endpoint("/api/batch/{task_id}/export?format=csv"), False),
+    "export_tmx": (_endpoint("/api/batch/{task_id}/export?format=tmx"), False),
+    "graph": (_endpoint("/api/batch/{task_id}/graph"), False),
+    "graph_export_graphml": (_endpoint("/api/graph/export?format=graphml"), False),
+    "graph_export_npz": (_endpoint("/api/graph/export?format=npz&tasks={task_id}"), False),
+    "clean_task": (op_clean_task, True),
+    "delete_task": (op_delete_task, True),
+}
+
+
+def corpus_context(path: str) -> dict:
+    db = sqlite3.connect(path)
+    task_id = db.execute("SELECT MIN(id) FROM batch_tasks").fetchone()[0]
+    total_terms = db.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+    task_terms = db.execute("SELECT COUNT(*) FROM terms WHERE task_id = ?", (task_id,)).fetchone()[0]
+    associations = db.execute("SELECT COUNT(*) FROM term_associations").fetchone()[0]
+    db.close()
+    return {'task_id': task_id, 'total_terms': total_terms, 'task_terms': task_terms,
+            'associations': associations}
+
+
+def run_operation(name: str, path: str, ctx: dict) -> dict:
+    """Run one operation in this (fresh) process and measure it"""
+    os.environ["CORPUS_DB"] = path
+    # Markdown files written by endpoints stay out of the repo
+    os.chdir(tempfile.mkdtemp(prefix="db-bench-"))
+    operation, _ = OPERATIONS[name]
+
+    async def measure():
+        # Import everything up front so the baseline includes the modules
+        import main  # noqa: F401
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        result = await operation(ctx)
+        return time.perf_counter() - started, result, rss_before
+
+    seconds, result, rss_before = asyncio.run(measure())
+    rss_after = peak_rss_mb()
+    return {
+        "seconds": seconds,
+        "result": result,
+        "peak_rss_mb": rss_after,
+        "rss_delta_mb": round(rss_after - rss_before, 1) if rss_after is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database-layer benchmark")
+    parser.add_argument("--db", action="append", required=True, help="Corpus database (repeatable)")
+    parser.add_argument("--only", help="Comma-separated operations to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per operation; the median is reported")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed slowdown for --compare")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(OPERATIONS)
+    unknown = [n for n in names if n not in OPERATIONS]
+    if unknown:
+        raise SystemExit(f"Unknown operations: {', '.join(unknown)} (available: {', '.join(OPERATIONS)})")
+
+    spawn = multiprocessing.get_context("spawn")
+    results = []
+    for path in args.db:
+        ctx = corpus_context(path)
+        corpus = os.path.basename(path)
+        print(f"\n{corpus}: {ctx['total_terms']:,} terms, {ctx['associations']:,} associations, "
+              f"task {ctx['task_id']} has {ctx['task_terms']:,} terms")
+        print(f"{'operation':<28} {'seconds':>9} {'peak MB':>8} {'delta MB':>9}  result")
+
+        for name in names:
+            runs = []
+            for _ in range(args.repeat):
+                target, scratch = path, None
+                if OPERATIONS[name][1]:
+                    scratch = tempfile.mkdtemp(prefix="db-bench-copy-")
+                    target = os.path.join(scratch, corpus)
+                    shutil.copyfile(path, target)
+                try:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                        runs.append(pool.submit(run_operation, name, os.path.abspath(target), ctx).result())
+                finally:
+                    if scratch:
+                        shutil.rmtree(scratch, ignore_errors=True)
+
+            run = runs[0] if len(runs) == 1 else min(runs, key=lambda r: abs(r['seconds'] - statistics.median(x['seconds'] for x in runs)))
+            result = {
+                "benchmark": f"{corpus}:{name}",
+                "corpus": corpus,
+                "operation": name,
+                "total_terms": ctx['total_terms'],
+                "task_terms": ctx['task_terms'],
+                "seconds": round(statistics.median(r['seconds'] for r in runs), 4),
+                "peak_rss_mb": run['peak_rss_mb'],
+                "rss_delta_mb": run['rss_delta_mb'],
+                "result": run['result'],
+            }
+            results.append(result)
+            print(f"{name:<28} {result['seconds']:>9.3f} {result['peak_rss_mb']!s:>8} {result['rss_delta_mb']!s:>9}  {result['result']}", flush=True)
+
+    write_results("db", results, args.output, repeat=args.repeat)
+
+    if args.compare and not compare_results(results, args.compare, "benchmark", "seconds",
+                                            args.tolerance, higher_is_better=False):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Local stand-in for the MediaWiki Action API, for benchmarks
+
+Serves deterministic synthetic pages for every title "Term N" (any other
+title is missing), with extracts, language links, categories and paginated
+links, under /{lang}/w/api.php. Latency and errors can be injected:
+
+    python benchmarks/fake_wiki.py --port 8765 --latency 50 --error-rate 0.01
+
+Point the crawler at it with
+WIKI_API_URL=http://127.0.0.1:8765/{lang}/w/api.php.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+TITLE_PATTERN = re.compile(r'^Term (\d+)$')
+
+# Size of the synthetic title space that links point into
+TITLE_SPACE = 1_000_000
+
+LANGUAGES = ['de', 'es', 'fr', 'ja', 'ru', 'zh', 'it', 'pt', 'ko', 'ar']
+
+WORDS = ("system theory model data language process network structure method "
+         "analysis function field study history concept value form group").split()
+
+
+class FakeWikiConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 maxlag_rate: float = 0.0, links_per_page: int = 40, link_batch: int = 20,
+                 languages_per_page: int = 6, missing_rate: float = 0.02, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.maxlag_rate = maxlag_rate
+        self.links_per_page = links_per_page
+        self.link_batch = link_batch
+        self.languages_per_page = languages_per_page
+        self.missing_rate = missing_rate
+        self.random = random.Random(seed)
+
+
+def _seed(title: str) -> int:
+    return int(hashlib.sha1(title.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def _page_number(title: str, lang: str):
+    """Number N of a page "Term N" (or "Term N (lang)" off English), None if it doesn't exist"""
+    if lang != 'en':
+        title = re.sub(rf' \({re.escape(lang)}\)$', '', title)
+    match = TITLE_PATTERN.match(title)
+    return int(match.group(1)) if match else None
+
+
+def _extract(title: str, n: int) -> str:
+    rng = random.Random(n)
+    sentences = []
+    for _ in range(rng.randint(3, 12)):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        sentences.append(" ".join(words).capitalize() + ".")
+    lead = f"{title} is a synthetic article. " + " ".join(sentences)
+    return lead + "\n\n== History ==\nBody text that is not part of the summary."
+
+
+def create_app(config: FakeWikiConfig = None) -> FastAPI:
+    config = config or FakeWikiConfig()
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.get("/{lang}/w/api.php")
+    async def api(lang: str, request: Request):
+        app.state.requests += 1
+        params = request.query_params
+
+        if config.latency_ms:
+            delay = config.random.gauss(config.latency_ms, config.jitter_ms) if config.jitter_ms else config.latency_ms
+            await asyncio.sleep(max(0.0, delay) / 1000)
+
+        if config.error_rate and config.random.random() < config.error_rate:
+            return JSONResponse({"error": "injected"}, status_code=503, headers={"Retry-After": "0"})
+        if config.maxlag_rate and config.random.random() < config.maxlag_rate:
+            return JSONResponse({"error": {"code": "maxlag", "info": "Waiting for a database server"}},
+                                headers={"Retry-After": "0"})
+
+        title = params.get("titles", "")
+        n = _page_number(title, lang)
+        if n is None or (_seed(title) % 10_000) < config.missing_rate * 10_000:
+            return {"query": {"pages": [{"title": title, "missing": True}]}}
+
+        page = {"title": title}
+        props = params.get("prop", "").split("|")
+        response = {"query": {"pages": [page]}}
+
+        if "extracts" in props:
+            page["extract"] = _extract(title, n)
+        if "info" in props:
+            page["fullurl"] = f"https://{lang}.wikipedia.org/wiki/{title.replace(' ', '_')}"
+        if "langlinks" in props and lang == 'en':
+            rng = random.Random(n)
+            langs = rng.sample(LANGUAGES, config.languages_per_page)
+            page["langlinks"] = [{"lang": code, "title": f"{title} ({code})"} for code in langs]
+        if "categories" in props:
+            page["categories"] = [{"title": f"Category:Group {n % 97}"},
+                                  {"title": "Category:Articles with short description"}]
+        if "links" in props:
+            rng = random.Random(n + 1)
+            targets = sorted(f"Term {rng.randrange(TITLE_SPACE)}" for _ in range(config.links_per_page))
+            start = int(params.get("plcontinue") or 0)
+            end = start + config.link_batch
+            page["links"] = [{"ns": 0, "title": t} for t in targets[start:end]]
+            if end < len(targets):
+                response["continue"] = {"plcontinue": str(end), "continue": "||"}
+        return response
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake MediaWiki Action API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--maxlag-rate", type=float, default=0.0, help="Share of requests answered with a maxlag error")
+    args = parser.parse_args()
+
+    config = FakeWikiConfig(args.latency, args.jitter, args.error_rate, args.maxlag_rate)
+    uvicorn.run(create_app(config), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
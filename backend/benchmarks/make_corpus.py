@@ -0,0 +1,223 @@
+"""Generate synthetic corpus databases for the database benchmarks
+
+    python benchmarks/make_corpus.py --terms 100000
+    python benchmarks/make_corpus.py --terms 1000000 --languages en,zh,zh-tw,de,fr,ja --associations 15
+
+Writes a database with the real schema (init_database) holding tasks of
+--task-size terms each. The data looks like a crawled corpus:
+
+- most terms completed with multi-language translations
+- some failed or still pending
+- some with short summaries or missing Chinese
+- a few repeated across tasks
+- --associations links and categories per completed term, with link
+  targets mostly pointing at other terms of the same task
+
+Rows are generated and inserted in chunks, so memory stays flat for 1M+ terms.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import time
+
+import bench_utils
+from database import normalize_term, ASSOCIATION_KINDS
+
+DATA_DIR = os.path.join(bench_utils.BENCH_DIR, "data")
+
+CHUNK_SIZE = 20_000
+
+SYLLABLES = "ka lo mi nu se ta re vo zu pi an el or im us ber dal fen gor hil".split()
+
+# Share of completed terms whose summary copies an earlier one (near-duplicates)
+DUPLICATE_RATE = 0.01
+
+
+def make_vocabulary(rng: random.Random, size: int = 20_000) -> list:
+    """Pseudo-words, so unrelated summaries share few character shingles"""
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+
+
+def summary(rng: random.Random, vocabulary: list, short: bool = False) -> str:
+    if short:
+        return " ".join(rng.choice(vocabulary) for _ in range(4)).capitalize() + "."
+    sentences = []
+    for _ in range(rng.randint(1, 5)):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(6, 18))]
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def generate_terms(args, rng: random.Random, vocabulary: list):
+    """Yield (task_index, term row, associations) for every term"""
+    languages = args.languages.split(',')
+    names_seen = []
+    recent_summaries = []
+
+    for i in range(args.terms):
+        task_index = i // args.task_size
+        name = f"Term {i}"
+        # A few terms repeat an earlier term in another task (case may differ)
+        if names_seen and rng.random() < 0.03:
+            name = rng.choice(names_seen)
+            name = name.lower() if rng.random() < 0.5 else name
+        elif len(names_seen) < 100_000:
+            names_seen.append(name)
+
+        roll = rng.random()
+        status = 'completed' if roll < 0.92 else ('failed' if roll < 0.97 else 'pending')
+        row = {'term': name, 'status': status, 'depth': 0 if rng.random() < 0.7 else 1}
+
+        associations = []
+        if status == 'completed':
+            short = rng.random() < 0.04
+            translations = {}
+            for lang in languages:
+                if lang.startswith('zh') and rng.random() < 0.1:
+                    translations[lang] = {'summary': 'Translation not found.', 'url': ''}
+                    continue
+                if lang == 'en' and recent_summaries and rng.random() < DUPLICATE_RATE:
+                    text = rng.choice(recent_summaries) + " " + rng.choice(vocabulary)
+                else:
+                    text = summary(rng, vocabulary, short)
+                    if lang == 'en' and len(recent_summaries) < 1000:
+                        recent_summaries.append(text)
+                translations[lang] = {
+                    'summary': text,
+                    'url': f"https://{lang.split('-')[0]}.wikipedia.org/wiki/{name.replace(' ', '_')}"
+                }
+            row['translations'] = translations
+
+            task_start = task_index * args.task_size
+            task_end = min(args.terms, task_start + args.task_size)
+            for _ in range(args.associations):
+                if rng.random() < 0.3:
+                    associations.append((f"Group {rng.randrange(500)}", 'category', 0.5))
+                elif rng.random() < 0.8:
+                    associations.append((f"Term {rng.randrange(task_start, task_end)}", 'link', 1.0))
+                else:
+                    associations.append((f"External {rng.randrange(args.terms * 10)}", 'link', 1.0))
+        else:
+            row['error'] = "Term not found in English Wikipedia" if status == 'failed' else None
+
+        yield task_index, row, associations
+
+
+async def create_schema(path: str):
+    import database
+    database.DATABASE_FILE = path
+    await database.init_database()
+
+
+def generate(args) -> dict:
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    asyncio.run(create_schema(args.output))
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+    languages = args.languages
+    tasks = (args.terms + args.task_size - 1) // args.task_size
+
+    db = sqlite3.connect(args.output)
+    db.execute("PRAGMA synchronous=OFF")
+    db.executemany(
+        "INSERT INTO batch_tasks (id, status, total_terms, crawl_interval, max_depth, target_languages) VALUES (?, 'completed', ?, 3, 2, ?)",
+        [(t + 1, min(args.task_size, args.terms - t * args.task_size), languages) for t in range(tasks)]
+    )
+
+    term_id = 0
+    terms, associations = [], []
+    counts = {'terms': 0, 'associations': 0}
+    # Association target title -> vocabulary id
+    target_ids = {}
+    new_targets = []
+
+    def target_id(title: str) -> int:
+        key = normalize_term(title)
+        if key not in target_ids:
+            target_ids[key] = len(target_ids) + 1
+            new_targets.append((target_ids[key], key, title))
+        return target_ids[key]
+
+    def flush():
+        db.executemany("""
+            INSERT INTO terms (id, task_id, term, term_normalized, status, en_summary, en_url, zh_summary, zh_url,
+                               error_message, depth_level, translations, attempts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+        """, terms)
+        db.executemany("INSERT INTO vocabulary (id, normalized, title) VALUES (?, ?, ?)", new_targets)
+        cursor = db.executemany("""
+            INSERT OR IGNORE INTO term_associations (source_term_id, target_id, kind, weight)
+            VALUES (?, ?, ?, ?)
+        """, associations)
+        db.commit()
+        counts['terms'] += len(terms)
+        counts['associations'] += cursor.rowcount
+        terms.clear()
+        associations.clear()
+        new_targets.clear()
+
+    for task_index, row, term_associations in generate_terms(args, rng, vocabulary):
+        term_id += 1
+        translations = row.get('translations')
+        en = (translations or {}).get('en', {})
+        zh = (translations or {}).get('zh', {})
+        terms.append((
+            term_id, task_index + 1, row['term'], normalize_term(row['term']), row['status'],
+            en.get('summary'), en.get('url'), zh.get('summary'), zh.get('url'),
+            row.get('error'), row['depth'],
+            json.dumps(translations, ensure_ascii=False) if translations else None
+        ))
+        associations.extend((term_id, target_id(title), ASSOCIATION_KINDS[kind], weight)
+                            for title, kind, weight in term_associations)
+        if len(terms) >= CHUNK_SIZE:
+            flush()
+            print(f"  {counts['terms']:,} terms...", end="\r")
+    flush()
+
+    db.execute("""
+        UPDATE batch_tasks SET
+            completed_terms = (SELECT COUNT(*) FROM terms WHERE task_id = batch_tasks.id AND status = 'completed'),
+            failed_terms = (SELECT COUNT(*) FROM terms WHERE task_id = batch_tasks.id AND status = 'failed')
+    """)
+    db.commit()
+    db.close()
+    return {'tasks': tasks, **counts}
+
+
+async def index_signatures(path: str):
+    import database
+    database.DATABASE_FILE = path
+    await database.refresh_near_duplicate_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus database")
+    parser.add_argument("--terms", type=int, default=100_000)
+    parser.add_argument("--task-size", type=int, default=10_000, help="Terms per task")
+    parser.add_argument("--languages", default="en,zh,de")
+    parser.add_argument("--associations", type=int, default=12, help="Associations per completed term")
+    parser.add_argument("--signatures", action="store_true", help="Also build the near-duplicate index (slow)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Database file (default: benchmarks/data/corpus-<terms>.db)")
+    args = parser.parse_args()
+
+    if not args.output:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        args.output = os.path.join(DATA_DIR, f"corpus-{args.terms}.db")
+
+    started = time.perf_counter()
+    counts = generate(args)
+    if args.signatures:
+        asyncio.run(index_signatures(args.output))
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"✓ {args.output}: {counts['tasks']} tasks, {counts['terms']:,} terms, "
+          f"{counts['associations']:,} associations, {size_mb:.0f} MB in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
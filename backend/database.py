@@ -1,12 +1,185 @@
 import aiosqlite
+import asyncio
 import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from typing import Dict, Iterable
+import numpy as np
+from minhash import (
+    compute_signatures, band_hashes, signature_to_blob, blob_to_signature,
+    is_empty_signature, estimate_similarity, cluster_duplicates, DEFAULT_THRESHOLD
+)
+from tracing import TRACE_SAMPLE_RATE, tracing_active, span
+from metrics import SQLITE_LOCK_WAIT, current_stage
+import summary_codec
+from summary_codec import encode_summary, decode_term
 
-DATABASE_FILE = "corpus.db"
+# Overridable so API and worker processes can point at the same file
+DATABASE_FILE = os.environ.get("CORPUS_DB", "corpus.db")
+
+# Seconds to wait for another process's write lock before failing
+DB_BUSY_TIMEOUT = 30.0
+
+class DatabaseGate:
+    """Admits connections to the database file, unless it is being replaced
+    
+    Every connection from connect_db holds the gate while open. exclusive()
+    stops new connections and waits for open ones to close, so a restore can
+    swap the file underneath no live connection. Code running inside
+    exclusive() (the restore itself) still gets connections.
+    """
+    
+    def __init__(self):
+        self.active = 0
+        self._open = asyncio.Event()
+        self._open.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._owner: ContextVar[bool] = ContextVar("db_gate_owner", default=False)
+    
+    async def enter(self):
+        while not self._open.is_set() and not self._owner.get():
+            await self._open.wait()
+        self.active += 1
+        self._idle.clear()
+    
+    def leave(self):
+        self.active -= 1
+        if self.active == 0:
+            self._idle.set()
+    
+    @asynccontextmanager
+    async def hold(self):
+        """Count non-aiosqlite access to the file (e.g. backups) as a connection"""
+        await self.enter()
+        try:
+            yield
+        finally:
+            self.leave()
+    
+    @asynccontextmanager
+    async def exclusive(self, timeout: float):
+        """Close the gate; raises TimeoutError if connections stay open too long"""
+        self._open.clear()
+        token = self._owner.set(True)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            yield
+        finally:
+            self._owner.reset(token)
+            self._open.set()
+
+db_gate = DatabaseGate()
+
+# Statements that make Python's sqlite3 open a write transaction
+_WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+def _timed_write(conn: sqlite3.Connection, fn, args, kwargs):
+    """Run fn on the connection thread, timing the wait for the write lock
+    
+    A write that opens a transaction first takes the lock with BEGIN
+    IMMEDIATE (what sqlite3's implicit BEGIN would get at this statement
+    anyway), so the busy-handler wait is measured on its own. Explicit
+    BEGIN IMMEDIATE/EXCLUSIVE statements are timed as they are.
+    Returns (result, seconds waited or None).
+    """
+    statement = args[0].lstrip()[:24].upper() if args and isinstance(args[0], str) else ""
+    if statement.startswith(("BEGIN IMMEDIATE", "BEGIN EXCLUSIVE")):
+        started = time.perf_counter()
+        return fn(*args, **kwargs), time.perf_counter() - started
+    if statement.startswith(_WRITE_STATEMENTS) and not conn.in_transaction and conn.isolation_level is not None:
+        started = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        waited = time.perf_counter() - started
+        return fn(*args, **kwargs), waited
+    return fn(*args, **kwargs), None
+
+class CorpusConnection(aiosqlite.Connection):
+    """aiosqlite connection that holds the database gate while open
+    
+    Write-lock waits are recorded in sqlite_lock_wait_seconds, labelled
+    with the crawl stage running the statement.
+    """
+    
+    _gated = False
+    
+    async def _execute(self, fn, *args, **kwargs):
+        name = getattr(fn, '__name__', '')
+        if name not in ('execute', 'executemany'):
+            return await super()._execute(fn, *args, **kwargs)
+        result, waited = await super()._execute(_timed_write, self._conn, fn, args, kwargs)
+        if waited is not None:
+            SQLITE_LOCK_WAIT.observe(waited, stage=current_stage() or "other")
+        return result
+    
+    async def _connect(self):
+        if not self._gated:
+            await db_gate.enter()
+            self._gated = True
+        try:
+            return await super()._connect()
+        except BaseException:
+            self._release()
+            raise
+    
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            self._release()
+    
+    def _release(self):
+        if self._gated:
+            self._gated = False
+            db_gate.leave()
+
+class TracedConnection(CorpusConnection):
+    """aiosqlite connection that records a span per SQL call in sampled traces
+    
+    Every statement, fetch and commit goes through _execute on the connection
+    thread, so that is the one place to hook.
+    """
+    
+    async def _execute(self, fn, *args, **kwargs):
+        if not tracing_active():
+            return await super()._execute(fn, *args, **kwargs)
+        attributes = {}
+        if args and isinstance(args[0], str):
+            attributes['statement'] = " ".join(args[0].split())
+        if len(args) > 1 and isinstance(args[1], list) and getattr(fn, '__name__', '') == 'executemany':
+            attributes['rows'] = len(args[1])
+        with span(f"sql.{getattr(fn, '__name__', 'call')}", **attributes):
+            return await super()._execute(fn, *args, **kwargs)
+
+def connect_db():
+    """Open a connection to the corpus database
+    
+    The busy timeout lets the API process and crawl workers share the file.
+    Opening waits while a restore is replacing the file (see DatabaseGate).
+    """
+    path = DATABASE_FILE
+    connection_class = TracedConnection if TRACE_SAMPLE_RATE > 0 else CorpusConnection
+    return connection_class(lambda: _open_sqlite(path), 64)
+
+def _open_sqlite(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT)
+    # unz(column) reads compressed summaries in SQL (see summary_codec.py)
+    summary_codec.register_functions(conn)
+    return conn
 
 async def init_database():
     """Initialize the database with required tables"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
+        # Incremental auto-vacuum lets run_space_reclaimer shrink the file after
+        # deletes; it only takes effect before the first table is created
+        await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
+        # WAL lets readers proceed while a crawler or worker is writing
+        await db.execute("PRAGMA journal_mode=WAL")
+        
         # Create batch_tasks table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS batch_tasks (
@@ -39,16 +212,78 @@ async def init_database():
             )
         """)
         
-        # Create term_associations table
+        # Create vocabulary table (one id per association target, by normalized title)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS vocabulary (
+                id INTEGER PRIMARY KEY,
+                normalized TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL
+            )
+        """)
+        
+        # Create term_associations table: (term, vocabulary id, kind) edges, each stored once
+        await migrate_text_associations(db)
         await db.execute("""
             CREATE TABLE IF NOT EXISTS term_associations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source_term_id INTEGER,
-                target_term TEXT,
-                association_type TEXT,
+                source_term_id INTEGER NOT NULL,
+                target_id INTEGER NOT NULL,
+                kind INTEGER NOT NULL,
                 weight REAL DEFAULT 1.0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (source_term_id) REFERENCES terms(id)
+                PRIMARY KEY (source_term_id, target_id, kind),
+                FOREIGN KEY (source_term_id) REFERENCES terms(id),
+                FOREIGN KEY (target_id) REFERENCES vocabulary(id)
+            ) WITHOUT ROWID
+        """)
+
+        # Create term_signatures table (MinHash signature of each completed summary)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS term_signatures (
+                term_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (term_id) REFERENCES terms(id)
+            )
+        """)
+
+        # Create term_lsh_buckets table (one row per LSH band of each signature)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS term_lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                term_id INTEGER NOT NULL,
+                FOREIGN KEY (term_id) REFERENCES terms(id)
+            )
+        """)
+
+        # Create crawl_jobs table (durable ownership lease for each running task)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_jobs (
+                task_id INTEGER PRIMARY KEY,
+                worker_id TEXT,
+                lease_expires_at DATETIME,
+                heartbeat_at DATETIME,
+                started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (task_id) REFERENCES batch_tasks(id)
+            )
+        """)
+
+        # Create rate_limit_buckets table (cross-process token buckets per host)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                host TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+        # Create summary_dictionaries table (zstd dictionaries, see summary_codec.py)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS summary_dictionaries (
+                dict_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                dictionary BLOB NOT NULL,
+                samples INTEGER,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
 
@@ -77,6 +312,31 @@ async def init_database():
         await add_column_if_not_exists(db, "batch_tasks", "target_languages", "TEXT DEFAULT 'en,zh'")
         await add_column_if_not_exists(db, "terms", "translations", "TEXT")  # JSON: {"lang": {"summary": "...", "url": "..."}}
         
+        # Term leases: a 'crawling' term is owned by lease_owner until lease_expires_at
+        await add_column_if_not_exists(db, "terms", "lease_owner", "TEXT")
+        await add_column_if_not_exists(db, "terms", "lease_expires_at", "DATETIME")
+        
+        # Intro-only extraction: summaries limited server-side to this many characters
+        # (NULL fetches full page extracts and truncates them locally)
+        await add_column_if_not_exists(db, "batch_tasks", "intro_chars", "INTEGER")
+        # Skip category/link fetching for the association graph (links needed for depth are still fetched)
+        await add_column_if_not_exists(db, "batch_tasks", "skip_associations", "INTEGER DEFAULT 0")
+        
+        # Scheduling priority of a task's requests (higher is served first)
+        await add_column_if_not_exists(db, "batch_tasks", "priority", "INTEGER DEFAULT 0")
+        
+        # Automatic retries: transient failures go back to 'pending' until next_attempt_at
+        await add_column_if_not_exists(db, "terms", "attempts", "INTEGER DEFAULT 0")
+        await add_column_if_not_exists(db, "terms", "next_attempt_at", "DATETIME")
+        
+        # Upload ingestion progress of 'importing' tasks (see term_upload.py)
+        await add_column_if_not_exists(db, "batch_tasks", "ingest_bytes_total", "INTEGER")
+        await add_column_if_not_exists(db, "batch_tasks", "ingest_bytes_read", "INTEGER")
+        await add_column_if_not_exists(db, "batch_tasks", "ingest_error", "TEXT")
+        
+        # Case-insensitive lookup key of each term (see normalize_term)
+        await add_column_if_not_exists(db, "terms", "term_normalized", "TEXT")
+        
         # Create indexes
         await db.execute("""
             CREATE INDEX IF NOT EXISTS idx_task_id ON terms(task_id)
@@ -87,10 +347,116 @@ async def init_database():
         """)
         
         await db.execute("""
-            CREATE INDEX IF NOT EXISTS idx_source_term ON term_associations(source_term_id)
+            CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON term_lsh_buckets(band, bucket)
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_lsh_term ON term_lsh_buckets(term_id)
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_term_normalized ON terms(term_normalized, status)
+        """)
+        
+        # Reverse association lookups (which terms point at a vocabulary entry)
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_association_target ON term_associations(target_id)
         """)
         
         await db.commit()
+        await backfill_normalized_terms(db)
+        await create_discovered_terms_index(db)
+        await load_summary_dictionaries(db)
+
+async def backfill_normalized_terms(db, batch_size: int = 50000):
+    """Fill term_normalized for rows written before the column existed"""
+    filled = 0
+    while True:
+        cursor = await db.execute("""
+            SELECT id, term FROM terms WHERE term_normalized IS NULL LIMIT ?
+        """, (batch_size,))
+        rows = await cursor.fetchall()
+        if not rows:
+            break
+        await db.executemany("""
+            UPDATE terms SET term_normalized = ? WHERE id = ?
+        """, [(normalize_term(term), term_id) for term_id, term in rows])
+        await db.commit()
+        filled += len(rows)
+    if filled:
+        print(f"✓ Normalized {filled} existing terms")
+
+async def create_discovered_terms_index(db):
+    """Make each discovered term unique within its task
+    
+    Crawl workers in several processes can discover the same term at once;
+    the index lets add_terms_to_task insert it only once. Duplicates left by
+    earlier races are removed first while still pending (keeping the oldest).
+    """
+    await db.execute("""
+        DELETE FROM terms WHERE depth_level > 0 AND status = 'pending' AND id > (
+            SELECT MIN(t2.id) FROM terms t2
+            WHERE t2.task_id = terms.task_id AND t2.term_normalized = terms.term_normalized
+            AND t2.depth_level > 0
+        )
+    """)
+    try:
+        await db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_discovered_term
+            ON terms(task_id, term_normalized) WHERE depth_level > 0
+        """)
+    except sqlite3.IntegrityError:
+        print("✗ Tasks have crawled duplicate discovered terms; not enforcing unique discovered terms")
+    await db.commit()
+
+async def load_summary_dictionaries(db):
+    """Load the trained summary dictionaries into summary_codec"""
+    cursor = await db.execute("""
+        SELECT dict_id, name, dictionary FROM summary_dictionaries ORDER BY created_at, rowid
+    """)
+    summary_codec.load_dictionaries(await cursor.fetchall(), DATABASE_FILE)
+
+async def migrate_text_associations(db):
+    """Move associations stored with their target title as text to vocabulary ids
+    
+    Duplicate edges left by retries collapse into one.
+    """
+    cursor = await db.execute("PRAGMA table_info(term_associations)")
+    if "target_term" not in {row[1] for row in await cursor.fetchall()}:
+        return
+    await db.create_function("normalize_term", 1, normalize_term, deterministic=True)
+    kinds = " ".join(f"WHEN '{name}' THEN {kind}" for name, kind in ASSOCIATION_KINDS.items())
+    await db.execute("DROP INDEX IF EXISTS idx_source_term")
+    await db.execute("ALTER TABLE term_associations RENAME TO term_associations_text")
+    await db.execute("""
+        CREATE TABLE term_associations (
+            source_term_id INTEGER NOT NULL,
+            target_id INTEGER NOT NULL,
+            kind INTEGER NOT NULL,
+            weight REAL DEFAULT 1.0,
+            PRIMARY KEY (source_term_id, target_id, kind),
+            FOREIGN KEY (source_term_id) REFERENCES terms(id),
+            FOREIGN KEY (target_id) REFERENCES vocabulary(id)
+        ) WITHOUT ROWID
+    """)
+    await db.execute("""
+        INSERT OR IGNORE INTO vocabulary (normalized, title)
+        SELECT normalize_term(target_term), target_term FROM term_associations_text
+        WHERE target_term IS NOT NULL ORDER BY id
+    """)
+    cursor = await db.execute(f"""
+        INSERT OR IGNORE INTO term_associations (source_term_id, target_id, kind, weight)
+        SELECT a.source_term_id, v.id, CASE a.association_type {kinds} END, a.weight
+        FROM term_associations_text a
+        JOIN vocabulary v ON v.normalized = normalize_term(a.target_term)
+        WHERE a.source_term_id IS NOT NULL AND a.association_type IN ({", ".join(f"'{name}'" for name in ASSOCIATION_KINDS)})
+        ORDER BY a.id
+    """)
+    migrated = cursor.rowcount
+    await db.execute("DROP TABLE term_associations_text")
+    await db.commit()
+    print(f"✓ Moved {migrated} associations to vocabulary ids")
+    request_space_reclaim()
 
 async def add_column_if_not_exists(db, table, column, definition):
     """Helper to add a column if it doesn't already exist"""
@@ -101,35 +467,107 @@ async def add_column_if_not_exists(db, table, column, definition):
         # Ignore error if column already exists
         pass
 
-async def create_batch_task(total_terms: int, crawl_interval: int = 3, max_depth: int = 1, target_languages: str = "en,zh") -> int:
+def normalize_term(term: str) -> str:
+    """Key for case-insensitive term comparison (Unicode-aware, unlike SQL LOWER)"""
+    return term.strip().lower()
+
+async def create_batch_task(total_terms: int, crawl_interval: int = 3, max_depth: int = 1, target_languages: str = "en,zh", priority: int = 0,
+                            intro_chars: int = None, skip_associations: bool = False) -> int:
     """Create a new batch task and return its ID"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         cursor = await db.execute("""
-            INSERT INTO batch_tasks (status, total_terms, crawl_interval, max_depth, target_languages)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("pending", total_terms, crawl_interval, max_depth, target_languages))
+            INSERT INTO batch_tasks (status, total_terms, crawl_interval, max_depth, target_languages, priority, intro_chars,
+                                     skip_associations)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ("pending", total_terms, crawl_interval, max_depth, target_languages, priority, intro_chars,
+              int(skip_associations)))
         await db.commit()
         return cursor.lastrowid
 
-async def add_terms_to_task(task_id: int, terms: list, depth_level: int = 0, source_term_id: int = None):
-    """Add terms to a batch task"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
-        await db.executemany("""
-            INSERT INTO terms (task_id, term, status, depth_level, source_term_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, [(task_id, term, "pending", depth_level, source_term_id) for term in terms])
+async def add_terms_to_task(task_id: int, terms: list, depth_level: int = 0, source_term_id: int = None) -> int:
+    """Add terms to a batch task; returns the number added
+    
+    Discovered terms (depth_level > 0) the task already has at some depth
+    are skipped (idx_discovered_term), even when another crawl worker adds
+    them at the same time.
+    """
+    async with connect_db() as db:
+        cursor = await db.executemany("""
+            INSERT OR IGNORE INTO terms (task_id, term, term_normalized, status, depth_level, source_term_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(task_id, term, normalize_term(term), "pending", depth_level, source_term_id) for term in terms])
+        added = cursor.rowcount
         # Update total terms count in batch_tasks
-        if depth_level > 0:
+        if depth_level > 0 and added:
             await db.execute("""
                 UPDATE batch_tasks 
                 SET total_terms = total_terms + ? 
                 WHERE id = ?
-            """, (len(terms), task_id))
+            """, (added, task_id))
+        await db.commit()
+        return added
+
+async def create_upload_task(bytes_total: int, crawl_interval: int = 3, max_depth: int = 1,
+                             target_languages: str = "en,zh", priority: int = 0, intro_chars: int = None,
+                             skip_associations: bool = False) -> int:
+    """Create an empty 'importing' task that an upload is ingested into"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            INSERT INTO batch_tasks (status, total_terms, crawl_interval, max_depth, target_languages, priority,
+                                     intro_chars, skip_associations, ingest_bytes_total, ingest_bytes_read)
+            VALUES ('importing', 0, ?, ?, ?, ?, ?, ?, ?, 0)
+        """, (crawl_interval, max_depth, target_languages, priority, intro_chars, int(skip_associations), bytes_total))
+        await db.commit()
+        return cursor.lastrowid
+
+async def append_uploaded_terms(task_id: int, terms: list, bytes_read: int) -> bool:
+    """Add a chunk of uploaded terms to an 'importing' task in one transaction
+    
+    Returns False (adding nothing) if the task is no longer importing, e.g.
+    because it was cancelled or deleted.
+    """
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE batch_tasks
+            SET total_terms = total_terms + ?, ingest_bytes_read = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'importing'
+        """, (len(terms), bytes_read, task_id))
+        if cursor.rowcount == 0:
+            await db.rollback()
+            return False
+        await db.executemany("""
+            INSERT INTO terms (task_id, term, term_normalized, status, depth_level)
+            VALUES (?, ?, ?, 'pending', 0)
+        """, [(task_id, term, normalize_term(term)) for term in terms])
+        await db.commit()
+        return True
+
+async def finish_term_upload(task_id: int, error: str = None):
+    """End an upload: the task becomes 'pending', or 'failed' with the error"""
+    async with connect_db() as db:
+        await db.execute("""
+            UPDATE batch_tasks
+            SET status = ?, ingest_error = ?, ingest_bytes_read = ingest_bytes_total,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'importing'
+        """, ('failed' if error else 'pending', error, task_id))
+        await db.commit()
+
+async def fail_interrupted_uploads() -> int:
+    """Fail tasks left 'importing' by a previous run; their upload files are gone"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE batch_tasks
+            SET status = 'failed', ingest_error = 'Upload ingestion was interrupted by a restart',
+                updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'importing'
+        """)
         await db.commit()
+        return cursor.rowcount
 
 async def update_task_status(task_id: int, status: str):
     """Update the status of a batch task"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         await db.execute("""
             UPDATE batch_tasks
             SET status = ?, updated_at = CURRENT_TIMESTAMP
@@ -145,18 +583,69 @@ async def update_term_status(task_id: int, term: str, status: str,
     
     translations: JSON string with format {"lang": {"summary": "...", "url": "..."}}
     """
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         await db.execute("""
             UPDATE terms
             SET status = ?, en_summary = ?, en_url = ?, zh_summary = ?, zh_url = ?,
-                error_message = ?, translations = ?, updated_at = CURRENT_TIMESTAMP
+                error_message = ?, translations = ?, updated_at = CURRENT_TIMESTAMP,
+                lease_owner = NULL, lease_expires_at = NULL, next_attempt_at = NULL
             WHERE task_id = ? AND term = ?
-        """, (status, en_summary, en_url, zh_summary, zh_url, error_message, translations, task_id, term))
+        """, (status, encode_summary(en_summary, 'en_summary'), en_url,
+              encode_summary(zh_summary, 'zh_summary'), zh_url, error_message,
+              encode_summary(translations, 'translations'), task_id, term))
+        await db.commit()
+
+async def record_term_failure(term_id: int, error_message: str, retry_delay: float = None):
+    """Record a failed crawl attempt of a term
+    
+    With retry_delay the term goes back to 'pending' and can't be claimed
+    again for retry_delay seconds; without it the term is marked 'failed'.
+    """
+    async with connect_db() as db:
+        if retry_delay is None:
+            await db.execute("""
+                UPDATE terms
+                SET status = 'failed', error_message = ?, attempts = attempts + 1,
+                    next_attempt_at = NULL, lease_owner = NULL, lease_expires_at = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (error_message, term_id))
+        else:
+            await db.execute("""
+                UPDATE terms
+                SET status = 'pending', error_message = ?, attempts = attempts + 1,
+                    next_attempt_at = datetime('now', ?), lease_owner = NULL, lease_expires_at = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (error_message, _lease_interval(retry_delay), term_id))
         await db.commit()
 
+async def requeue_failed_terms(task_id: int) -> int:
+    """Put every failed term of a task back in the queue with a fresh retry budget"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE terms
+            SET status = 'pending', error_message = NULL, attempts = 0, next_attempt_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE task_id = ? AND status = 'failed'
+        """, (task_id,))
+        await db.commit()
+        return cursor.rowcount
+
+async def get_next_retry_delay(task_id: int):
+    """Seconds until the earliest scheduled retry of a task, or None if none is waiting"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            SELECT MAX(0, strftime('%s', MIN(next_attempt_at)) - strftime('%s', 'now'))
+            FROM terms
+            WHERE task_id = ? AND status = 'pending' AND next_attempt_at IS NOT NULL
+        """, (task_id,))
+        row = await cursor.fetchone()
+        return row[0] if row and row[0] is not None else None
+
 async def update_task_counters(task_id: int):
     """Update completed and failed counters for a task"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         cursor = await db.execute("""
             SELECT 
                 COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed,
@@ -176,7 +665,7 @@ async def update_task_counters(task_id: int):
 
 async def get_task_status(task_id: int) -> dict:
     """Get the status of a batch task"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute("""
             SELECT * FROM batch_tasks WHERE id = ?
@@ -187,9 +676,13 @@ async def get_task_status(task_id: int) -> dict:
             return dict(row)
         return None
 
-async def get_task_terms(task_id: int, status_filter: str = None) -> list:
-    """Get all terms for a task, optionally filtered by status"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+async def get_task_terms(task_id: int, status_filter: str = None, summaries: bool = True) -> list:
+    """Get all terms for a task, optionally filtered by status
+    
+    With summaries=False the summary fields are left out and never
+    decompressed, for callers that only need terms and statuses.
+    """
+    async with connect_db() as db:
         db.row_factory = aiosqlite.Row
         
         if status_filter:
@@ -204,11 +697,14 @@ async def get_task_terms(task_id: int, status_filter: str = None) -> list:
             """, (task_id,))
         
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    
+    if not summaries:
+        return [{k: row[k] for k in row.keys() if k not in summary_codec.FIELD_DICTIONARIES} for row in rows]
+    return [decode_term(dict(row)) for row in rows]
 
 async def get_all_tasks() -> list:
     """Get all batch tasks"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute("""
             SELECT * FROM batch_tasks
@@ -225,88 +721,516 @@ async def get_failed_terms(task_id: int) -> list:
     """Get all failed terms for a task"""
     return await get_task_terms(task_id, "failed")
 
+# ========== Durable Job Leases ==========
+
+def _lease_interval(lease_seconds: int) -> str:
+    return f"+{int(lease_seconds)} seconds"
+
+async def acquire_job(task_id: int, worker_id: str, lease_seconds: int = 60) -> bool:
+    """Take the ownership lease of a task
+    
+    Succeeds if the task has no owner, is already owned by worker_id, or the
+    previous owner's lease has expired (e.g. it crashed).
+    """
+    async with connect_db() as db:
+        await db.execute("INSERT OR IGNORE INTO crawl_jobs (task_id) VALUES (?)", (task_id,))
+        cursor = await db.execute("""
+            UPDATE crawl_jobs
+            SET worker_id = ?, lease_expires_at = datetime('now', ?),
+                heartbeat_at = CURRENT_TIMESTAMP, started_at = CURRENT_TIMESTAMP
+            WHERE task_id = ?
+            AND (worker_id IS NULL OR worker_id = ? OR lease_expires_at IS NULL
+                 OR lease_expires_at < datetime('now'))
+        """, (worker_id, _lease_interval(lease_seconds), task_id, worker_id))
+        await db.commit()
+        return cursor.rowcount == 1
+
+async def heartbeat_job(task_id: int, worker_id: str, lease_seconds: int = 60) -> bool:
+    """Extend the task lease and the leases of the terms the worker is crawling
+    
+    Returns False if the worker no longer owns the task.
+    """
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE crawl_jobs
+            SET lease_expires_at = datetime('now', ?), heartbeat_at = CURRENT_TIMESTAMP
+            WHERE task_id = ? AND worker_id = ?
+        """, (_lease_interval(lease_seconds), task_id, worker_id))
+        owned = cursor.rowcount == 1
+        if owned:
+            await db.execute("""
+                UPDATE terms SET lease_expires_at = datetime('now', ?)
+                WHERE task_id = ? AND lease_owner = ? AND status = 'crawling'
+            """, (_lease_interval(lease_seconds), task_id, worker_id))
+        await db.commit()
+        return owned
+
+async def release_job(task_id: int, worker_id: str):
+    """Give up the task lease and return unfinished claimed terms to the queue"""
+    async with connect_db() as db:
+        await db.execute("""
+            UPDATE terms
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL
+            WHERE task_id = ? AND lease_owner = ? AND status = 'crawling'
+        """, (task_id, worker_id))
+        await db.execute("""
+            UPDATE crawl_jobs
+            SET worker_id = NULL, lease_expires_at = NULL
+            WHERE task_id = ? AND worker_id = ?
+        """, (task_id, worker_id))
+        await db.commit()
+
+async def claim_terms(task_id: int, worker_id: str, limit: int = 1, lease_seconds: int = 60) -> list:
+    """Atomically claim up to `limit` pending terms
+    
+    Claimed terms move to 'crawling' with a lease owned by worker_id. With
+    task_id=None, terms are claimed from any task whose status is 'running'
+    (oldest task first), which is how standalone workers pull from the queue.
+    """
+    if task_id is not None:
+        task_filter = "task_id = ?"
+        params = (task_id,)
+    else:
+        task_filter = "task_id IN (SELECT id FROM batch_tasks WHERE status = 'running')"
+        params = ()
+    
+    async with connect_db() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(f"""
+            UPDATE terms
+            SET status = 'crawling', lease_owner = ?, lease_expires_at = datetime('now', ?),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT id FROM terms
+                WHERE {task_filter} AND status = 'pending'
+                AND (next_attempt_at IS NULL OR next_attempt_at <= datetime('now'))
+                ORDER BY task_id, id
+                LIMIT ?
+            )
+            RETURNING *
+        """, (worker_id, _lease_interval(lease_seconds), *params, limit))
+        rows = await cursor.fetchall()
+        await db.commit()
+        return sorted((dict(row) for row in rows), key=lambda t: t['id'])
+
+async def heartbeat_terms(worker_id: str, lease_seconds: int = 60) -> int:
+    """Extend the leases of every term a worker is crawling"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE terms SET lease_expires_at = datetime('now', ?)
+            WHERE lease_owner = ? AND status = 'crawling'
+        """, (_lease_interval(lease_seconds), worker_id))
+        await db.commit()
+        return cursor.rowcount
+
+async def release_terms(worker_id: str) -> int:
+    """Return every term a worker still holds to 'pending'"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE terms
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL
+            WHERE lease_owner = ? AND status = 'crawling'
+        """, (worker_id,))
+        await db.commit()
+        return cursor.rowcount
+
+async def complete_task_if_done(task_id: int) -> bool:
+    """Mark a running task completed once no term is pending or being crawled"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE batch_tasks
+            SET status = 'completed', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running'
+            AND NOT EXISTS (
+                SELECT 1 FROM terms WHERE task_id = ? AND status IN ('pending', 'crawling')
+            )
+        """, (task_id, task_id))
+        await db.commit()
+        return cursor.rowcount == 1
+
+async def reclaim_expired_leases() -> int:
+    """Return 'crawling' terms whose lease expired to 'pending'
+    
+    Terms stuck in 'crawling' without a lease (left by older versions) are
+    reclaimed as well. Returns the number of reclaimed terms.
+    """
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            UPDATE terms
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = 'crawling'
+            AND (lease_expires_at IS NULL OR lease_expires_at < datetime('now'))
+        """)
+        await db.commit()
+        return cursor.rowcount
+
+async def get_resumable_tasks() -> list:
+    """Get running tasks that no live worker owns
+    
+    A task is resumable if it is marked 'running' but its job lease is missing,
+    released or expired.
+    """
+    async with connect_db() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("""
+            SELECT b.* FROM batch_tasks b
+            LEFT JOIN crawl_jobs j ON j.task_id = b.id
+            WHERE b.status = 'running'
+            AND (j.task_id IS NULL OR j.worker_id IS NULL
+                 OR j.lease_expires_at IS NULL OR j.lease_expires_at < datetime('now'))
+            ORDER BY b.id
+        """)
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+
+# Association types, stored as these codes in term_associations.kind
+ASSOCIATION_KINDS = {"category": 1, "link": 2}
+ASSOCIATION_TYPES = {kind: name for name, kind in ASSOCIATION_KINDS.items()}
+
+# Normalized titles looked up per vocabulary query (below SQLite's variable limit)
+VOCABULARY_LOOKUP_CHUNK = 500
+
+async def intern_titles(db, titles: Iterable[str]) -> Dict[str, int]:
+    """Vocabulary ids of titles by normalized title, adding titles not seen before"""
+    entries = {}
+    for title in titles:
+        entries.setdefault(normalize_term(title), title)
+    await db.executemany("""
+        INSERT OR IGNORE INTO vocabulary (normalized, title) VALUES (?, ?)
+    """, entries.items())
+    keys = list(entries)
+    ids = {}
+    for start in range(0, len(keys), VOCABULARY_LOOKUP_CHUNK):
+        chunk = keys[start:start + VOCABULARY_LOOKUP_CHUNK]
+        cursor = await db.execute(f"""
+            SELECT normalized, id FROM vocabulary WHERE normalized IN ({", ".join("?" * len(chunk))})
+        """, chunk)
+        ids.update(await cursor.fetchall())
+    return ids
+
+async def insert_associations(db, edges: list):
+    """Store (source_term_id, association) pairs; edges already stored are skipped"""
+    ids = await intern_titles(db, (a['target_term'] for _, a in edges))
+    await db.executemany("""
+        INSERT OR IGNORE INTO term_associations (source_term_id, target_id, kind, weight)
+        VALUES (?, ?, ?, ?)
+    """, [(source_term_id, ids[normalize_term(a['target_term'])], ASSOCIATION_KINDS[a['association_type']],
+           a.get('weight', 1.0)) for source_term_id, a in edges])
+
 async def save_term_associations(source_term_id: int, associations: list):
     """Save associations for a term
     associations: list of dicts with keys 'target_term', 'association_type', 'weight'
     """
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
+        await insert_associations(db, [(source_term_id, a) for a in associations])
+        await db.commit()
+
+async def save_imported_terms(rows: list):
+    """Store terms built offline (dump_import.py) in one transaction
+    rows: list of dicts with 'id', 'status' and, for completed terms,
+    'en_summary', 'en_url', 'zh_summary', 'zh_url', 'translations' (JSON) and
+    'associations'; failed terms carry 'error_message'
+    """
+    async with connect_db() as db:
         await db.executemany("""
-            INSERT INTO term_associations (source_term_id, target_term, association_type, weight)
-            VALUES (?, ?, ?, ?)
-        """, [(source_term_id, a['target_term'], a['association_type'], a.get('weight', 1.0)) for a in associations])
+            UPDATE terms
+            SET status = ?, en_summary = ?, en_url = ?, zh_summary = ?, zh_url = ?,
+                error_message = ?, translations = ?, attempts = attempts + 1,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, [(r['status'], encode_summary(r.get('en_summary'), 'en_summary'), r.get('en_url'),
+               encode_summary(r.get('zh_summary'), 'zh_summary'), r.get('zh_url'),
+               r.get('error_message'), encode_summary(r.get('translations'), 'translations'), r['id'])
+              for r in rows])
+        await insert_associations(db, [(r['id'], a) for r in rows for a in r.get('associations', [])])
         await db.commit()
 
 async def get_term_associations(term_id: int) -> list:
     """Get all associations for a term"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect_db() as db:
         cursor = await db.execute("""
-            SELECT * FROM term_associations WHERE source_term_id = ?
+            SELECT a.source_term_id, v.title, a.kind, a.weight
+            FROM term_associations a JOIN vocabulary v ON v.id = a.target_id
+            WHERE a.source_term_id = ?
         """, (term_id,))
+        return [
+            {"source_term_id": source_term_id, "target_term": title,
+             "association_type": ASSOCIATION_TYPES[kind], "weight": weight}
+            for source_term_id, title, kind, weight in await cursor.fetchall()
+        ]
+
+async def get_task_edges(task_id: int) -> Dict[str, np.ndarray]:
+    """Associations between terms of a task, as parallel arrays
+    
+    Returns 'source' and 'target' (term ids), 'kind' (ASSOCIATION_KINDS
+    codes) and 'weight'. A target matches a term of the task by normalized
+    title (the latest term when the task has it twice); associations to
+    anything else are left out.
+    """
+    async with connect_db() as db:
+        # vocabulary id -> id of the task's term with that title
+        cursor = await db.execute("""
+            SELECT v.id, t.id FROM terms t JOIN vocabulary v ON v.normalized = t.term_normalized
+            WHERE t.task_id = ? ORDER BY t.id
+        """, (task_id,))
+        term_of = dict(await cursor.fetchall())
+        cursor = await db.execute("""
+            SELECT a.source_term_id, a.target_id, a.kind, a.weight
+            FROM terms t JOIN term_associations a ON a.source_term_id = t.id
+            WHERE t.task_id = ?
+        """, (task_id,))
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    
+    source = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    target_vocab = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    kind = np.fromiter((r[2] for r in rows), dtype=np.int8, count=len(rows))
+    weight = np.fromiter((r[3] for r in rows), dtype=np.float32, count=len(rows))
+    
+    vocab_ids = np.fromiter(term_of.keys(), dtype=np.int64, count=len(term_of))
+    term_ids = np.fromiter(term_of.values(), dtype=np.int64, count=len(term_of))
+    order = np.argsort(vocab_ids)
+    vocab_ids, term_ids = vocab_ids[order], term_ids[order]
+    slot = np.minimum(np.searchsorted(vocab_ids, target_vocab), max(len(vocab_ids) - 1, 0))
+    matched = vocab_ids[slot] == target_vocab if len(vocab_ids) else np.zeros(len(rows), dtype=bool)
+    return {
+        "source": source[matched],
+        "target": term_ids[slot[matched]],
+        "kind": kind[matched],
+        "weight": weight[matched],
+    }
+
+async def get_task_term_ids(task_id: int) -> np.ndarray:
+    """Ids of all terms of a task, ascending"""
+    async with connect_db() as db:
+        cursor = await db.execute("SELECT id FROM terms WHERE task_id = ? ORDER BY id", (task_id,))
+        rows = await cursor.fetchall()
+    return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+async def get_graph_version(task_id: int) -> str:
+    """Changes whenever a term of the task is added, crawled or fails, and with it the task's graph"""
+    async with connect_db() as db:
+        cursor = await db.execute("""
+            SELECT COUNT(*), COALESCE(SUM(status = 'completed'), 0), COALESCE(SUM(status = 'failed'), 0),
+                   COALESCE(MAX(updated_at), '')
+            FROM terms WHERE task_id = ?
+        """, (task_id,))
+        return "-".join(str(value) for value in await cursor.fetchone())
+
+async def get_graph_node_details(term_ids: list) -> Dict[int, tuple]:
+    """term id -> (term, status, depth_level) for some terms"""
+    details = {}
+    async with connect_db() as db:
+        for start in range(0, len(term_ids), VOCABULARY_LOOKUP_CHUNK):
+            chunk = term_ids[start:start + VOCABULARY_LOOKUP_CHUNK]
+            cursor = await db.execute(f"""
+                SELECT id, term, status, depth_level FROM terms WHERE id IN ({", ".join("?" * len(chunk))})
+            """, chunk)
+            details.update((row[0], row[1:]) for row in await cursor.fetchall())
+    return details
+
+async def get_existing_task_terms(task_id: int, terms: list) -> set:
+    """Normalized forms of the given terms that the task already has"""
+    keys = list({normalize_term(term) for term in terms})
+    existing = set()
+    async with connect_db() as db:
+        for start in range(0, len(keys), VOCABULARY_LOOKUP_CHUNK):
+            chunk = keys[start:start + VOCABULARY_LOOKUP_CHUNK]
+            cursor = await db.execute(f"""
+                SELECT term_normalized FROM terms
+                WHERE task_id = ? AND term_normalized IN ({", ".join("?" * len(chunk))})
+            """, [task_id, *chunk])
+            existing.update(row[0] for row in await cursor.fetchall())
+    return existing
+
+# Rows fetched per round trip to the connection thread when streaming results
+CHECK_FETCH_SIZE = 5000
+
+def _task_scope(alias: str, task_ids: list = None, use_index: bool = True) -> str:
+    """SQL condition limiting a terms alias to some tasks ('1' for the whole corpus)
+    
+    use_index=False keeps SQLite off idx_task_id (unary +), for title
+    lookups that must go through idx_term_normalized instead.
+    """
+    if not task_ids:
+        return "1"
+    column = f"{alias}.task_id" if use_index else f"+{alias}.task_id"
+    return f"{column} IN ({', '.join(str(int(task_id)) for task_id in task_ids)})"
+
+async def iter_graph_nodes(task_ids: list = None):
+    """Stream the nodes of the association graph of some tasks (default: all), in batches
+    
+    Every term in scope is a node ('term', term id, title, status, depth,
+    task id). So is every association target that isn't a term in scope
+    ('category' or 'link', vocabulary id, title, None, None, None); a
+    target reached by both kinds of association counts as a category.
+    """
+    async with connect_db() as db:
+        async with db.execute(f"""
+            SELECT 'term', t.id, t.term, t.status, t.depth_level, t.task_id
+            FROM terms t WHERE {_task_scope("t", task_ids)} ORDER BY t.id
+        """) as cursor:
+            while rows := await cursor.fetchmany(CHECK_FETCH_SIZE):
+                yield rows
+        
+        # Targets come from the scope's own associations, so a task export
+        # never scans the whole vocabulary
+        if task_ids:
+            targets = f"""
+                SELECT a.target_id, MIN(a.kind) AS kind
+                FROM terms t JOIN term_associations a ON a.source_term_id = t.id
+                WHERE {_task_scope("t", task_ids)} GROUP BY a.target_id
+            """
+        else:
+            targets = "SELECT target_id, MIN(kind) AS kind FROM term_associations GROUP BY target_id"
+        async with db.execute(f"""
+            SELECT s.kind, v.id, v.title, NULL, NULL, NULL
+            FROM ({targets}) s
+            JOIN vocabulary v ON v.id = s.target_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM terms t2 WHERE t2.term_normalized = v.normalized AND {_task_scope("t2", task_ids, use_index=False)}
+            )
+            ORDER BY v.id
+        """) as cursor:
+            while rows := await cursor.fetchmany(CHECK_FETCH_SIZE):
+                yield [(ASSOCIATION_TYPES[row[0]], *row[1:]) for row in rows]
+
+async def iter_graph_edges(task_ids: list = None):
+    """Stream the association edges of some tasks (default: all), in batches
+    
+    Yields lists of (source term id, target term id, target vocabulary id,
+    kind, weight, source title, target title). The target term id is the
+    term in scope with the target's title (the latest if there are several),
+    or None for targets outside the scope, which are graph nodes of their own.
+    """
+    async with connect_db() as db:
+        async with db.execute(f"""
+            SELECT a.source_term_id, (
+                SELECT MAX(t2.id) FROM terms t2
+                WHERE t2.term_normalized = v.normalized AND {_task_scope("t2", task_ids, use_index=False)}
+            ), a.target_id, a.kind, a.weight, t.term, v.title
+            FROM terms t
+            JOIN term_associations a ON a.source_term_id = t.id
+            JOIN vocabulary v ON v.id = a.target_id
+            WHERE {_task_scope("t", task_ids)}
+        """) as cursor:
+            while rows := await cursor.fetchmany(CHECK_FETCH_SIZE):
+                yield rows
+
+async def iter_existing_terms(terms: list):
+    """Compare terms with the completed terms of the corpus, case-insensitively
+    
+    The normalized input is bulk-loaded into a temporary table and joined
+    against the term_normalized index, so any number of terms takes one pass.
+    Yields ('existing', corpus_term) for each distinct matching corpus
+    spelling, then ('new', input_term) for each unmatched input term in
+    input order.
+    """
+    normalized = [normalize_term(term) for term in terms]
+    matched = set()
+    async with connect_db() as db:
+        await db.execute("PRAGMA temp_store = MEMORY")
+        await db.execute("CREATE TEMP TABLE check_input (normalized TEXT NOT NULL)")
+        await db.executemany(
+            "INSERT INTO check_input (normalized) VALUES (?)",
+            ((key,) for key in normalized)
+        )
+        await db.execute("CREATE INDEX temp.idx_check_input ON check_input(normalized)")
+        
+        async with db.execute("""
+            SELECT DISTINCT t.term, t.term_normalized
+            FROM check_input i
+            JOIN terms t ON t.term_normalized = i.normalized AND t.status = 'completed'
+        """) as cursor:
+            while rows := await cursor.fetchmany(CHECK_FETCH_SIZE):
+                for term, key in rows:
+                    matched.add(key)
+                    yield 'existing', term
+    
+    for term, key in zip(terms, normalized):
+        if key not in matched:
+            yield 'new', term
 
 async def check_existing_terms(terms: list) -> dict:
     """Check which terms already exist in the database (across all tasks)
     Returns dict with 'existing' and 'new' term lists
     """
-    async with aiosqlite.connect(DATABASE_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        # Normalize terms for comparison (case-insensitive)
-        terms_lower = [t.lower().strip() for t in terms]
-        placeholders = ",".join(["?" for _ in terms_lower])
-        
+    result = {"existing": [], "new": []}
+    async for kind, term in iter_existing_terms(terms):
+        result[kind].append(term)
+    return {
+        **result,
+        "total_input": len(terms),
+        "existing_count": len(result["existing"]),
+        "new_count": len(result["new"])
+    }
+
+# Terms deleted per transaction by delete_terms_chunked
+DELETE_CHUNK_SIZE = 5000
+
+# Tables holding per-term rows, as (table, term id column)
+TERM_CHILD_TABLES = (
+    ("term_associations", "source_term_id"),
+    ("term_lsh_buckets", "term_id"),
+    ("term_signatures", "term_id"),
+)
+
+async def delete_terms_chunked(db, id_query: str, params: tuple = ()) -> int:
+    """Delete the terms selected by id_query, with their per-term rows
+    
+    Works through the ids in ascending chunks of DELETE_CHUNK_SIZE, each
+    deleted with set-based subqueries and committed on its own, so the write
+    lock is only held briefly. Returns the number of terms deleted.
+    """
+    deleted = 0
+    last_id = 0
+    while True:
         cursor = await db.execute(f"""
-            SELECT DISTINCT term FROM terms 
-            WHERE LOWER(term) IN ({placeholders})
-            AND status = 'completed'
-        """, terms_lower)
-        
-        rows = await cursor.fetchall()
-        existing_terms = [row['term'] for row in rows]
-        existing_lower = [t.lower() for t in existing_terms]
+            SELECT MAX(id) FROM (
+                SELECT id FROM ({id_query}) WHERE id > ? ORDER BY id LIMIT ?
+            )
+        """, (*params, last_id, DELETE_CHUNK_SIZE))
+        upper_id = (await cursor.fetchone())[0]
+        if upper_id is None:
+            return deleted
         
-        new_terms = [t for t in terms if t.lower().strip() not in existing_lower]
+        chunk = f"SELECT id FROM ({id_query}) WHERE id > ? AND id <= ?"
+        chunk_params = (*params, last_id, upper_id)
+        for table, column in TERM_CHILD_TABLES:
+            await db.execute(f"DELETE FROM {table} WHERE {column} IN ({chunk})", chunk_params)
+        cursor = await db.execute(f"DELETE FROM terms WHERE id IN ({chunk})", chunk_params)
+        deleted += cursor.rowcount
+        await db.commit()
         
-        return {
-            "existing": existing_terms,
-            "new": new_terms,
-            "total_input": len(terms),
-            "existing_count": len(existing_terms),
-            "new_count": len(new_terms)
-        }
+        last_id = upper_id
+        # Let other coroutines (and their writes) in between chunks
+        await asyncio.sleep(0)
 
 async def delete_task(task_id: int) -> bool:
-    """Delete a task and all its associated data"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    """Delete a task and all its associated data
+    
+    Terms are deleted in chunks, one short transaction each, so crawlers
+    can write between them. An interrupted delete can simply be repeated.
+    """
+    async with connect_db() as db:
         # First check if task exists
         cursor = await db.execute("SELECT id FROM batch_tasks WHERE id = ?", (task_id,))
         if not await cursor.fetchone():
             return False
         
-        # Get all term IDs for this task
-        cursor = await db.execute("SELECT id FROM terms WHERE task_id = ?", (task_id,))
-        term_ids = [row[0] for row in await cursor.fetchall()]
-        
-        # Delete associations for these terms
-        if term_ids:
-            placeholders = ",".join(["?" for _ in term_ids])
-            await db.execute(f"""
-                DELETE FROM term_associations WHERE source_term_id IN ({placeholders})
-            """, term_ids)
-        
-        # Delete terms
-        await db.execute("DELETE FROM terms WHERE task_id = ?", (task_id,))
+        await delete_terms_chunked(db, "SELECT id FROM terms WHERE task_id = ?", (task_id,))
         
         # Delete task
+        await db.execute("DELETE FROM crawl_jobs WHERE task_id = ?", (task_id,))
         await db.execute("DELETE FROM batch_tasks WHERE id = ?", (task_id,))
         
         await db.commit()
-        return True
+    request_space_reclaim()
+    return True
 
 async def reset_database() -> dict:
     """Reset database - delete all data but keep structure"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         # Get counts before deletion
         cursor = await db.execute("SELECT COUNT(*) FROM batch_tasks")
         task_count = (await cursor.fetchone())[0]
@@ -318,14 +1242,19 @@ async def reset_database() -> dict:
         assoc_count = (await cursor.fetchone())[0]
         
         # Delete all data
+        await db.execute("DELETE FROM term_lsh_buckets")
+        await db.execute("DELETE FROM term_signatures")
         await db.execute("DELETE FROM term_associations")
+        await db.execute("DELETE FROM vocabulary")
         await db.execute("DELETE FROM terms")
+        await db.execute("DELETE FROM crawl_jobs")
         await db.execute("DELETE FROM batch_tasks")
         
         # Reset auto-increment counters
-        await db.execute("DELETE FROM sqlite_sequence WHERE name IN ('batch_tasks', 'terms', 'term_associations')")
+        await db.execute("DELETE FROM sqlite_sequence WHERE name IN ('batch_tasks', 'terms')")
         
         await db.commit()
+        request_space_reclaim()
         
         return {
             "deleted_tasks": task_count,
@@ -333,9 +1262,202 @@ async def reset_database() -> dict:
             "deleted_associations": assoc_count
         }
 
+# ========== Space reclamation ==========
+
+# Free pages returned to the filesystem per incremental_vacuum step
+VACUUM_STEP_PAGES = 2000
+
+# Free pages tolerated before the reclaimer shrinks the file
+VACUUM_MIN_FREE_PAGES = 1000
+
+# Seconds between reclaimer runs when no large delete woke it up
+VACUUM_INTERVAL = 3600
+
+_reclaim_requested = asyncio.Event()
+
+def request_space_reclaim():
+    """Wake the background reclaimer after deleting many rows"""
+    _reclaim_requested.set()
+
+async def reclaim_free_space() -> int:
+    """Return free pages to the filesystem in small incremental_vacuum steps
+    
+    Needs auto_vacuum=INCREMENTAL (the default for new databases, see
+    init_database); older databases need a one-time vacuum_database().
+    Returns the number of pages reclaimed.
+    """
+    async with connect_db() as db:
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        if (await cursor.fetchone())[0] != 2:
+            return 0
+        reclaimed = 0
+        while True:
+            cursor = await db.execute("PRAGMA freelist_count")
+            free_pages = (await cursor.fetchone())[0]
+            if free_pages < VACUUM_MIN_FREE_PAGES:
+                break
+            # execute() would step the pragma once, freeing a single page;
+            # executescript runs it to completion (and commits)
+            await db.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})")
+            reclaimed += min(free_pages, VACUUM_STEP_PAGES)
+            await asyncio.sleep(0.1)
+        if reclaimed:
+            # Checkpoint so the main file actually shrinks
+            await db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        return reclaimed
+
+async def vacuum_database():
+    """Rebuild the database file with VACUUM, switching it to incremental auto-vacuum
+    
+    Holds the write lock for the whole rebuild; meant for maintenance windows.
+    """
+    async with connect_db() as db:
+        await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await db.execute("VACUUM")
+
+async def run_space_reclaimer(interval: int = VACUUM_INTERVAL):
+    """Reclaim free space after large deletes, and periodically"""
+    warned = False
+    while True:
+        try:
+            await asyncio.wait_for(_reclaim_requested.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        _reclaim_requested.clear()
+        try:
+            pages = await reclaim_free_space()
+            if pages:
+                print(f"✓ Reclaimed {pages} free database pages")
+            elif not warned and await _needs_vacuum_conversion():
+                warned = True
+                print("✗ Database was created without incremental auto-vacuum; "
+                      "POST /api/system/vacuum once to let it shrink after deletes")
+        except Exception as e:
+            print(f"✗ Error reclaiming database space: {str(e)}")
+
+async def _needs_vacuum_conversion() -> bool:
+    async with connect_db() as db:
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        mode = (await cursor.fetchone())[0]
+        cursor = await db.execute("PRAGMA freelist_count")
+        return mode != 2 and (await cursor.fetchone())[0] >= VACUUM_MIN_FREE_PAGES
+
+# ========== Summary compression ==========
+
+# Terms compressed per transaction by compress_stored_summaries
+COMPRESS_BATCH_SIZE = 2000
+
+# Seconds between checks for enough completed terms to train dictionaries on
+SUMMARY_TRAINING_INTERVAL = 3600
+
+async def train_summary_dictionaries(names: list = None) -> dict:
+    """Train a zstd dictionary per summary field from a random sample of the corpus
+    
+    names limits training to some dictionaries ('en', 'zh', 'translations').
+    Fields with fewer than MIN_TRAINING_SAMPLES compressible values are
+    skipped. Returns {name: samples used} for the dictionaries trained.
+    """
+    trained = {}
+    async with connect_db() as db:
+        for field, name in summary_codec.FIELD_DICTIONARIES.items():
+            if names is not None and name not in names:
+                continue
+            # Sample ids first, so only the sampled values get decompressed
+            cursor = await db.execute(f"""
+                SELECT unz({field}) FROM terms WHERE id IN (
+                    SELECT id FROM terms
+                    WHERE status = 'completed'
+                    AND (typeof({field}) = 'blob' OR LENGTH({field}) >= ?)
+                    ORDER BY RANDOM() LIMIT ?
+                )
+            """, (summary_codec.MIN_COMPRESS_CHARS, summary_codec.TRAINING_SAMPLES))
+            samples = [row[0] for row in await cursor.fetchall()]
+            if len(samples) < summary_codec.MIN_TRAINING_SAMPLES:
+                continue
+            dictionary = await asyncio.to_thread(summary_codec.train_dictionary, samples)
+            await db.execute("""
+                INSERT OR REPLACE INTO summary_dictionaries (dict_id, name, dictionary, samples)
+                VALUES (?, ?, ?, ?)
+            """, (summary_codec.dictionary_id(dictionary), name, dictionary, len(samples)))
+            trained[name] = len(samples)
+        await db.commit()
+        await load_summary_dictionaries(db)
+    return trained
+
+def _encode_rows(rows: list) -> list:
+    fields = list(summary_codec.FIELD_DICTIONARIES)
+    return [
+        tuple(encode_summary(value, field) for field, value in zip(fields, row[1:])) + tuple(row)
+        for row in rows
+    ]
+
+async def compress_stored_summaries() -> int:
+    """Compress summaries still stored as plain text with the active dictionaries
+    
+    Works in keyset chunks, one transaction each. A row is only rewritten if
+    its summaries are unchanged since they were read, so a term crawled in
+    the meantime keeps its new data. Returns the number of terms compressed.
+    """
+    if not summary_codec.active_dictionaries():
+        return 0
+    fields = list(summary_codec.FIELD_DICTIONARIES)
+    plain = " OR ".join(
+        f"(typeof({field}) = 'text' AND LENGTH({field}) >= {summary_codec.MIN_COMPRESS_CHARS})"
+        for field in fields
+    )
+    compressed = 0
+    last_id = 0
+    while True:
+        async with connect_db() as db:
+            cursor = await db.execute(f"""
+                SELECT id, {", ".join(fields)} FROM terms
+                WHERE id > ? AND ({plain})
+                ORDER BY id LIMIT ?
+            """, (last_id, COMPRESS_BATCH_SIZE))
+            rows = await cursor.fetchall()
+            if not rows:
+                break
+            updates = await asyncio.to_thread(_encode_rows, rows)
+            cursor = await db.executemany(f"""
+                UPDATE terms SET {", ".join(f"{field} = ?" for field in fields)}
+                WHERE id = ? AND {" AND ".join(f"{field} IS ?" for field in fields)}
+            """, updates)
+            compressed += cursor.rowcount
+            await db.commit()
+        last_id = rows[-1][0]
+        await asyncio.sleep(0)
+    if compressed:
+        request_space_reclaim()
+    return compressed
+
+async def run_summary_compression(interval: int = SUMMARY_TRAINING_INTERVAL):
+    """Train the summary dictionaries once the corpus is large enough, then compress existing summaries
+    
+    New summaries are compressed as they are written once a dictionary exists,
+    so this only has work to do until every dictionary is trained.
+    """
+    if not summary_codec.ZSTD_AVAILABLE:
+        return
+    names = set(summary_codec.FIELD_DICTIONARIES.values())
+    while True:
+        try:
+            missing = names - set(summary_codec.active_dictionaries())
+            if missing:
+                trained = await train_summary_dictionaries(sorted(missing))
+                if trained:
+                    print(f"✓ Trained summary dictionaries: {trained}")
+            compressed = await compress_stored_summaries()
+            if compressed:
+                print(f"✓ Compressed the summaries of {compressed} terms")
+        except Exception as e:
+            print(f"✗ Error compressing summaries: {str(e)}")
+        if names <= set(summary_codec.active_dictionaries()):
+            return
+        await asyncio.sleep(interval)
+
 async def get_corpus_statistics() -> dict:
     """Get overall corpus statistics"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         stats = {}
         
         # Total tasks
@@ -375,6 +1497,160 @@ async def get_corpus_statistics() -> dict:
         return stats
 
 
+async def index_term_signatures(items: list):
+    """Compute and store MinHash signatures and LSH buckets for terms
+    items: list of (term_id, text) tuples
+
+    Signatures for the whole batch are computed in one vectorized pass off the
+    event loop. Re-indexing a term replaces its previous signature and buckets.
+    """
+    if not items:
+        return
+    
+    term_ids = [term_id for term_id, _ in items]
+    signatures = await asyncio.to_thread(compute_signatures, [text for _, text in items])
+    
+    signature_rows = []
+    bucket_rows = []
+    for term_id, signature in zip(term_ids, signatures):
+        signature_rows.append((term_id, signature_to_blob(signature)))
+        # Empty summaries keep a signature (so they aren't re-indexed) but no buckets
+        if not is_empty_signature(signature):
+            for band, bucket in enumerate(band_hashes(signature)):
+                bucket_rows.append((band, bucket, term_id))
+    
+    async with connect_db() as db:
+        await db.executemany(
+            "DELETE FROM term_lsh_buckets WHERE term_id = ?",
+            [(term_id,) for term_id in term_ids]
+        )
+        await db.executemany("""
+            INSERT OR REPLACE INTO term_signatures (term_id, signature, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, signature_rows)
+        await db.executemany("""
+            INSERT INTO term_lsh_buckets (band, bucket, term_id)
+            VALUES (?, ?, ?)
+        """, bucket_rows)
+        await db.commit()
+
+# Seconds between background checks for completed terms missing a MinHash signature
+NEAR_DUPLICATE_INDEX_INTERVAL = 600
+
+async def refresh_near_duplicate_index(batch_size: int = 500) -> int:
+    """Index completed terms that don't have a MinHash signature yet
+    
+    Returns the number of newly indexed terms
+    """
+    indexed = 0
+    while True:
+        async with connect_db() as db:
+            cursor = await db.execute("""
+                SELECT t.id, unz(t.en_summary) FROM terms t
+                LEFT JOIN term_signatures s ON s.term_id = t.id
+                WHERE t.status = 'completed' AND s.term_id IS NULL
+                LIMIT ?
+            """, (batch_size,))
+            rows = await cursor.fetchall()
+        
+        if not rows:
+            return indexed
+        
+        await index_term_signatures([(row[0], row[1] or "") for row in rows])
+        indexed += len(rows)
+
+async def run_near_duplicate_indexer(interval: int = NEAR_DUPLICATE_INDEX_INTERVAL):
+    """Keep indexing completed terms without a MinHash signature
+
+    Crawls and dump imports index the terms they complete; this catches terms
+    from before the index existed, restored backups and other writers.
+    """
+    while True:
+        try:
+            indexed = await refresh_near_duplicate_index()
+            if indexed:
+                print(f"✓ Indexed {indexed} terms for near-duplicate detection")
+        except Exception as e:
+            print(f"✗ Error indexing near-duplicates: {str(e)}")
+        await asyncio.sleep(interval)
+
+async def find_near_duplicates(task_id: int = None, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """Find near-duplicate completed terms using the LSH index
+    
+    Candidates are terms sharing at least one LSH bucket; they are confirmed by
+    comparing full signatures against the threshold. Clusters keep their oldest
+    term. If task_id is given, only duplicates belonging to that task are
+    returned (they may duplicate terms from any task).
+    
+    Terms are indexed when crawled or imported, and older ones in the
+    background by run_near_duplicate_indexer; reads never backfill.
+    
+    Returns {duplicate_term_id: (kept_term_id, similarity)}
+    """
+    async with connect_db() as db:
+        if task_id:
+            # Start from the task's own bucket rows, so the cost follows the
+            # task's size rather than the corpus'
+            cursor = await db.execute("""
+                SELECT DISTINCT a.term_id, ta.task_id, b.term_id, tb.task_id
+                FROM terms ta
+                CROSS JOIN term_lsh_buckets a ON a.term_id = ta.id
+                CROSS JOIN term_lsh_buckets b
+                    ON b.band = a.band AND b.bucket = a.bucket AND b.term_id != a.term_id
+                CROSS JOIN terms tb ON tb.id = b.term_id AND tb.status = 'completed'
+                WHERE ta.task_id = ? AND ta.status = 'completed'
+            """, (task_id,))
+            # Each pair once, lower id first, as in the corpus-wide query
+            candidates = list({
+                (a_id, a_task, b_id, b_task) if a_id < b_id else (b_id, b_task, a_id, a_task)
+                for a_id, a_task, b_id, b_task in await cursor.fetchall()
+            })
+        else:
+            # CROSS JOIN pins the join order: left to itself, SQLite drives the query
+            # from idx_status and pairs every completed term with every other one
+            cursor = await db.execute("""
+                SELECT DISTINCT a.term_id, ta.task_id, b.term_id, tb.task_id
+                FROM term_lsh_buckets a
+                CROSS JOIN term_lsh_buckets b
+                    ON a.band = b.band AND a.bucket = b.bucket AND a.term_id < b.term_id
+                CROSS JOIN terms ta ON ta.id = a.term_id AND ta.status = 'completed'
+                CROSS JOIN terms tb ON tb.id = b.term_id AND tb.status = 'completed'
+            """)
+            candidates = await cursor.fetchall()
+        
+        if not candidates:
+            return {}
+        
+        term_task = {}
+        for a_id, a_task, b_id, b_task in candidates:
+            term_task[a_id] = a_task
+            term_task[b_id] = b_task
+        
+        # Load candidate signatures in bounded chunks to stay under the variable limit
+        signatures = {}
+        candidate_ids = list(term_task)
+        for i in range(0, len(candidate_ids), 500):
+            chunk = candidate_ids[i:i + 500]
+            placeholders = ",".join(["?" for _ in chunk])
+            cursor = await db.execute(f"""
+                SELECT term_id, signature FROM term_signatures WHERE term_id IN ({placeholders})
+            """, chunk)
+            for term_id, blob in await cursor.fetchall():
+                signatures[term_id] = blob_to_signature(blob)
+    
+    pairs = []
+    for a_id, _, b_id, _ in candidates:
+        if a_id in signatures and b_id in signatures:
+            similarity = estimate_similarity(signatures[a_id], signatures[b_id])
+            if similarity >= threshold:
+                pairs.append((a_id, b_id, similarity))
+    
+    duplicates = cluster_duplicates(pairs)
+    if task_id:
+        duplicates = {k: v for k, v in duplicates.items() if term_task.get(k) == task_id}
+    return duplicates
+
+
 async def analyze_data_quality(task_id: int = None, min_summary_length: int = 50) -> dict:
     """Analyze data quality for a specific task or all tasks
     
@@ -386,8 +1662,11 @@ async def analyze_data_quality(task_id: int = None, min_summary_length: int = 50
     - Summary too short (below min_summary_length)
     - Failed terms
     - Terms with associations
+    - Near-duplicate summaries (MinHash/LSH)
     """
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    near_duplicates = await find_near_duplicates(task_id)
+    
+    async with connect_db() as db:
         db.row_factory = aiosqlite.Row
         
         # Build WHERE clause based on task_id
@@ -459,7 +1738,7 @@ async def analyze_data_quality(task_id: int = None, min_summary_length: int = 50
             SELECT COUNT(*) FROM terms 
             WHERE status = 'completed' 
             AND en_summary IS NOT NULL 
-            AND LENGTH(en_summary) < ?
+            AND LENGTH(unz(en_summary)) < ?
             {task_filter}
         """, (min_summary_length,))
         quality['en_summary_too_short'] = (await cursor.fetchone())[0]
@@ -470,26 +1749,29 @@ async def analyze_data_quality(task_id: int = None, min_summary_length: int = 50
             WHERE status = 'completed' 
             AND zh_summary IS NOT NULL AND zh_summary != '' 
             AND zh_summary != 'Translation not found.'
-            AND LENGTH(zh_summary) < ?
+            AND LENGTH(unz(zh_summary)) < ?
             {task_filter}
         """, (min_summary_length,))
         quality['zh_summary_too_short'] = (await cursor.fetchone())[0]
         
+        # Near-duplicates of another completed term
+        quality['near_duplicates'] = len(near_duplicates)
+        
         # Get list of problematic terms for detailed view
         cursor = await db.execute(f"""
             SELECT id, term, 
                 CASE 
                     WHEN zh_summary IS NULL OR zh_summary = '' OR zh_summary = 'Translation not found.' THEN 'missing_chinese'
-                    WHEN LENGTH(en_summary) < ? THEN 'en_too_short'
-                    WHEN LENGTH(zh_summary) < ? THEN 'zh_too_short'
+                    WHEN LENGTH(unz(en_summary)) < ? THEN 'en_too_short'
+                    WHEN LENGTH(unz(zh_summary)) < ? THEN 'zh_too_short'
                     ELSE 'unknown'
                 END as issue_type
             FROM terms 
             WHERE status = 'completed' 
             AND (
                 zh_summary IS NULL OR zh_summary = '' OR zh_summary = 'Translation not found.'
-                OR LENGTH(en_summary) < ?
-                OR (zh_summary IS NOT NULL AND zh_summary != '' AND zh_summary != 'Translation not found.' AND LENGTH(zh_summary) < ?)
+                OR LENGTH(unz(en_summary)) < ?
+                OR (zh_summary IS NOT NULL AND zh_summary != '' AND zh_summary != 'Translation not found.' AND LENGTH(unz(zh_summary)) < ?)
             )
             {task_filter}
             LIMIT 50
@@ -518,98 +1800,117 @@ async def clean_task_data(
     remove_failed: bool = True,
     remove_missing_chinese: bool = False,
     remove_short_summaries: bool = False,
-    min_summary_length: int = 50
+    min_summary_length: int = 50,
+    remove_near_duplicates: bool = False
 ) -> dict:
     """Clean data by removing low-quality entries
     
+    remove_near_duplicates keeps the oldest term of each near-duplicate cluster.
     Returns count of removed items
     """
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    near_duplicates = await find_near_duplicates(task_id) if remove_near_duplicates else {}
+    
+    async with connect_db() as db:
         removed = {
             "failed_removed": 0,
             "missing_chinese_removed": 0,
             "short_summaries_removed": 0,
+            "near_duplicates_removed": 0,
             "total_removed": 0,
             "associations_removed": 0
         }
         
         task_filter = f"AND task_id = {task_id}" if task_id else ""
         
-        # Collect term IDs to delete
-        term_ids_to_delete = []
+        # Collect term IDs to delete in a temp table; INSERT OR IGNORE
+        # attributes each term to the first rule that matched it
+        await db.execute("CREATE TEMP TABLE clean_ids (id INTEGER PRIMARY KEY)")
         
         if remove_failed:
             cursor = await db.execute(f"""
+                INSERT OR IGNORE INTO clean_ids
                 SELECT id FROM terms WHERE status = 'failed' {task_filter}
             """)
-            failed_ids = [row[0] for row in await cursor.fetchall()]
-            term_ids_to_delete.extend(failed_ids)
-            removed['failed_removed'] = len(failed_ids)
+            removed['failed_removed'] = cursor.rowcount
         
         if remove_missing_chinese:
             cursor = await db.execute(f"""
+                INSERT OR IGNORE INTO clean_ids
                 SELECT id FROM terms 
                 WHERE status = 'completed' 
                 AND (zh_summary IS NULL OR zh_summary = '' OR zh_summary = 'Translation not found.')
                 {task_filter}
             """)
-            missing_ids = [row[0] for row in await cursor.fetchall()]
-            # Don't double-count
-            new_ids = [id for id in missing_ids if id not in term_ids_to_delete]
-            term_ids_to_delete.extend(new_ids)
-            removed['missing_chinese_removed'] = len(new_ids)
+            removed['missing_chinese_removed'] = cursor.rowcount
         
         if remove_short_summaries:
             cursor = await db.execute(f"""
+                INSERT OR IGNORE INTO clean_ids
                 SELECT id FROM terms 
                 WHERE status = 'completed' 
-                AND (LENGTH(en_summary) < ? OR 
-                     (zh_summary IS NOT NULL AND zh_summary != '' AND zh_summary != 'Translation not found.' AND LENGTH(zh_summary) < ?))
+                AND (LENGTH(unz(en_summary)) < ? OR 
+                     (zh_summary IS NOT NULL AND zh_summary != '' AND zh_summary != 'Translation not found.' AND LENGTH(unz(zh_summary)) < ?))
                 {task_filter}
             """, (min_summary_length, min_summary_length))
-            short_ids = [row[0] for row in await cursor.fetchall()]
-            new_ids = [id for id in short_ids if id not in term_ids_to_delete]
-            term_ids_to_delete.extend(new_ids)
-            removed['short_summaries_removed'] = len(new_ids)
-        
-        # Delete associations for these terms
-        if term_ids_to_delete:
-            placeholders = ",".join(["?" for _ in term_ids_to_delete])
-            
-            # Count associations before deletion
-            cursor = await db.execute(f"""
-                SELECT COUNT(*) FROM term_associations 
-                WHERE source_term_id IN ({placeholders})
-            """, term_ids_to_delete)
-            removed['associations_removed'] = (await cursor.fetchone())[0]
-            
-            # Delete associations
-            await db.execute(f"""
-                DELETE FROM term_associations WHERE source_term_id IN ({placeholders})
-            """, term_ids_to_delete)
-            
-            # Delete terms
-            await db.execute(f"""
-                DELETE FROM terms WHERE id IN ({placeholders})
-            """, term_ids_to_delete)
-            
-            await db.commit()
+            removed['short_summaries_removed'] = cursor.rowcount
+        
+        if remove_near_duplicates and near_duplicates:
+            cursor = await db.executemany(
+                "INSERT OR IGNORE INTO clean_ids (id) VALUES (?)",
+                [(term_id,) for term_id in near_duplicates]
+            )
+            removed['near_duplicates_removed'] = cursor.rowcount
+        
+        # Count associations before deletion
+        cursor = await db.execute("""
+            SELECT COUNT(*) FROM term_associations 
+            WHERE source_term_id IN (SELECT id FROM clean_ids)
+        """)
+        removed['associations_removed'] = (await cursor.fetchone())[0]
         
-        removed['total_removed'] = len(term_ids_to_delete)
+        removed['total_removed'] = await delete_terms_chunked(db, "SELECT id FROM clean_ids")
+        await db.execute("DROP TABLE clean_ids")
         
         # Update task counters if task_id specified
         if task_id:
             await update_task_counters(task_id)
         
-        return removed
+    if removed['total_removed']:
+        request_space_reclaim()
+    return removed
 
 
 async def get_terms_by_quality_issue(task_id: int = None, issue_type: str = "all", limit: int = 100) -> list:
     """Get terms with specific quality issues
     
-    issue_type can be: 'all', 'missing_chinese', 'short_en', 'short_zh', 'failed'
+    issue_type can be: 'all', 'missing_chinese', 'short_en', 'short_zh', 'failed', 'near_duplicate'
+    
+    near_duplicate rows carry extra 'duplicate_of' (kept term id) and 'similarity' keys.
     """
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    if issue_type == "near_duplicate":
+        near_duplicates = await find_near_duplicates(task_id)
+        duplicate_ids = sorted(near_duplicates)[:limit]
+        if not duplicate_ids:
+            return []
+        
+        async with connect_db() as db:
+            db.row_factory = aiosqlite.Row
+            placeholders = ",".join(["?" for _ in duplicate_ids])
+            cursor = await db.execute(f"""
+                SELECT * FROM terms WHERE id IN ({placeholders})
+                ORDER BY id
+            """, duplicate_ids)
+            rows = await cursor.fetchall()
+        
+        terms = []
+        for row in rows:
+            term = decode_term(dict(row))
+            term['duplicate_of'], similarity = near_duplicates[term['id']]
+            term['similarity'] = round(similarity, 3)
+            terms.append(term)
+        return terms
+    
+    async with connect_db() as db:
         db.row_factory = aiosqlite.Row
         
         task_filter = f"AND task_id = {task_id}" if task_id else ""
@@ -626,7 +1927,7 @@ async def get_terms_by_quality_issue(task_id: int = None, issue_type: str = "all
             query = f"""
                 SELECT * FROM terms 
                 WHERE status = 'completed' 
-                AND LENGTH(en_summary) < 50
+                AND LENGTH(unz(en_summary)) < 50
                 {task_filter}
                 LIMIT ?
             """
@@ -636,7 +1937,7 @@ async def get_terms_by_quality_issue(task_id: int = None, issue_type: str = "all
                 WHERE status = 'completed' 
                 AND zh_summary IS NOT NULL AND zh_summary != '' 
                 AND zh_summary != 'Translation not found.'
-                AND LENGTH(zh_summary) < 50
+                AND LENGTH(unz(zh_summary)) < 50
                 {task_filter}
                 LIMIT ?
             """
@@ -653,7 +1954,7 @@ async def get_terms_by_quality_issue(task_id: int = None, issue_type: str = "all
                 WHERE (
                     status = 'failed'
                     OR (status = 'completed' AND (zh_summary IS NULL OR zh_summary = '' OR zh_summary = 'Translation not found.'))
-                    OR (status = 'completed' AND LENGTH(en_summary) < 50)
+                    OR (status = 'completed' AND LENGTH(unz(en_summary)) < 50)
                 )
                 {task_filter}
                 LIMIT ?
@@ -661,13 +1962,45 @@ async def get_terms_by_quality_issue(task_id: int = None, issue_type: str = "all
         
         cursor = await db.execute(query, (limit,))
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return [decode_term(dict(row)) for row in rows]
+
 
 
+async def take_rate_limit_token(host: str, rate: float, burst: float) -> float:
+    """Take one token from the cross-process bucket of a host
+    
+    Returns 0 if a token was taken, otherwise the seconds to wait before retrying.
+    """
+    async with connect_db() as db:
+        # IMMEDIATE takes the write lock up front so concurrent processes serialize
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute(
+            "SELECT tokens, updated_at FROM rate_limit_buckets WHERE host = ?", (host,)
+        )
+        row = await cursor.fetchone()
+        now = time.time()
+        tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+        
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        
+        await db.execute("""
+            INSERT INTO rate_limit_buckets (host, tokens, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(host) DO UPDATE SET
+                tokens = excluded.tokens,
+                updated_at = excluded.updated_at
+        """, (host, tokens, now))
+        await db.commit()
+        return wait
+
 
 async def get_system_setting(key: str, default: str = None) -> str:
     """Get a system setting value by key"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT value FROM system_settings WHERE key = ?",
@@ -680,7 +2013,7 @@ async def get_system_setting(key: str, default: str = None) -> str:
 
 async def update_system_setting(key: str, value: str):
     """Update or insert a system setting"""
-    async with aiosqlite.connect(DATABASE_FILE) as db:
+    async with connect_db() as db:
         await db.execute("""
             INSERT INTO system_settings (key, value, updated_at)
             VALUES (?, ?, datetime('now'))
@@ -0,0 +1,687 @@
+"""Offline corpus build from local Wikipedia dump files
+
+Fills a batch task from dumps instead of the live API, producing the same
+term rows, translations, associations and Markdown output as BatchCrawler:
+
+    python dump_import.py --terms topics.txt --languages en,zh \\
+        --dump en=enwiki-latest-pages-articles-multistream.xml.bz2 \\
+        --index en=enwiki-latest-pages-articles-multistream-index.txt.bz2 \\
+        --dump zh=zhwiki-latest-cirrussearch-content.json.gz \\
+        --langlinks enwiki-latest-langlinks.sql.gz \\
+        --categorylinks enwiki-latest-categorylinks.sql.gz \\
+        --pagelinks enwiki-latest-pagelinks.sql.gz \\
+        --linktarget enwiki-latest-linktarget.sql.gz
+
+Page dumps may be pages-articles XML (.xml, .bz2) or CirrusSearch JSON
+(.json, .gz). With a multistream index only the bz2 streams holding wanted
+titles are read, in parallel; otherwise the dump is streamed once and page
+text is cleaned in a process pool. SQL dumps are scanned in parallel and
+filtered by page id. langlinks, categorylinks and pagelinks are English
+dumps: like the crawler, associations come from the English page. Newer
+dumps that reference titles through linktarget need --linktarget.
+"""
+import argparse
+import asyncio
+import bz2
+import gzip
+import html
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, List
+from urllib.parse import quote
+
+from database import (
+    init_database,
+    create_batch_task,
+    add_terms_to_task,
+    get_task_status,
+    get_task_terms,
+    update_task_status,
+    update_task_counters,
+    save_imported_terms,
+    index_term_signatures
+)
+from markdown_writer import get_markdown_writer, close_markdown_writer, render_markdown
+from scheduler import build_associations, discover_terms, SUPPORTED_LANGUAGES
+from wiki_client import truncate_summary
+from zh_convert import ZH_VARIANTS, get_zh_converter, close_zh_converter
+
+NOT_FOUND = 'Translation not found.'
+
+# INSERT lines / pages handed to a pool worker at once, and chunks in flight
+SQL_LINES_PER_CHUNK = 4
+PAGES_PER_CHUNK = 200
+CHUNKS_IN_FLIGHT = 32
+
+
+# ---------------------------------------------------------------------------
+# Titles and text
+
+def normalize_title(title: str) -> str:
+    """Canonical form of a page title: spaces, trimmed, first letter uppercase"""
+    title = title.replace('_', ' ').strip()
+    title = re.sub(r' +', ' ', title)
+    return title[:1].upper() + title[1:]
+
+
+def page_url(lang: str, title: str) -> str:
+    return f"https://{lang}.wikipedia.org/wiki/" + quote(title.replace(' ', '_'), safe="/:(),'!*@$;")
+
+
+def open_dump(path: str):
+    """Open a dump file for binary reading, decompressing by extension"""
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+_NESTED = [
+    re.compile(r'\{\{[^{}]*\}\}'),  # templates
+    re.compile(r'\{\|.*?\|\}', re.S),  # tables
+    re.compile(r'\[\[(?:File|Image|Category|[a-z\-]{2,12}):[^\[\]]*\]\]', re.I),  # files, categories, interwiki
+]
+_LINK_PIPED = re.compile(r'\[\[[^\[\]|]*\|([^\[\]]*)\]\]')
+_LINK = re.compile(r'\[\[([^\[\]|]*)\]\]')
+_EXT_LINK = re.compile(r'\[(?:https?:)?//[^\s\]]+ ?([^\]]*)\]')
+_REF = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', re.S | re.I)
+_COMMENT = re.compile(r'<!--.*?-->', re.S)
+_TAG = re.compile(r'</?[a-zA-Z][^>]*>')
+_HEADING = re.compile(r'^=+[^=\n].*?=+\s*$', re.M)
+
+
+def wikitext_lead_to_text(wikitext: str) -> str:
+    """Plain text of the lead section of a page's wikitext
+
+    A best-effort equivalent of the API's explaintext extract: markup,
+    templates, references, tables and files are dropped, links keep their
+    label.
+    """
+    heading = _HEADING.search(wikitext)
+    text = wikitext[:heading.start()] if heading else wikitext
+
+    text = _COMMENT.sub('', text)
+    text = _REF.sub('', text)
+
+    # Innermost constructs first, until nothing nested is left
+    while True:
+        previous = text
+        text = _LINK_PIPED.sub(r'\1', text)
+        text = _LINK.sub(lambda m: '' if ':' in m.group(1) else m.group(1), text)
+        for pattern in _NESTED:
+            text = pattern.sub('', text)
+        if text == previous:
+            break
+
+    text = _EXT_LINK.sub(r'\1', text)
+    text = _TAG.sub('', text)
+    text = text.replace("'''", '').replace("''", '')
+    text = html.unescape(text)
+
+    paragraphs = []
+    for line in text.split('\n'):
+        line = re.sub(r'[ \t]+', ' ', line).strip()
+        # Spaces left in front of punctuation by removed templates
+        line = re.sub(r' ([.,;:])', r'\1', line)
+        # Leftover list/indent markup and magic words
+        if line and not line.startswith(('__', '|', '!', '{', '}')):
+            paragraphs.append(line)
+    return '\n'.join(paragraphs)
+
+
+# ---------------------------------------------------------------------------
+# Pool workers (module level so they can be pickled)
+
+_wanted = frozenset()
+
+
+def _init_pool(wanted):
+    global _wanted
+    _wanted = wanted
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _page_from_element(elem) -> Dict:
+    page = {'id': None, 'title': '', 'ns': 0, 'redirect': None, 'text': ''}
+    for child in elem:
+        name = _local(child.tag)
+        if name == 'title':
+            page['title'] = child.text or ''
+        elif name == 'ns':
+            page['ns'] = int(child.text or 0)
+        elif name == 'id':
+            page['id'] = int(child.text)
+        elif name == 'redirect':
+            page['redirect'] = child.get('title')
+        elif name == 'revision':
+            for part in child:
+                if _local(part.tag) == 'text':
+                    page['text'] = part.text or ''
+    return page
+
+
+def _summarize(page: Dict) -> Dict:
+    """Replace a parsed page's wikitext by its lead-section summary"""
+    text = page.pop('text', '')
+    page['summary'] = '' if page['redirect'] else wikitext_lead_to_text(text)
+    page['categories'] = None
+    page['links'] = None
+    return page
+
+
+def _summarize_pages(pages: List[Dict]) -> List[Dict]:
+    return [_summarize(page) for page in pages]
+
+
+def _read_multistream(args) -> List[Dict]:
+    """Decompress one bz2 stream of a multistream dump and return wanted pages"""
+    path, offset = args
+    decompressor = bz2.BZ2Decompressor()
+    data = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while not decompressor.eof:
+            block = f.read(256 * 1024)
+            if not block:
+                break
+            data.append(decompressor.decompress(block))
+
+    root = ET.fromstring(b'<pages>' + b''.join(data) + b'</pages>')
+    pages = []
+    for elem in root:
+        if _local(elem.tag) != 'page':
+            continue
+        page = _page_from_element(elem)
+        if page['ns'] == 0 and normalize_title(page['title']) in _wanted:
+            pages.append(_summarize(page))
+    return pages
+
+
+# outgoing_link covers every namespace; only article links become associations
+_NAMESPACE_PREFIX = re.compile(
+    r'^(?:(?:User|Wikipedia|File|MediaWiki|Template|Help|Category|Portal|Draft|TimedText|Module)'
+    r'(?:[ _]talk)?|Talk|Special|Media|Image|WP|Project):', re.IGNORECASE
+)
+
+
+def _read_cirrus(lines: List[bytes]) -> List[Dict]:
+    """Parse CirrusSearch bulk lines (action line, document line) and return wanted pages"""
+    pages = []
+    for i in range(0, len(lines) - 1, 2):
+        action = json.loads(lines[i])
+        doc = json.loads(lines[i + 1])
+        if doc.get('namespace', 0) != 0:
+            continue
+        redirects = [normalize_title(r['title']) for r in doc.get('redirect', []) if r.get('namespace', 0) == 0]
+        title = normalize_title(doc.get('title', ''))
+        if title not in _wanted and not _wanted.intersection(redirects):
+            continue
+        page_id = action.get('index', {}).get('_id') or doc.get('page_id')
+        pages.append({
+            'id': int(page_id) if page_id is not None else None,
+            'title': doc.get('title', ''),
+            'redirect': None,
+            'aliases': redirects,
+            'summary': (doc.get('opening_text') or '').strip(),
+            'categories': ['Category:' + normalize_title(c) for c in doc.get('category', [])],
+            # Sorted like the API and read_links (by database key), since only
+            # the first ASSOCIATION_LINK_LIMIT links are kept
+            'links': sorted((normalize_title(l) for l in doc.get('outgoing_link', [])
+                             if not _NAMESPACE_PREFIX.match(l)),
+                            key=lambda t: t.replace(' ', '_'))
+        })
+    return pages
+
+
+_SQL_TOKEN = re.compile(rb"'((?:[^'\\]|\\.)*)'|(NULL)|(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)|(\),\()")
+_SQL_ESCAPES = {b'0': b'\0', b'n': b'\n', b'r': b'\r', b't': b'\t', b'Z': b'\x1a'}
+
+
+def _sql_unescape(value: bytes) -> str:
+    value = re.sub(rb'\\(.)', lambda m: _SQL_ESCAPES.get(m.group(1), m.group(1)), value)
+    return value.decode('utf-8', errors='replace')
+
+
+def _scan_sql_lines(args) -> List[tuple]:
+    """Parse INSERT lines, keeping rows whose filter column is in the wanted set
+
+    args: (lines, index of the filter column, indexes of the kept columns)
+    """
+    lines, filter_index, keep = args
+    rows = []
+    for line in lines:
+        start = line.find(b' VALUES (')
+        if start == -1:
+            continue
+        row = []
+        for match in _SQL_TOKEN.finditer(line, start + 9):
+            text, null, number, separator = match.groups()
+            if separator is not None:
+                if row[filter_index] in _wanted:
+                    rows.append(tuple(row[i] for i in keep))
+                row = []
+            elif text is not None:
+                row.append(_sql_unescape(text))
+            elif null is not None:
+                row.append(None)
+            else:
+                row.append(int(number) if number.lstrip(b'-').isdigit() else float(number))
+        if row and row[filter_index] in _wanted:
+            rows.append(tuple(row[i] for i in keep))
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Importer
+
+def _run_chunks(executor, fn, chunks: Iterable, window: int = CHUNKS_IN_FLIGHT):
+    """Map fn over chunks in the pool with a bounded number in flight; yields results unordered"""
+    pending = set()
+    for chunk in chunks:
+        pending.add(executor.submit(fn, chunk))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in pending:
+        yield future.result()
+
+
+def _batched(items: Iterable, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DumpImporter:
+    """Looks up pages, language links, categories and links in local dumps"""
+
+    def __init__(self, dumps: Dict[str, str], indexes: Dict[str, str] = None,
+                 langlinks: str = None, categorylinks: str = None, pagelinks: str = None,
+                 linktarget: str = None, processes: int = None):
+        self.dumps = dumps
+        self.indexes = indexes or {}
+        self.langlinks = langlinks
+        self.categorylinks = categorylinks
+        self.pagelinks = pagelinks
+        self.linktarget = linktarget
+        self.processes = processes or os.cpu_count() or 2
+
+    def _pool(self, wanted) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.processes, initializer=_init_pool,
+                                   initargs=(frozenset(wanted),))
+
+    # Pages -----------------------------------------------------------------
+
+    def find_pages(self, lang: str, titles: Iterable[str]) -> Dict[str, Dict]:
+        """Find pages by title in a language's dump, following redirects
+
+        Returns {normalized requested title: page}; titles without a page
+        are missing from the result.
+        """
+        wanted = {normalize_title(t) for t in titles if t}
+        if lang not in self.dumps or not wanted:
+            return {}
+
+        found = {}
+        for page in self._scan_pages(lang, wanted):
+            for alias in [normalize_title(page['title'])] + page.get('aliases', []):
+                if alias in wanted:
+                    found[alias] = page
+
+        # XML dumps store redirects as pages of their own: one more pass for the targets
+        redirects = {title: normalize_title(page['redirect'].split('#')[0])
+                     for title, page in found.items() if page['redirect']}
+        if redirects:
+            targets = {}
+            for page in self._scan_pages(lang, set(redirects.values())):
+                targets[normalize_title(page['title'])] = page
+            for title, target in redirects.items():
+                if target in targets and not targets[target]['redirect']:
+                    found[title] = targets[target]
+                else:
+                    del found[title]
+        return found
+
+    def _scan_pages(self, lang: str, wanted: set) -> List[Dict]:
+        path = self.dumps[lang]
+        with self._pool(wanted) as pool:
+            if '.json' in path or 'cirrus' in os.path.basename(path):
+                with open_dump(path) as f:
+                    # Even chunk sizes keep action and document lines together
+                    results = _run_chunks(pool, _read_cirrus, _batched(f, PAGES_PER_CHUNK * 2))
+                    return [page for chunk in results for page in chunk]
+            if lang in self.indexes:
+                offsets = self._stream_offsets(self.indexes[lang], wanted)
+                results = _run_chunks(pool, _read_multistream, ((path, offset) for offset in offsets))
+            else:
+                pages = self._iter_xml_pages(path, wanted)
+                results = _run_chunks(pool, _summarize_pages, _batched(pages, PAGES_PER_CHUNK))
+            return [page for chunk in results for page in chunk]
+
+    @staticmethod
+    def _stream_offsets(index_path: str, wanted: set) -> List[int]:
+        """Offsets of the multistream blocks holding wanted titles (index lines: offset:id:title)"""
+        offsets = set()
+        with open_dump(index_path) as f:
+            for line in f:
+                offset, _, title = line.decode('utf-8').rstrip('\n').split(':', 2)
+                if normalize_title(title) in wanted:
+                    offsets.add(int(offset))
+        return sorted(offsets)
+
+    @staticmethod
+    def _iter_xml_pages(path: str, wanted: set):
+        """Stream a (non-multistream) XML dump, yielding wanted main-namespace pages"""
+        with open_dump(path) as f:
+            root = None
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                if event != 'end' or _local(elem.tag) != 'page':
+                    continue
+                page = _page_from_element(elem)
+                if page['ns'] == 0 and normalize_title(page['title']) in wanted:
+                    yield page
+                # Drop parsed pages so memory stays flat over the whole dump
+                root.clear()
+
+    # SQL link tables --------------------------------------------------------
+
+    def scan_sql(self, path: str, filter_column: str, wanted: set, keep: List[str]) -> List[tuple]:
+        """Rows of a MySQL dump whose filter_column is in wanted, as tuples of the kept columns"""
+        columns = self._columns(path)
+        missing = [c for c in [filter_column] + keep if c not in columns]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)} has no column(s) {', '.join(missing)}")
+
+        args = (columns.index(filter_column), [columns.index(c) for c in keep])
+        with open_dump(path) as f, self._pool(wanted) as pool:
+            inserts = (line for line in f if line.startswith(b'INSERT INTO'))
+            chunks = ((lines, *args) for lines in _batched(inserts, SQL_LINES_PER_CHUNK))
+            return [row for rows in _run_chunks(pool, _scan_sql_lines, chunks) for row in rows]
+
+    @staticmethod
+    def _columns(path: str) -> List[str]:
+        """Column names from the CREATE TABLE statement of a MySQL dump"""
+        columns = []
+        with open_dump(path) as f:
+            for line in f:
+                if line.startswith(b'  `'):
+                    columns.append(line.split(b'`')[1].decode())
+                elif line.startswith(b'INSERT INTO'):
+                    break
+        return columns
+
+    def _resolve_targets(self, target_ids: set, namespace: int) -> Dict[int, str]:
+        """Map linktarget ids to titles in the given namespace"""
+        if not self.linktarget:
+            raise ValueError("This dump references titles through linktarget; pass --linktarget")
+        rows = self.scan_sql(self.linktarget, 'lt_id', target_ids, ['lt_id', 'lt_namespace', 'lt_title'])
+        return {lt_id: title for lt_id, ns, title in rows if ns == namespace}
+
+    def read_langlinks(self, page_ids: set) -> Dict[int, Dict[str, str]]:
+        langlinks = {}
+        if self.langlinks and page_ids:
+            for page_id, lang, title in self.scan_sql(self.langlinks, 'll_from', page_ids,
+                                                      ['ll_from', 'll_lang', 'll_title']):
+                langlinks.setdefault(page_id, {})[lang] = title
+        return langlinks
+
+    def read_categories(self, page_ids: set) -> Dict[int, List[str]]:
+        categories = {}
+        if not self.categorylinks or not page_ids:
+            return categories
+        if 'cl_to' in self._columns(self.categorylinks):
+            rows = self.scan_sql(self.categorylinks, 'cl_from', page_ids, ['cl_from', 'cl_to'])
+        else:
+            rows = self.scan_sql(self.categorylinks, 'cl_from', page_ids, ['cl_from', 'cl_target_id'])
+            titles = self._resolve_targets({target for _, target in rows}, 14)
+            rows = [(page_id, titles[target]) for page_id, target in rows if target in titles]
+        for page_id, title in rows:
+            categories.setdefault(page_id, []).append('Category:' + normalize_title(title))
+        return categories
+
+    def read_links(self, page_ids: set) -> Dict[int, List[str]]:
+        links = {}
+        if not self.pagelinks or not page_ids:
+            return links
+        if 'pl_title' in self._columns(self.pagelinks):
+            rows = self.scan_sql(self.pagelinks, 'pl_from', page_ids, ['pl_from', 'pl_namespace', 'pl_title'])
+            rows = [(page_id, title) for page_id, ns, title in rows if ns == 0]
+        else:
+            rows = self.scan_sql(self.pagelinks, 'pl_from', page_ids, ['pl_from', 'pl_target_id'])
+            titles = self._resolve_targets({target for _, target in rows}, 0)
+            rows = [(page_id, titles[target]) for page_id, target in rows if target in titles]
+        for page_id, title in rows:
+            links.setdefault(page_id, []).append(title)
+        # Same order as the API: by title
+        return {page_id: [normalize_title(t) for t in sorted(titles)] for page_id, titles in links.items()}
+
+    # Building terms ---------------------------------------------------------
+
+    def lookup_terms(self, terms: List[str], languages: List[str]) -> Dict[str, Dict]:
+        """Collect everything needed to build the given terms
+
+        Returns {normalized term: {'page': en page, 'langlinks': {...},
+        'pages': {lang: page}, 'categories': [...], 'links': [...]}} for the
+        terms found in the English dump.
+        """
+        en_pages = self.find_pages('en', terms)
+        page_ids = {page['id'] for page in en_pages.values() if page['id'] is not None}
+
+        other_langs = {('zh' if lang in ZH_VARIANTS else lang) for lang in languages if lang != 'en'}
+        langlinks = self.read_langlinks(page_ids) if other_langs else {}
+
+        # Cirrus pages carry their own categories and links
+        need_sql = {page['id'] for page in en_pages.values() if page['categories'] is None}
+        categories = self.read_categories(need_sql)
+        links = self.read_links(need_sql)
+
+        translated = {}
+        for lang in other_langs:
+            titles = {langlinks.get(page['id'], {}).get(lang) for page in en_pages.values()}
+            translated[lang] = self.find_pages(lang, titles - {None})
+
+        found = {}
+        for key, page in en_pages.items():
+            page_langlinks = langlinks.get(page['id'], {})
+            found[key] = {
+                'page': page,
+                'langlinks': page_langlinks,
+                'pages': {lang: translated[lang].get(normalize_title(page_langlinks[lang]))
+                          for lang in other_langs if lang in page_langlinks},
+                'categories': page['categories'] if page['categories'] is not None else categories.get(page['id'], []),
+                'links': page['links'] if page['links'] is not None else links.get(page['id'], [])
+            }
+        return found
+
+
+async def convert_zh_summaries(entries: List[Dict], languages: List[str]) -> List[Dict[str, str]]:
+    """Chinese summaries of looked-up terms in each wanted script, in one batch
+
+    Returns {locale: converted} per entry, empty for entries without a zh page.
+    """
+    locales = [ZH_VARIANTS[lang] for lang in languages if lang in ZH_VARIANTS]
+    with_zh = [i for i, entry in enumerate(entries) if entry['pages'].get('zh')]
+    converted = [{} for _ in entries]
+    if locales and with_zh:
+        texts = [truncate_summary(entries[i]['pages']['zh']['summary']) for i in with_zh]
+        for i, variants in zip(with_zh, await get_zh_converter().convert_many(texts, locales)):
+            converted[i] = variants
+    return converted
+
+
+def build_translations(entry: Dict, languages: List[str], converted: Dict[str, str]) -> Dict:
+    """Translations dict in the crawler's format for one looked-up term
+
+    converted holds the term's zh summary per locale (see convert_zh_summaries).
+    """
+    translations = {}
+    zh_page = entry['pages'].get('zh')
+
+    for lang in languages:
+        if lang == 'en':
+            page = entry['page']
+            translations['en'] = {'summary': truncate_summary(page['summary']), 'url': page_url('en', page['title'])}
+        elif lang in ZH_VARIANTS:
+            translations[lang] = ({'summary': converted[ZH_VARIANTS[lang]], 'url': page_url('zh', zh_page['title'])}
+                                  if zh_page else {'summary': NOT_FOUND, 'url': ''})
+        elif entry['pages'].get(lang):
+            page = entry['pages'][lang]
+            translations[lang] = {'summary': truncate_summary(page['summary']), 'url': page_url(lang, page['title'])}
+        else:
+            translations[lang] = {'summary': NOT_FOUND, 'url': ''}
+    return translations
+
+
+async def import_task(importer: DumpImporter, task_id: int):
+    """Build every pending term of a task from the dumps, level by level"""
+    task = await get_task_status(task_id)
+    languages = (task['target_languages'] or 'en,zh').split(',')
+    max_depth = task['max_depth'] or 1
+
+    if 'en' not in importer.dumps:
+        raise ValueError("An English page dump (--dump en=...) is required")
+    for lang in languages:
+        dump_lang = 'zh' if lang in ZH_VARIANTS else lang
+        if dump_lang != 'en' and dump_lang not in importer.dumps:
+            print(f"✗ No dump for '{dump_lang}': its translations will be marked not found")
+
+    # The task stays 'pending' while building so crawl workers leave its terms alone
+    writer = await get_markdown_writer()
+
+    attempted = built = 0
+    for depth in range(max_depth):
+        level = [t for t in await get_task_terms(task_id, 'pending') if (t['depth_level'] or 0) == depth]
+        if not level:
+            continue
+        print(f"Building {len(level)} terms at depth {depth}...")
+
+        found = await asyncio.to_thread(importer.lookup_terms, [t['term'] for t in level], languages)
+        entries = [found.get(normalize_title(t['term'])) for t in level]
+        zh_converted = iter(await convert_zh_summaries([e for e in entries if e is not None], languages))
+
+        rows = []
+        for term_record, entry in zip(level, entries):
+            if entry is None:
+                rows.append({
+                    'id': term_record['id'],
+                    'status': 'failed',
+                    'error_message': f"Term '{term_record['term']}' not found in English Wikipedia dump"
+                })
+                continue
+
+            translations = build_translations(entry, languages, next(zh_converted))
+            result = {
+                "term": term_record['term'],
+                "en_summary": truncate_summary(entry['page']['summary']),
+                "en_url": page_url('en', entry['page']['title']),
+                "zh_summary": translations.get('zh', {}).get('summary', NOT_FOUND),
+                "zh_url": translations.get('zh', {}).get('url', ''),
+                "translations": translations,
+                "associations": build_associations(entry['categories'], entry['links'])
+            }
+            await writer.submit(result['term'], render_markdown(result, SUPPORTED_LANGUAGES))
+            rows.append({
+                'id': term_record['id'],
+                'status': 'completed',
+                'en_summary': result['en_summary'],
+                'en_url': result['en_url'],
+                'zh_summary': result['zh_summary'],
+                'zh_url': result['zh_url'],
+                'translations': json.dumps(translations, ensure_ascii=False),
+                'associations': result['associations']
+            })
+
+        await save_imported_terms(rows)
+        await index_term_signatures([(r['id'], r['en_summary']) for r in rows if r['status'] == 'completed'])
+        completed = [r for r in rows if r['status'] == 'completed']
+        attempted += len(rows)
+        built += len(completed)
+        print(f"✓ Depth {depth}: {len(completed)} built, {len(rows) - len(completed)} not found")
+
+        # Depth crawling, as in BatchCrawler.process_term
+        if depth + 1 < max_depth:
+            existing_set = {t['term'].lower() for t in await get_task_terms(task_id)}
+            for row in completed:
+                new_terms = discover_terms(row['associations'], existing_set)
+                if new_terms:
+                    await add_terms_to_task(task_id, new_terms, depth + 1, row['id'])
+
+    await update_task_counters(task_id)
+    if attempted and not built:
+        await update_task_status(task_id, "failed")
+        print(f"✗ Task {task_id}: none of its {attempted} terms were found in the dumps")
+        return
+    await update_task_status(task_id, "completed")
+    print(f"✓ Task {task_id} built from dumps")
+
+
+def _lang_paths(values: List[str]) -> Dict[str, str]:
+    paths = {}
+    for value in values or []:
+        lang, _, path = value.partition('=')
+        if not path:
+            raise SystemExit(f"Expected LANG=PATH, got '{value}'")
+        paths[lang] = path
+    return paths
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Build a batch task from local Wikipedia dumps")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--terms", help="Text file with one term per line (creates a new task)")
+    source.add_argument("--task-id", type=int, help="Build the pending terms of an existing task")
+    parser.add_argument("--languages", default="en,zh", help="Target languages for a new task")
+    parser.add_argument("--max-depth", type=int, default=1, help="Crawl depth for a new task")
+    parser.add_argument("--dump", action="append", required=True, metavar="LANG=PATH",
+                        help="pages-articles XML or CirrusSearch JSON dump of a language")
+    parser.add_argument("--index", action="append", metavar="LANG=PATH", help="Multistream index of a dump")
+    parser.add_argument("--langlinks", help="English langlinks SQL dump")
+    parser.add_argument("--categorylinks", help="English categorylinks SQL dump")
+    parser.add_argument("--pagelinks", help="English pagelinks SQL dump")
+    parser.add_argument("--linktarget", help="English linktarget SQL dump (newer link table format)")
+    parser.add_argument("--processes", type=int, help="Parser processes (default: CPU count)")
+    args = parser.parse_args()
+
+    await init_database()
+
+    task_id = args.task_id
+    if args.terms:
+        with open(args.terms, encoding='utf-8') as f:
+            terms = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+        task_id = await create_batch_task(len(terms), 0, args.max_depth, args.languages)
+        await add_terms_to_task(task_id, terms)
+        print(f"✓ Created task {task_id} with {len(terms)} terms")
+
+    importer = DumpImporter(
+        _lang_paths(args.dump), _lang_paths(args.index),
+        args.langlinks, args.categorylinks, args.pagelinks, args.linktarget, args.processes
+    )
+    try:
+        await import_task(importer, task_id)
+    except Exception as e:
+        print(f"✗ Import failed: {str(e)}")
+        await update_task_counters(task_id)
+        await update_task_status(task_id, "failed")
+        raise
+    finally:
+        await close_markdown_writer()
+        close_zh_converter()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,197 @@
+"""Streamed exports of the association graph for network-analysis tools
+
+GraphML and GEXF (Gephi, networkx, igraph, Cytoscape) and an edge-list CSV
+are written while rows come off a database cursor, so memory stays flat
+whatever the size of the graph. The .npz export is a CSR adjacency matrix
+for NumPy/SciPy; its arrays are assembled in memory, a few dozen bytes per
+edge, and written to a temporary file.
+
+Nodes are the terms in scope plus the association targets that aren't
+terms in scope (categories and uncrawled link targets), with ids
+'t<term id>' and 'v<vocabulary id>'.
+"""
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from typing import List
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+from database import iter_graph_nodes, iter_graph_edges, ASSOCIATION_TYPES, ASSOCIATION_KINDS
+
+# format -> (media type, file suffix)
+GRAPH_EXPORT_FORMATS = {
+    "graphml": ("application/graphml+xml", ".graphml"),
+    "gexf": ("application/gexf+xml", ".gexf"),
+    "csv": ("text/csv", ".csv"),
+    "npz": ("application/octet-stream", ".npz"),
+}
+
+# Node types in the .npz node_type array
+NODE_TYPES = {"term": 0, **ASSOCIATION_KINDS}
+
+GRAPHML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+  <key id="label" for="node" attr.name="label" attr.type="string"/>
+  <key id="type" for="node" attr.name="type" attr.type="string"/>
+  <key id="status" for="node" attr.name="status" attr.type="string"/>
+  <key id="depth" for="node" attr.name="depth" attr.type="int"/>
+  <key id="task" for="node" attr.name="task" attr.type="int"/>
+  <key id="kind" for="edge" attr.name="kind" attr.type="string"/>
+  <key id="weight" for="edge" attr.name="weight" attr.type="double"/>
+  <graph id="associations" edgedefault="directed">
+"""
+
+GEXF_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<gexf xmlns="http://gexf.net/1.3" version="1.3">
+  <graph defaultedgetype="directed" mode="static">
+    <attributes class="node">
+      <attribute id="type" title="type" type="string"/>
+      <attribute id="status" title="status" type="string"/>
+      <attribute id="depth" title="depth" type="integer"/>
+      <attribute id="task" title="task" type="integer"/>
+    </attributes>
+    <attributes class="edge">
+      <attribute id="kind" title="kind" type="string"/>
+    </attributes>
+    <nodes>
+"""
+
+
+def node_id(node_type: str, row_id: int) -> str:
+    return f"t{row_id}" if node_type == "term" else f"v{row_id}"
+
+
+def edge_ends(edge: tuple) -> tuple:
+    source, target_term, target_vocabulary = edge[:3]
+    return f"t{source}", f"t{target_term}" if target_term is not None else f"v{target_vocabulary}"
+
+
+def _node_fields(node: tuple) -> list:
+    """(name, value) attributes of a node row, without the missing ones"""
+    node_type, _, _, status, depth, task_id = node
+    fields = [("type", node_type), ("status", status), ("depth", depth), ("task", task_id)]
+    return [(name, value) for name, value in fields if value is not None]
+
+
+async def stream_graphml(task_ids: List[int] = None):
+    yield GRAPHML_HEADER
+    async for nodes in iter_graph_nodes(task_ids):
+        yield "".join(
+            f'    <node id="{node_id(node[0], node[1])}"><data key="label">{escape(node[2])}</data>'
+            + "".join(f'<data key="{name}">{escape(str(value))}</data>' for name, value in _node_fields(node))
+            + "</node>\n"
+            for node in nodes
+        )
+    async for edges in iter_graph_edges(task_ids):
+        yield "".join(
+            '    <edge source="{}" target="{}"><data key="kind">{}</data><data key="weight">{}</data></edge>\n'.format(
+                *edge_ends(edge), ASSOCIATION_TYPES[edge[3]], edge[4])
+            for edge in edges
+        )
+    yield "  </graph>\n</graphml>\n"
+
+
+async def stream_gexf(task_ids: List[int] = None):
+    yield GEXF_HEADER
+    async for nodes in iter_graph_nodes(task_ids):
+        yield "".join(
+            f'      <node id="{node_id(node[0], node[1])}" label={quoteattr(node[2])}><attvalues>'
+            + "".join(f'<attvalue for="{name}" value={quoteattr(str(value))}/>' for name, value in _node_fields(node))
+            + "</attvalues></node>\n"
+            for node in nodes
+        )
+    yield "    </nodes>\n    <edges>\n"
+    edge_number = 0
+    async for edges in iter_graph_edges(task_ids):
+        lines = []
+        for edge in edges:
+            source, target = edge_ends(edge)
+            lines.append(f'      <edge id="{edge_number}" source="{source}" target="{target}" weight="{edge[4]}">'
+                         f'<attvalues><attvalue for="kind" value="{ASSOCIATION_TYPES[edge[3]]}"/></attvalues></edge>\n')
+            edge_number += 1
+        yield "".join(lines)
+    yield "    </edges>\n  </graph>\n</gexf>\n"
+
+
+async def stream_edge_csv(task_ids: List[int] = None):
+    """One row per edge: node ids, titles, kind and weight"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["source", "target", "source_label", "target_label", "kind", "weight"])
+    async for edges in iter_graph_edges(task_ids):
+        for edge in edges:
+            writer.writerow([*edge_ends(edge), edge[5], edge[6], ASSOCIATION_TYPES[edge[3]], edge[4]])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_graph(format: str, task_ids: List[int] = None):
+    """Async iterator of the text of a graphml, gexf or csv export"""
+    return {"graphml": stream_graphml, "gexf": stream_gexf, "csv": stream_edge_csv}[format](task_ids)
+
+
+async def write_graph_npz(task_ids: List[int] = None) -> str:
+    """Write the graph as a CSR adjacency matrix to a temporary .npz; returns its path
+    
+    Row i of the matrix (indptr, indices, data = weights) holds the edges of
+    node i; edge_kind is aligned with indices (1 category, 2 link). Node i
+    is term node_term_id[i] or vocabulary entry node_vocabulary_id[i], and
+    its label is label_bytes[label_offsets[i]:label_offsets[i + 1]] (UTF-8).
+    Rows are converted to arrays batch by batch as they are read.
+    """
+    node_types, row_ids, label_lengths = [], [], []
+    label_bytes = bytearray()
+    async for batch in iter_graph_nodes(task_ids):
+        labels = [node[2].encode("utf-8") for node in batch]
+        node_types.append(np.fromiter((NODE_TYPES[node[0]] for node in batch), dtype=np.int8, count=len(batch)))
+        row_ids.append(np.fromiter((node[1] for node in batch), dtype=np.int64, count=len(batch)))
+        label_lengths.append(np.fromiter(map(len, labels), dtype=np.int64, count=len(batch)))
+        label_bytes += b"".join(labels)
+    node_type = np.concatenate(node_types) if node_types else np.zeros(0, dtype=np.int8)
+    row_id = np.concatenate(row_ids) if row_ids else np.zeros(0, dtype=np.int64)
+    is_term = node_type == NODE_TYPES["term"]
+    # Terms come first, then targets, each in id order: node indexes by searchsorted
+    term_ids, vocabulary_ids = row_id[is_term], row_id[~is_term]
+    
+    sources, targets, kinds, weights = [], [], [], []
+    async for batch in iter_graph_edges(task_ids):
+        count = len(batch)
+        target_term = np.fromiter((-1 if e[1] is None else e[1] for e in batch), dtype=np.int64, count=count)
+        target_vocabulary = np.fromiter((e[2] for e in batch), dtype=np.int64, count=count)
+        sources.append(np.searchsorted(term_ids, np.fromiter((e[0] for e in batch), dtype=np.int64, count=count)))
+        targets.append(np.where(target_term >= 0, np.searchsorted(term_ids, target_term),
+                                len(term_ids) + np.searchsorted(vocabulary_ids, target_vocabulary)))
+        kinds.append(np.fromiter((e[3] for e in batch), dtype=np.int8, count=count))
+        weights.append(np.fromiter((e[4] for e in batch), dtype=np.float32, count=count))
+    
+    def write() -> str:
+        source = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+        order = np.argsort(source, kind="stable")
+        indptr = np.zeros(len(row_id) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=len(row_id)), out=indptr[1:])
+        label_offsets = np.zeros(len(row_id) + 1, dtype=np.int64)
+        if label_lengths:
+            np.cumsum(np.concatenate(label_lengths), out=label_offsets[1:])
+        arrays = {
+            "indptr": indptr,
+            "indices": (np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64))[order],
+            "data": (np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32))[order],
+            "edge_kind": (np.concatenate(kinds) if kinds else np.zeros(0, dtype=np.int8))[order],
+            "node_type": node_type,
+            "node_term_id": np.where(is_term, row_id, -1),
+            "node_vocabulary_id": np.where(is_term, -1, row_id),
+            "label_bytes": np.frombuffer(bytes(label_bytes), dtype=np.uint8),
+            "label_offsets": label_offsets,
+        }
+        handle, path = tempfile.mkstemp(suffix=".npz")
+        with os.fdopen(handle, "wb") as out:
+            np.savez_compressed(out, **arrays)
+        return path
+    
+    return await asyncio.to_thread(write)
@@ -0,0 +1,354 @@
+"""Level-of-detail views of a task's knowledge graph
+
+Laying out every node in the browser stops working past a few thousand
+nodes, so the graph endpoint serves bounded views instead:
+
+- top: the highest-ranked nodes, by degree or PageRank, and the edges among them
+- communities: one supernode per community, with edges aggregated between them
+- community: the highest-ranked members of one community
+- neighborhood: a node and its highest-ranked neighbors up to two hops away
+
+Ranks, communities (label propagation) and layout coordinates are computed
+with numpy once per graph version and kept in memory. A view then only
+slices the cached arrays. Every node comes with x/y coordinates from the
+cached layout, so the browser draws instead of simulating.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from database import (
+    get_task_term_ids, get_task_edges, get_graph_version, get_graph_node_details, ASSOCIATION_TYPES
+)
+
+VIEWS = ("auto", "top", "communities", "community", "neighborhood")
+RANKINGS = ("pagerank", "degree")
+
+# Nodes per view by default, and at most
+VIEW_LIMIT = 300
+VIEW_MAX_LIMIT = 2000
+
+# Edges per view, per node shown
+EDGES_PER_NODE = 4
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_ITERATIONS = 50
+PAGERANK_TOLERANCE = 1e-9
+
+# Label propagation rounds; most graphs settle in fewer
+COMMUNITY_ITERATIONS = 10
+
+# Largest communities placed by force layout; the rest go on an outer spiral
+LAYOUT_COMMUNITIES = 300
+LAYOUT_ITERATIONS = 150
+# Coordinates span [0, LAYOUT_SIZE] on both axes
+LAYOUT_SIZE = 1000
+
+# Task graphs kept analyzed in memory
+GRAPH_CACHE_SIZE = 8
+
+GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+
+
+def pagerank(n: int, src: np.ndarray, dst: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """Weighted PageRank by power iteration; dangling nodes spread their rank evenly"""
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.bincount(src, weights=weight, minlength=n)
+    dangling = out_weight == 0
+    share = weight / np.where(dangling, 1, out_weight)[src]
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_ITERATIONS):
+        spread = np.bincount(dst, weights=rank[src] * share, minlength=n)
+        updated = (1 - PAGERANK_DAMPING) / n + PAGERANK_DAMPING * (spread + rank[dangling].sum() / n)
+        converged = np.abs(updated - rank).sum() < PAGERANK_TOLERANCE
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def label_propagation(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Community of each node, numbered by size (0 is the largest)
+
+    Every round, each node takes the label most common among its neighbors
+    (edges undirected, ties to the smallest label).
+    """
+    labels = np.arange(n)
+    node = np.concatenate([src, dst])
+    neighbor = np.concatenate([dst, src])
+    for _ in range(COMMUNITY_ITERATIONS):
+        if len(node) == 0:
+            break
+        pairs, counts = np.unique(node * n + labels[neighbor], return_counts=True)
+        pair_node, pair_label = pairs // n, pairs % n
+        # Per node: highest count first, then the smallest label
+        order = np.lexsort((pair_label, -counts, pair_node))
+        first = order[np.r_[True, pair_node[order][1:] != pair_node[order][:-1]]]
+        updated = labels.copy()
+        updated[pair_node[first]] = pair_label[first]
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    _, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    by_size = np.argsort(-sizes, kind="stable")
+    renumber = np.empty_like(by_size)
+    renumber[by_size] = np.arange(len(by_size))
+    return renumber[inverse]
+
+
+def force_layout(k: int, u: np.ndarray, v: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """Fruchterman-Reingold positions of k nodes in the unit disk (deterministic)"""
+    if k == 1:
+        return np.zeros((1, 2))
+    pos = np.random.default_rng(0).uniform(-1, 1, (k, 2))
+    ideal = np.sqrt(4.0 / k)
+    for i in range(LAYOUT_ITERATIONS):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=2), 1e-6)
+        displacement = (delta * (ideal ** 2 / distance ** 2)[:, :, None]).sum(axis=1)
+        edge = pos[u] - pos[v]
+        pull = edge * (np.linalg.norm(edge, axis=1) / ideal * weight)[:, None]
+        np.add.at(displacement, u, -pull)
+        np.add.at(displacement, v, pull)
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 1e-9)
+        step = 0.1 * (1 - i / LAYOUT_ITERATIONS)
+        pos += displacement * (np.minimum(length, step) / length)[:, None]
+    pos -= pos.mean(axis=0)
+    return pos / max(np.linalg.norm(pos, axis=1).max(), 1e-9)
+
+
+class GraphAnalysis:
+    """Ranks, communities and layout of one version of a task graph
+
+    Nodes are indexed 0..n-1 in term id order; edge arrays hold indexes.
+    """
+
+    def __init__(self, version: str, term_ids: np.ndarray, edges: Dict[str, np.ndarray]):
+        self.version = version
+        self.term_ids = term_ids
+        n = len(term_ids)
+        self.src = np.searchsorted(term_ids, edges["source"])
+        self.dst = np.searchsorted(term_ids, edges["target"])
+        self.kind = edges["kind"]
+        self.weight = edges["weight"].astype(np.float64)
+
+        self.degree = np.bincount(self.src, minlength=n) + np.bincount(self.dst, minlength=n)
+        self.pagerank = pagerank(n, self.src, self.dst, self.weight)
+        self.community = label_propagation(n, self.src, self.dst)
+        self.community_sizes = np.bincount(self.community, minlength=1 if n else 0)
+
+        # Undirected adjacency (CSR) for neighborhood views
+        node = np.concatenate([self.src, self.dst])
+        order = np.argsort(node, kind="stable")
+        self.neighbors = np.concatenate([self.dst, self.src])[order]
+        self.neighbor_start = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(node, minlength=n), out=self.neighbor_start[1:])
+
+        # Members of each community, highest PageRank first
+        self.members = np.lexsort((-self.pagerank, self.community))
+        self.member_start = np.zeros(len(self.community_sizes) + 1, dtype=np.int64)
+        np.cumsum(self.community_sizes, out=self.member_start[1:])
+        self._layout()
+
+    def _layout(self):
+        """Communities placed by force layout, members on a spiral around their center"""
+        n, count = len(self.term_ids), len(self.community_sizes)
+        self.community_x = np.zeros(count)
+        self.community_y = np.zeros(count)
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        if n == 0:
+            return
+        centers = np.zeros((count, 2))
+        placed = min(count, LAYOUT_COMMUNITIES)
+        cu, cv = self.community[self.src], self.community[self.dst]
+        between = (cu != cv) & (cu < placed) & (cv < placed)
+        pairs, pair_weight = np.unique(cu[between] * placed + cv[between], return_counts=True)
+        centers[:placed] = force_layout(placed, pairs // placed, pairs % placed,
+                                        np.log1p(pair_weight) / np.log1p(max(pair_weight.max(initial=1), 1)))
+        # Smaller communities on a spiral around the placed ones
+        rest = np.arange(count - placed)
+        radius = 1.15 + 0.35 * np.sqrt((rest + 0.5) / max(len(rest), 1))
+        centers[placed:, 0] = radius * np.cos(rest * GOLDEN_ANGLE)
+        centers[placed:, 1] = radius * np.sin(rest * GOLDEN_ANGLE)
+
+        # Member j of a community sits at radius ~ sqrt(j), so area grows with size
+        spread = 0.25 * np.sqrt(self.community_sizes / n) + 0.01
+        position = np.arange(n) - self.member_start[self.community[self.members]]
+        community = self.community[self.members]
+        offset = spread[community] * np.sqrt((position + 0.5) / self.community_sizes[community])
+        x = centers[community, 0] + offset * np.cos(position * GOLDEN_ANGLE)
+        y = centers[community, 1] + offset * np.sin(position * GOLDEN_ANGLE)
+
+        low = min(x.min(), centers[:, 0].min()), min(y.min(), centers[:, 1].min())
+        scale = LAYOUT_SIZE / max(max(x.max(), centers[:, 0].max()) - low[0],
+                                  max(y.max(), centers[:, 1].max()) - low[1], 1e-9)
+        self.x[self.members] = (x - low[0]) * scale
+        self.y[self.members] = (y - low[1]) * scale
+        self.community_x = (centers[:, 0] - low[0]) * scale
+        self.community_y = (centers[:, 1] - low[1]) * scale
+
+    def ranking(self, rank: str) -> np.ndarray:
+        return self.pagerank if rank == "pagerank" else self.degree.astype(np.float64)
+
+    def top_nodes(self, candidates: np.ndarray, rank: str, limit: int) -> np.ndarray:
+        """The limit highest-ranked of some node indexes"""
+        if len(candidates) <= limit:
+            return candidates
+        scores = self.ranking(rank)[candidates]
+        return candidates[np.argsort(-scores, kind="stable")[:limit]]
+
+    def edges_among(self, nodes: np.ndarray, rank: str, limit: int) -> np.ndarray:
+        """Indexes of edges between the given nodes, the best-connected first"""
+        shown = np.zeros(len(self.term_ids), dtype=bool)
+        shown[nodes] = True
+        edges = np.flatnonzero(shown[self.src] & shown[self.dst])
+        if len(edges) > limit:
+            scores = self.ranking(rank)
+            edges = edges[np.argsort(-(scores[self.src[edges]] + scores[self.dst[edges]]), kind="stable")[:limit]]
+        return edges
+
+    def neighborhood(self, center: int, hops: int) -> np.ndarray:
+        reached = np.zeros(len(self.term_ids), dtype=bool)
+        reached[center] = True
+        frontier = np.array([center])
+        for _ in range(hops):
+            nearby = np.concatenate([self.neighbors[self.neighbor_start[i]:self.neighbor_start[i + 1]]
+                                     for i in frontier]) if len(frontier) else np.zeros(0, dtype=np.int64)
+            frontier = np.unique(nearby[~reached[nearby]])
+            reached[frontier] = True
+        return np.flatnonzero(reached)
+
+
+_cache: "OrderedDict[int, GraphAnalysis]" = OrderedDict()
+_locks: Dict[int, asyncio.Lock] = {}
+
+
+async def get_graph_analysis(task_id: int) -> GraphAnalysis:
+    """Analysis of the task's current graph, recomputed only when the graph changed"""
+    version = await get_graph_version(task_id)
+    cached = _cache.get(task_id)
+    if cached is None or cached.version != version:
+        async with _locks.setdefault(task_id, asyncio.Lock()):
+            cached = _cache.get(task_id)
+            if cached is None or cached.version != version:
+                term_ids = await get_task_term_ids(task_id)
+                edges = await get_task_edges(task_id)
+                cached = await asyncio.to_thread(GraphAnalysis, version, term_ids, edges)
+                _cache[task_id] = cached
+                while len(_cache) > GRAPH_CACHE_SIZE:
+                    _cache.popitem(last=False)
+    _cache.move_to_end(task_id)
+    return cached
+
+
+def _round(value: float) -> float:
+    return round(float(value), 1)
+
+
+async def _term_view(graph: GraphAnalysis, nodes: np.ndarray, rank: str, limit: int) -> Dict:
+    edges = graph.edges_among(nodes, rank, limit * EDGES_PER_NODE)
+    term_ids = graph.term_ids[nodes].tolist()
+    details = await get_graph_node_details(term_ids)
+    return {
+        "nodes": [
+            {
+                "id": term_id,
+                "label": details[term_id][0],
+                "status": details[term_id][1],
+                "depth": details[term_id][2],
+                "group": details[term_id][2],
+                "degree": int(graph.degree[i]),
+                "pagerank": float(graph.pagerank[i]),
+                "community": int(graph.community[i]),
+                "x": _round(graph.x[i]),
+                "y": _round(graph.y[i]),
+            }
+            for i, term_id in zip(nodes.tolist(), term_ids) if term_id in details
+        ],
+        "edges": [
+            {"from": int(graph.term_ids[s]), "to": int(graph.term_ids[d]), "type": ASSOCIATION_TYPES[int(k)],
+             "value": float(w)}
+            for s, d, k, w in zip(graph.src[edges], graph.dst[edges], graph.kind[edges], graph.weight[edges])
+        ],
+    }
+
+
+async def _community_view(graph: GraphAnalysis, limit: int) -> Dict:
+    shown = min(limit, len(graph.community_sizes))
+    cu, cv = graph.community[graph.src], graph.community[graph.dst]
+    between = (cu != cv) & (cu < shown) & (cv < shown)
+    pairs, counts = np.unique(cu[between] * max(shown, 1) + cv[between], return_counts=True)
+    strongest = np.argsort(-counts, kind="stable")[:limit * EDGES_PER_NODE]
+    # Each supernode is labelled with its highest-ranked member
+    leaders = graph.members[graph.member_start[:shown]]
+    leader_ids = graph.term_ids[leaders].tolist()
+    details = await get_graph_node_details(leader_ids)
+    return {
+        "nodes": [
+            {
+                "id": f"c{c}",
+                "label": details.get(leader_id, ("?",))[0],
+                "supernode": True,
+                "community": c,
+                "size": int(graph.community_sizes[c]),
+                "pagerank": float(graph.pagerank[graph.community == c].sum()),
+                "x": _round(graph.community_x[c]),
+                "y": _round(graph.community_y[c]),
+            }
+            for c, leader_id in enumerate(leader_ids)
+        ],
+        "edges": [
+            {"from": f"c{pair // shown}", "to": f"c{pair % shown}", "type": "aggregate", "value": int(count)}
+            for pair, count in zip(pairs[strongest].tolist(), counts[strongest].tolist())
+        ],
+    }
+
+
+async def graph_view(task_id: int, view: str = "auto", rank: str = "pagerank", limit: int = VIEW_LIMIT,
+                     node: Optional[int] = None, hops: int = 1, community: Optional[int] = None) -> Dict:
+    """A bounded view of the task graph; raises ValueError for an unknown node or community
+
+    'auto' shows every node of graphs with at most limit nodes, and the
+    communities of larger ones - unless one community holds most of the
+    graph, where its supernode would hide everything.
+    """
+    graph = await get_graph_analysis(task_id)
+    n = len(graph.term_ids)
+    if view == "auto":
+        view = "top" if n <= limit or graph.community_sizes[0] > n / 2 else "communities"
+
+    if view == "communities":
+        result = await _community_view(graph, limit)
+        truncated = len(graph.community_sizes) > limit
+    else:
+        if view == "top":
+            candidates = np.arange(n)
+        elif view == "community":
+            if community is None or not 0 <= community < len(graph.community_sizes):
+                raise ValueError(f"Unknown community {community}")
+            candidates = graph.members[graph.member_start[community]:graph.member_start[community + 1]]
+        else:
+            center = np.searchsorted(graph.term_ids, node) if node is not None else n
+            if center >= n or graph.term_ids[center] != node:
+                raise ValueError(f"Term {node} is not in this graph")
+            candidates = graph.neighborhood(center, hops)
+        nodes = graph.top_nodes(candidates, rank, limit)
+        if view == "neighborhood" and center not in nodes:
+            nodes = np.concatenate([[center], nodes[:limit - 1]])
+        result = await _term_view(graph, np.sort(nodes), rank, limit)
+        truncated = len(candidates) > len(nodes)
+
+    return {
+        "view": view,
+        "rank": rank,
+        "version": graph.version,
+        "total_nodes": n,
+        "total_edges": int(len(graph.src)),
+        "communities": int(len(graph.community_sizes)),
+        "truncated": truncated,
+        **result,
+    }
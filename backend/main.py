@@ -1,30 +1,49 @@
 import os
 import json
+import asyncio
 import csv
 import io
+import sqlite3
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-import wikipediaapi
-from typing import List
+from typing import List, Optional
 
 # Import new modules
 from models import (
     TermResponse, BatchTaskCreate, BatchTaskResponse,
-    TaskStatus, TermDetail, TaskListItem
+    TaskStatus, TaskListItem
 )
 from database import (
     init_database, create_batch_task, add_terms_to_task,
     get_task_status, get_task_terms, get_all_tasks,
-    update_task_counters, get_term_associations,
-    check_existing_terms, delete_task, reset_database, get_corpus_statistics,
+    update_task_counters,
+    iter_existing_terms, delete_task, reset_database, get_corpus_statistics,
     analyze_data_quality, clean_task_data, get_terms_by_quality_issue,
-    get_system_setting, update_system_setting
+    get_system_setting, update_system_setting, create_upload_task, fail_interrupted_uploads,
+    run_space_reclaimer, vacuum_database, train_summary_dictionaries, compress_stored_summaries,
+    run_summary_compression, run_near_duplicate_indexer, DATABASE_FILE
 )
-from scheduler import start_batch_crawl, cancel_batch_crawl, retry_failed_terms, get_supported_languages
-from models import Association
+from scheduler import (
+    start_batch_crawl, cancel_batch_crawl, retry_failed_terms, get_supported_languages,
+    run_job_reaper, shutdown_crawlers
+)
+from markdown_writer import OUTPUT_DIR, write_markdown_file, close_markdown_writer
+from zh_convert import close_zh_converter
+from metrics import render_metrics
+import summary_codec
+from backup import (
+    create_backup, list_backups, backup_path, run_backup_scheduler, restore_backup, RestoreError,
+    BACKUP_INTERVAL_HOURS, BACKUP_KEEP
+)
+from term_upload import save_upload, start_ingest, shutdown_ingests
+from graph_export import GRAPH_EXPORT_FORMATS, stream_graph, write_graph_npz
+from graph_lod import VIEWS, RANKINGS, VIEW_LIMIT, VIEW_MAX_LIMIT, graph_view
+from tracing import get_traces, TRACE_SAMPLE_RATE
+from wiki_client import get_wiki_client, close_wiki_clients, truncate_summary, DEFAULT_USER_AGENT, INTRO_MAX_CHARS
 
 # Lifespan context manager for startup/shutdown events
 @asynccontextmanager
@@ -32,8 +51,32 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_database()
     print("✓ Database initialized")
+    interrupted = await fail_interrupted_uploads()
+    if interrupted:
+        print(f"✗ Marked {interrupted} interrupted upload(s) as failed")
+    # Resume unfinished tasks and keep reclaiming expired leases
+    reaper = asyncio.create_task(run_job_reaper())
+    # Shrink the database file after large deletes
+    reclaimer = asyncio.create_task(run_space_reclaimer())
+    # Scheduled snapshots, if BACKUP_INTERVAL_HOURS is set
+    backups = asyncio.create_task(run_backup_scheduler())
+    # Compress stored summaries once dictionaries can be trained
+    compression = asyncio.create_task(run_summary_compression())
+    # MinHash signatures for terms completed before the index existed
+    near_duplicates = asyncio.create_task(run_near_duplicate_indexer())
     yield
-    # Shutdown (if needed)
+    # Shutdown: release running tasks so they resume on next start,
+    # then flush queued Markdown writes and stop worker pools
+    reaper.cancel()
+    reclaimer.cancel()
+    backups.cancel()
+    compression.cancel()
+    near_duplicates.cancel()
+    await shutdown_ingests()
+    await shutdown_crawlers()
+    await close_markdown_writer()
+    close_zh_converter()
+    await close_wiki_clients()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -46,51 +89,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Wikipedia API
 # User-Agent is explicitly set to comply with Wikimedia User-Agent Policy
 # https://meta.wikimedia.org/wiki/User-Agent_policy
-USER_AGENT = 'TermCorpusBot/1.0 (Educational Project; mailto:your-email@example.com)'
+# The configured 'user_agent' system setting takes precedence over this default.
+USER_AGENT = DEFAULT_USER_AGENT
 
-wiki_en = wikipediaapi.Wikipedia(
-    user_agent=USER_AGENT,
-    language='en'
-)
+# Interactive searches jump ahead of batch tasks in the host rate limiter
+SEARCH_PRIORITY = 100
 
 # Output directory
-OUTPUT_DIR = "output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # ========== Single Search Endpoint (Existing) ==========
 
 @app.get("/search", response_model=TermResponse)
-def search_term(term: str):
-    page_en = wiki_en.page(term)
+async def search_term(term: str):
+    client = get_wiki_client(await get_system_setting('user_agent', USER_AGENT))
+    page_en = await client.fetch_page('en', term, SEARCH_PRIORITY)
 
-    if not page_en.exists():
+    if page_en is None:
         raise HTTPException(status_code=404, detail=f"Term '{term}' not found in English Wikipedia.")
 
     # Get English data
-    en_summary = page_en.summary[0:1000] + "..." if len(page_en.summary) > 1000 else page_en.summary
-    en_url = page_en.fullurl
+    en_summary = truncate_summary(page_en['summary'])
+    en_url = page_en['url']
 
     # Get Chinese data via langlinks
-    langlinks = page_en.langlinks
+    langlinks = page_en['langlinks']
     zh_summary = "Translation not found."
     zh_url = ""
 
     if 'zh' in langlinks:
-        # We need to initialize a Chinese wikipedia object to correctly fetch the summary
-        wiki_zh = wikipediaapi.Wikipedia(
-             user_agent=USER_AGENT,
-             language='zh'
-        )
         # Get the title from the langlink and fetch the page
-        zh_title = langlinks['zh'].title
-        page_zh = wiki_zh.page(zh_title)
+        page_zh = await client.fetch_page('zh', langlinks['zh'], SEARCH_PRIORITY)
         
-        if page_zh.exists():
-            zh_summary = page_zh.summary[0:1000] + "..." if len(page_zh.summary) > 1000 else page_zh.summary
-            zh_url = page_zh.fullurl
+        if page_zh is not None:
+            zh_summary = truncate_summary(page_zh['summary'])
+            zh_url = page_zh['url']
 
     result = {
         "term": term,
@@ -100,14 +135,14 @@ def search_term(term: str):
         "zh_url": zh_url
     }
 
-    # Save to Markdown
-    filename = f"{term.replace(' ', '_')}.md"
-    filepath = os.path.join(OUTPUT_DIR, filename)
+    # Save to Markdown (sharded path, skipped if unchanged)
+    content = (
+        f"# {term}\n\n"
+        f"## English\n{en_summary}\n\n[Link]({en_url})\n\n"
+        f"## Chinese\n{zh_summary}\n\n[Link]({zh_url})\n"
+    )
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(f"# {term}\n\n")
-            f.write(f"## English\n{en_summary}\n\n[Link]({en_url})\n\n")
-            f.write(f"## Chinese\n{zh_summary}\n\n[Link]({zh_url})\n")
+        await asyncio.to_thread(write_markdown_file, OUTPUT_DIR, term, content)
     except Exception as e:
         print(f"Error saving file: {e}")
 
@@ -131,6 +166,11 @@ async def list_supported_languages():
 
 # ========== Batch Processing Endpoints (New) ==========
 
+def validate_intro_chars(intro_chars: Optional[int]):
+    if intro_chars is not None and not 1 <= intro_chars <= INTRO_MAX_CHARS:
+        raise HTTPException(status_code=400, detail=f"intro_chars must be between 1 and {INTRO_MAX_CHARS}")
+
+
 @app.post("/api/batch/create", response_model=BatchTaskResponse)
 async def create_batch(batch_data: BatchTaskCreate):
     """Create a new batch crawling task"""
@@ -148,6 +188,7 @@ async def create_batch(batch_data: BatchTaskCreate):
     for lang in batch_data.target_languages:
         if lang not in supported:
             raise HTTPException(status_code=400, detail=f"Unsupported language: {lang}")
+    validate_intro_chars(batch_data.intro_chars)
     
     # Create task with target_languages
     target_languages_str = ','.join(batch_data.target_languages)
@@ -155,7 +196,10 @@ async def create_batch(batch_data: BatchTaskCreate):
         len(unique_terms), 
         batch_data.crawl_interval, 
         batch_data.max_depth,
-        target_languages_str
+        target_languages_str,
+        batch_data.priority,
+        batch_data.intro_chars,
+        batch_data.skip_associations
     )
     
     # Add terms to task
@@ -169,44 +213,45 @@ async def create_batch(batch_data: BatchTaskCreate):
 
 
 @app.post("/api/batch/upload", response_model=BatchTaskResponse)
-async def upload_batch_file(file: UploadFile = File(...), crawl_interval: int = 3, max_depth: int = 1):
-    """Upload a file (TXT or CSV) containing terms"""
+async def upload_batch_file(file: UploadFile = File(...), crawl_interval: int = 3, max_depth: int = 1,
+                            priority: int = 0, target_languages: str = "en,zh", intro_chars: Optional[int] = None,
+                            skip_associations: bool = False, start: bool = False):
+    """Upload a file (TXT or CSV) containing terms
+    
+    Returns right after the file is saved; terms are ingested in the
+    background while the task is 'importing' (progress in the task status).
+    With start=true the crawl starts as soon as ingestion finishes.
+    """
     if not file.filename.endswith(('.txt', '.csv')):
         raise HTTPException(status_code=400, detail="Only .txt and .csv files are supported")
     
-    try:
-        content = await file.read()
-        text_content = content.decode('utf-8')
-        
-        terms = []
-        if file.filename.endswith('.txt'):
-            # Parse TXT file (one term per line)
-            terms = [line.strip() for line in text_content.split('\n') if line.strip()]
-        else:
-            # Parse CSV file
-            csv_reader = csv.reader(io.StringIO(text_content))
-            for row in csv_reader:
-                if row and row[0].strip():
-                    terms.append(row[0].strip())
-        
-        if not terms:
-            raise HTTPException(status_code=400, detail="No valid terms found in file")
-        
-        # Remove duplicates
-        unique_terms = list(dict.fromkeys(terms))
-        
-        # Create task
-        task_id = await create_batch_task(len(unique_terms), crawl_interval, max_depth)
-        await add_terms_to_task(task_id, unique_terms)
-        
-        return BatchTaskResponse(
-            task_id=task_id,
-            total_terms=len(unique_terms),
-            message=f"File uploaded successfully with {len(unique_terms)} terms (Depth: {max_depth})"
-        )
+    supported = get_supported_languages()
+    languages = [lang.strip() for lang in target_languages.split(',') if lang.strip()]
+    for lang in languages:
+        if lang not in supported:
+            raise HTTPException(status_code=400, detail=f"Unsupported language: {lang}")
+    if not languages:
+        raise HTTPException(status_code=400, detail="No target languages given")
+    validate_intro_chars(intro_chars)
     
+    is_csv = file.filename.endswith('.csv')
+    try:
+        path, size = await save_upload(file, '.csv' if is_csv else '.txt')
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+    if size == 0:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="No valid terms found in file")
+    
+    task_id = await create_upload_task(size, crawl_interval, max_depth, ','.join(languages), priority, intro_chars,
+                                       skip_associations)
+    start_ingest(task_id, path, is_csv, start, crawl_interval)
+    
+    return BatchTaskResponse(
+        task_id=task_id,
+        total_terms=0,
+        message=f"File uploaded successfully, importing terms in the background (Depth: {max_depth})"
+    )
 
 
 @app.post("/api/batch/{task_id}/start")
@@ -217,6 +262,8 @@ async def start_task(task_id: int):
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    if task['status'] == 'importing':
+        raise HTTPException(status_code=400, detail="Task is still importing its terms")
     if task['status'] not in ['pending', 'failed', 'cancelled']:
         raise HTTPException(status_code=400, detail=f"Task is already {task['status']}")
     
@@ -243,6 +290,10 @@ async def get_status(task_id: int):
     if task['total_terms'] > 0:
         progress = round((task['completed_terms'] + task['failed_terms']) / task['total_terms'] * 100, 2)
     
+    ingest_progress = None
+    if task.get('ingest_bytes_total'):
+        ingest_progress = round((task.get('ingest_bytes_read') or 0) / task['ingest_bytes_total'] * 100, 2)
+    
     # Parse target_languages string to list
     target_languages = ['en', 'zh']  # default
     if task.get('target_languages'):
@@ -256,7 +307,12 @@ async def get_status(task_id: int):
         failed_terms=task['failed_terms'],
         progress_percent=progress,
         max_depth=task.get('max_depth', 1),
+        priority=task.get('priority') or 0,
         target_languages=target_languages,
+        intro_chars=task.get('intro_chars'),
+        skip_associations=bool(task.get('skip_associations')),
+        ingest_progress_percent=ingest_progress,
+        ingest_error=task.get('ingest_error'),
         created_at=task['created_at'],
         updated_at=task['updated_at']
     )
@@ -547,45 +603,91 @@ async def export_results(task_id: int, format: str = "json"):
 
 
 @app.get("/api/batch/{task_id}/graph")
-async def get_task_graph(task_id: int):
-    """Get the knowledge graph (nodes and edges) for a task"""
-    terms = await get_task_terms(task_id)
+async def get_task_graph(
+    task_id: int,
+    view: str = "auto",
+    rank: str = "pagerank",
+    limit: int = VIEW_LIMIT,
+    node: Optional[int] = None,
+    hops: int = 1,
+    community: Optional[int] = None
+):
+    """
+    Get a bounded view of the knowledge graph (nodes and edges) for a task
     
-    nodes = []
-    edges = []
+    Views:
+    - auto: every node if the graph has at most `limit` nodes, else communities
+    - top: the `limit` highest-ranked nodes (rank=pagerank|degree)
+    - communities: one supernode per community, with aggregated edges
+    - community: the top members of one `community`
+    - neighborhood: `node` and its top neighbors within `hops` (1-2)
     
-    term_map = {t['term'].lower(): t['id'] for t in terms}
+    Nodes carry precomputed x/y layout coordinates, cached per graph version.
+    """
+    if view not in VIEWS:
+        raise HTTPException(status_code=400, detail=f"View must be one of: {', '.join(VIEWS)}")
+    if rank not in RANKINGS:
+        raise HTTPException(status_code=400, detail=f"Rank must be one of: {', '.join(RANKINGS)}")
+    if not 1 <= limit <= VIEW_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {VIEW_MAX_LIMIT}")
+    if not 1 <= hops <= 2:
+        raise HTTPException(status_code=400, detail="hops must be 1 or 2")
+    if view == "neighborhood" and node is None:
+        raise HTTPException(status_code=400, detail="The neighborhood view needs a node")
+    if view == "community" and community is None:
+        raise HTTPException(status_code=400, detail="The community view needs a community")
     
-    for term in terms:
-        nodes.append({
-            "id": term['id'],
-            "label": term['term'],
-            "status": term['status'],
-            "depth": term['depth_level'],
-            "group": term['depth_level'] # Use depth for coloring
-        })
-        
-        # Get associations
-        assocs = await get_term_associations(term['id'])
-        for assoc in assocs:
-            target_lower = assoc['target_term'].lower()
-            if target_lower in term_map:
-                edges.append({
-                    "from": term['id'],
-                    "to": term_map[target_lower],
-                    "type": assoc['association_type'],
-                    "value": assoc['weight']
-                })
-            # Else: we could add external nodes if we want to visualize uncrawled associations
+    task = await get_task_status(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
     
-    return {
-        "nodes": nodes,
-        "edges": edges
-    }
+    try:
+        return await graph_view(task_id, view, rank, limit, node, hops, community)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/api/graph/export")
+async def export_graph(format: str = "graphml", tasks: Optional[str] = None):
+    """Export the association graph of some tasks (comma-separated ids) or of the whole corpus
+    
+    Supported formats:
+    - graphml: GraphML (Gephi, networkx, igraph, Cytoscape)
+    - gexf: GEXF 1.3 (Gephi)
+    - csv: Edge list with node ids, titles, kind and weight
+    - npz: NumPy CSR adjacency matrix with node ids and labels
+    
+    graphml, gexf and csv are streamed straight from the database.
+    """
+    if format not in GRAPH_EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format must be one of: {', '.join(GRAPH_EXPORT_FORMATS)}"
+        )
+    try:
+        task_ids = [int(t) for t in tasks.split(',') if t.strip()] if tasks else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="tasks must be comma-separated task ids")
+    
+    media_type, suffix = GRAPH_EXPORT_FORMATS[format]
+    scope = "tasks_" + "-".join(map(str, task_ids)) if task_ids else "corpus"
+    filename = f"graph_{scope}{suffix}"
+    if format == "npz":
+        path = await write_graph_npz(task_ids)
+        return FileResponse(path=path, filename=filename, media_type=media_type,
+                            background=BackgroundTask(os.remove, path))
+    return StreamingResponse(
+        stream_graph(format, task_ids),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 
 # ========== New Phase 3 Endpoints: Corpus Quality & Data Management ==========
 
+# Terms serialized per chunk of the streamed duplicate check response
+DUPLICATE_CHECK_CHUNK = 1000
+
 class DuplicateCheckRequest(BaseModel):
     terms: List[str]
 
@@ -595,8 +697,34 @@ async def check_duplicates(request: DuplicateCheckRequest):
     if not request.terms:
         return {"existing": [], "new": [], "total_input": 0, "existing_count": 0, "new_count": 0}
     
-    result = await check_existing_terms(request.terms)
-    return result
+    async def body():
+        # Emitted in order: existing terms, new terms, then the counts
+        counts = {"existing": 0, "new": 0}
+        section, batch = "existing", []
+        
+        def chunk():
+            separator = "," if counts[section] > len(batch) else ""
+            return separator + ",".join(json.dumps(term, ensure_ascii=False) for term in batch)
+        
+        yield '{"existing": ['
+        async for kind, term in iter_existing_terms(request.terms):
+            if kind != section or len(batch) >= DUPLICATE_CHECK_CHUNK:
+                if batch:
+                    yield chunk()
+                    batch = []
+                if kind != section:
+                    yield '], "new": ['
+                    section = kind
+            batch.append(term)
+            counts[kind] += 1
+        if batch:
+            yield chunk()
+        if section == "existing":
+            yield '], "new": ['
+        yield (f'], "total_input": {len(request.terms)}, '
+               f'"existing_count": {counts["existing"]}, "new_count": {counts["new"]}}}')
+    
+    return StreamingResponse(body(), media_type="application/json")
 
 
 class SystemSettingRequest(BaseModel):
@@ -618,6 +746,19 @@ async def update_setting(request: SystemSettingRequest):
     return {"status": "success", "key": request.key, "value": request.value}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Crawler metrics of this process in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/debug/traces")
+async def list_traces(task_id: int = None, min_duration_ms: float = None, slowest: bool = False, limit: int = 50):
+    """Recent sampled crawl traces of this process, optionally only slow ones of one task"""
+    traces = get_traces(task_id, min_duration_ms, slowest, min(max(limit, 1), 500))
+    return {"sample_rate": TRACE_SAMPLE_RATE, "total": len(traces), "traces": traces}
+
+
 @app.delete("/api/batch/{task_id}")
 async def delete_batch_task(task_id: int):
     """Delete a batch task and all its data"""
@@ -652,27 +793,96 @@ async def get_statistics():
     return stats
 
 
+@app.post("/api/system/vacuum")
+async def vacuum_all_data():
+    """Rebuild the database file, returning all free space
+    
+    Blocks writers until done. Also switches databases created before
+    incremental auto-vacuum over to it, so later deletes shrink the file.
+    """
+    size_before = os.path.getsize(DATABASE_FILE)
+    await vacuum_database()
+    size_after = os.path.getsize(DATABASE_FILE)
+    return {
+        "message": "Database vacuumed successfully",
+        "size_before": size_before,
+        "size_after": size_after
+    }
+
+
+@app.post("/api/system/compress-summaries")
+async def compress_summaries(retrain: bool = False):
+    """Train summary dictionaries (all of them with retrain=true) and compress stored summaries
+    
+    Summaries compressed with older dictionaries stay readable.
+    """
+    if not summary_codec.ZSTD_AVAILABLE:
+        raise HTTPException(status_code=400, detail="Summary compression needs the zstandard package")
+    trained = await train_summary_dictionaries(None if retrain else sorted(
+        set(summary_codec.FIELD_DICTIONARIES.values()) - set(summary_codec.active_dictionaries())))
+    compressed = await compress_stored_summaries()
+    return {
+        "message": f"Compressed the summaries of {compressed} terms",
+        "trained": trained,
+        "terms_compressed": compressed,
+        "dictionaries": summary_codec.active_dictionaries()
+    }
+
+
 @app.get("/api/system/backup")
 async def backup_database():
-    """Download the database file as backup"""
-    from fastapi.responses import FileResponse
-    db_path = "corpus.db"
+    """Take a fresh snapshot of the database and download it
     
-    if not os.path.exists(db_path):
-        raise HTTPException(status_code=404, detail="Database file not found")
-    
-    return FileResponse(
-        path=db_path,
-        filename="corpus_backup.db",
-        media_type="application/octet-stream"
-    )
+    The snapshot is consistent even while crawlers write, and compressed
+    (zstd, or gzip without the zstandard package). Downloads can be resumed
+    with Range requests against /api/system/backups/{name}.
+    """
+    try:
+        snapshot = await create_backup("manual")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Error creating backup: {str(e)}")
+    return _backup_file_response(snapshot["name"])
+
+
+@app.get("/api/system/backups")
+async def get_backups():
+    """Snapshots kept on the server, newest first"""
+    return {
+        "backups": list_backups(),
+        "interval_hours": BACKUP_INTERVAL_HOURS,
+        "keep": BACKUP_KEEP
+    }
+
+
+@app.post("/api/system/backups")
+async def create_backup_snapshot():
+    """Take a snapshot and keep it on the server"""
+    try:
+        return await create_backup("manual")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Error creating backup: {str(e)}")
+
+
+@app.get("/api/system/backups/{name}")
+async def download_backup(name: str):
+    """Download a kept snapshot; supports Range requests for resuming"""
+    return _backup_file_response(name)
+
+
+def _backup_file_response(name: str) -> FileResponse:
+    path = backup_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Backup not found")
+    return FileResponse(path=path, filename=name, media_type="application/octet-stream")
 
 
 @app.post("/api/system/restore")
 async def restore_database(file: UploadFile = File(...), confirm: bool = False):
     """Restore database from a backup file
     
-    The uploaded file must be a valid SQLite database with the correct schema.
+    Accepts a .db file or a compressed .db.zst / .db.gz backup. The upload
+    is streamed to disk and validated (schema and PRAGMA quick_check) before
+    the current database is swapped out and kept as corpus_before_restore.db.
     This will replace the current database - use with caution!
     """
     if not confirm:
@@ -682,76 +892,23 @@ async def restore_database(file: UploadFile = File(...), confirm: bool = False):
         )
     
     # Validate file extension
-    if not file.filename.endswith('.db'):
-        raise HTTPException(status_code=400, detail="File must be a .db file")
-    
-    # Save to temp file first
-    import tempfile
-    import shutil
-    import sqlite3
+    if not file.filename.endswith(('.db', '.zst', '.gz')):
+        raise HTTPException(status_code=400, detail="File must be a .db, .db.zst or .db.gz file")
     
-    temp_path = None
+    upload_path, _ = await save_upload(file, ".upload")
     try:
-        # Save uploaded file to temp location
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as temp_file:
-            temp_path = temp_file.name
-            content = await file.read()
-            temp_file.write(content)
-        
-        # Verify it's a valid SQLite database
-        try:
-            conn = sqlite3.connect(temp_path)
-            cursor = conn.cursor()
-            
-            # Check for required tables
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            required_tables = ['batch_tasks', 'terms']
-            for table in required_tables:
-                if table not in tables:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Invalid backup file: missing required table '{table}'"
-                    )
-            
-            # Get counts for response
-            cursor.execute("SELECT COUNT(*) FROM batch_tasks")
-            task_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM terms")
-            term_count = cursor.fetchone()[0]
-            
-            conn.close()
-            
-        except sqlite3.Error as e:
-            raise HTTPException(status_code=400, detail=f"Invalid SQLite database: {str(e)}")
-        
-        # Backup current database before replacing
-        current_db = "corpus.db"
-        backup_path = "corpus_before_restore.db"
-        if os.path.exists(current_db):
-            shutil.copy(current_db, backup_path)
-        
-        # Replace current database
-        shutil.move(temp_path, current_db)
-        temp_path = None  # Already moved
-        
-        return {
-            "message": "Database restored successfully",
-            "tasks_restored": task_count,
-            "terms_restored": term_count,
-            "previous_backup": backup_path
-        }
-        
-    except HTTPException:
-        raise
+        result = await restore_backup(upload_path)
+    except RestoreError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error restoring database: {str(e)}")
     finally:
-        # Clean up temp file if it still exists
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        os.remove(upload_path)
+    
+    return {
+        "message": "Database restored successfully",
+        **result
+    }
 
 
 # ========== Sprint 2: Data Quality Control ==========
@@ -762,6 +919,7 @@ class CleanDataRequest(BaseModel):
     remove_missing_chinese: bool = False
     remove_short_summaries: bool = False
     min_summary_length: int = 50
+    remove_near_duplicates: bool = False
 
 @app.get("/api/quality/analyze")
 async def analyze_quality(task_id: int = None, min_summary_length: int = 50):
@@ -787,8 +945,10 @@ async def clean_data(request: CleanDataRequest):
     - remove_failed: Remove all failed terms
     - remove_missing_chinese: Remove terms without Chinese translation
     - remove_short_summaries: Remove terms with summaries shorter than min_summary_length
+    - remove_near_duplicates: Remove near-duplicate summaries, keeping the oldest term
     """
-    if not (request.remove_failed or request.remove_missing_chinese or request.remove_short_summaries):
+    if not (request.remove_failed or request.remove_missing_chinese or request.remove_short_summaries
+            or request.remove_near_duplicates):
         raise HTTPException(
             status_code=400,
             detail="At least one removal option must be enabled"
@@ -799,7 +959,8 @@ async def clean_data(request: CleanDataRequest):
         remove_failed=request.remove_failed,
         remove_missing_chinese=request.remove_missing_chinese,
         remove_short_summaries=request.remove_short_summaries,
-        min_summary_length=request.min_summary_length
+        min_summary_length=request.min_summary_length,
+        remove_near_duplicates=request.remove_near_duplicates
     )
     return {
         "message": f"Cleaned {result['total_removed']} entries",
@@ -817,11 +978,12 @@ async def get_quality_issues(task_id: int = None, issue_type: str = "all", limit
     - 'short_en': English summary too short
     - 'short_zh': Chinese summary too short
     - 'failed': Failed terms
+    - 'near_duplicate': Near-duplicate summaries of an older term (MinHash/LSH)
     """
-    if issue_type not in ['all', 'missing_chinese', 'short_en', 'short_zh', 'failed']:
+    if issue_type not in ['all', 'missing_chinese', 'short_en', 'short_zh', 'failed', 'near_duplicate']:
         raise HTTPException(
             status_code=400,
-            detail="Invalid issue_type. Must be one of: all, missing_chinese, short_en, short_zh, failed"
+            detail="Invalid issue_type. Must be one of: all, missing_chinese, short_en, short_zh, failed, near_duplicate"
         )
     
     terms = await get_terms_by_quality_issue(task_id, issue_type, limit)
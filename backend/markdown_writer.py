@@ -0,0 +1,275 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from metrics import CACHE_REQUESTS
+
+OUTPUT_DIR = "output"
+
+# Output modes (system setting 'markdown_output')
+#   files:   one Markdown file per term, sharded into hashed subdirectories
+#   archive: all terms appended to rolling gzip archives in output/archive/
+#   off:     don't write Markdown at all
+OUTPUT_MODES = ('files', 'archive', 'off')
+
+ARCHIVE_MAX_BYTES = 256 * 1024 * 1024
+
+# Content hashes of recently written files; older files are compared on disk
+FILE_HASH_CACHE_SIZE = 100_000
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def markdown_relpath(title: str) -> str:
+    """Sharded relative path for a term's Markdown file
+
+    Files are sharded two levels deep by the hash of the lowercased title so
+    no directory grows unbounded. The filename carries a short hash of the exact
+    title, so titles differing only in case never collide on case-insensitive
+    filesystems.
+    """
+    shard = _digest(title.lower())
+    safe_title = _UNSAFE_CHARS.sub("_", title).strip("_.")[:100] or "untitled"
+    filename = f"{safe_title}-{_digest(title)[:8]}.md"
+    return os.path.join(shard[0:2], shard[2:4], filename)
+
+
+def render_markdown(result: Dict, language_names: Dict[str, str] = None) -> str:
+    """Render a crawl result with all translations as Markdown"""
+    language_names = language_names or {}
+    parts = [f"# {result['term']}\n\n"]
+    for lang, data in result.get('translations', {}).items():
+        lang_name = language_names.get(lang, lang.upper())
+        parts.append(f"## {lang_name}\n")
+        parts.append(f"{data.get('summary', 'N/A')}\n\n")
+        if data.get('url'):
+            parts.append(f"[Link]({data['url']})\n\n")
+    return "".join(parts)
+
+
+def write_markdown_file(output_dir: str, title: str, content: str, known_hashes: "FileHashCache" = None) -> bool:
+    """Write a term's Markdown file unless identical content is already on disk
+
+    The file is written to a temp name and renamed into place, so readers never
+    see a partially written file. Returns True if the file was written.
+    """
+    filepath = os.path.join(output_dir, markdown_relpath(title))
+    content_hash = _digest(content)
+
+    if known_hashes is not None and known_hashes.get(filepath) == content_hash:
+        return False
+    if os.path.exists(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            if _digest(f.read()) == content_hash:
+                if known_hashes is not None:
+                    known_hashes[filepath] = content_hash
+                return False
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = f"{filepath}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, filepath)
+
+    if known_hashes is not None:
+        known_hashes[filepath] = content_hash
+    return True
+
+
+class FileHashCache:
+    """Thread-safe LRU of file path -> content hash, bounded to max_entries"""
+
+    def __init__(self, max_entries: int = FILE_HASH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._hashes: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filepath: str) -> Optional[str]:
+        with self._lock:
+            content_hash = self._hashes.get(filepath)
+            if content_hash is not None:
+                self._hashes.move_to_end(filepath)
+            return content_hash
+
+    def __setitem__(self, filepath: str, content_hash: str):
+        with self._lock:
+            self._hashes[filepath] = content_hash
+            self._hashes.move_to_end(filepath)
+            if len(self._hashes) > self.max_entries:
+                self._hashes.popitem(last=False)
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+class MarkdownWriter:
+    """Background Markdown writer fed from a queue
+
+    Crawlers enqueue rendered documents and move on; a few consumer coroutines
+    hand the file I/O to a thread pool so the event loop never blocks on disk.
+    The bounded queue applies backpressure if the disk falls behind.
+    """
+
+    def __init__(self, output_dir: str = OUTPUT_DIR, mode: str = 'files',
+                 max_workers: int = 4, queue_size: int = 1000,
+                 archive_max_bytes: int = ARCHIVE_MAX_BYTES):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown markdown output mode: {mode}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.max_workers = max_workers
+        self.archive_max_bytes = archive_max_bytes
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {"written": 0, "skipped": 0, "errors": 0}
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._consumers = []
+        self._file_hashes = FileHashCache()
+
+        # Archive state, only touched under _archive_lock
+        self._archive_lock = threading.Lock()
+        self._archive_index: Optional[Dict[str, str]] = None
+        self._archive_path: Optional[str] = None
+
+    async def start(self):
+        if self._consumers or self.mode == 'off':
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="markdown")
+        self._consumers = [
+            asyncio.create_task(self._consume())
+            for _ in range(self.max_workers)
+        ]
+
+    async def submit(self, title: str, content: str):
+        """Queue a document for writing"""
+        if self.mode == 'off':
+            return
+        await self.start()
+        await self.queue.put((title, content))
+
+    async def flush(self):
+        """Wait until every queued document has been written"""
+        if self._consumers:
+            await self.queue.join()
+
+    async def close(self):
+        await self.flush()
+        for consumer in self._consumers:
+            consumer.cancel()
+        self._consumers = []
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        write = self._write_archive if self.mode == 'archive' else self._write_file
+        while True:
+            title, content = await self.queue.get()
+            try:
+                written = await loop.run_in_executor(self._executor, write, title, content)
+                self.stats["written" if written else "skipped"] += 1
+                # Unchanged documents are skipped thanks to the content hash cache
+                CACHE_REQUESTS.inc(cache="markdown_hash", result="miss" if written else "hit")
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Error saving Markdown file: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write_file(self, title: str, content: str) -> bool:
+        return write_markdown_file(self.output_dir, title, content, self._file_hashes)
+
+    def _write_archive(self, title: str, content: str) -> bool:
+        """Append a document to the current rolling archive
+
+        Each document is its own gzip member, so archives stay valid gzip streams
+        while being appended to. An index of title hash -> content hash skips
+        documents whose content hasn't changed.
+        """
+        archive_dir = os.path.join(self.output_dir, "archive")
+        title_hash = _digest(title)
+        content_hash = _digest(content)
+
+        with self._archive_lock:
+            if self._archive_index is None:
+                self._load_archive_index(archive_dir)
+            if self._archive_index.get(title_hash) == content_hash:
+                return False
+
+            if self._archive_path is None or os.path.getsize(self._archive_path) >= self.archive_max_bytes:
+                self._archive_path = self._next_archive_path(archive_dir)
+
+            with open(self._archive_path, "ab") as f:
+                f.write(gzip.compress(content.encode("utf-8") + b"\n"))
+            with open(os.path.join(archive_dir, "index.tsv"), "a", encoding="utf-8") as f:
+                f.write(f"{title_hash}\t{content_hash}\t{os.path.basename(self._archive_path)}\n")
+
+            self._archive_index[title_hash] = content_hash
+            return True
+
+    def _load_archive_index(self, archive_dir: str):
+        os.makedirs(archive_dir, exist_ok=True)
+        self._archive_index = {}
+        index_path = os.path.join(archive_dir, "index.tsv")
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) >= 2:
+                        # Later lines win, so the index reflects the newest content
+                        self._archive_index[parts[0]] = parts[1]
+
+        archives = sorted(name for name in os.listdir(archive_dir) if name.endswith(".md.gz"))
+        if archives:
+            self._archive_path = os.path.join(archive_dir, archives[-1])
+
+    def _next_archive_path(self, archive_dir: str) -> str:
+        archives = sorted(name for name in os.listdir(archive_dir) if name.endswith(".md.gz"))
+        number = int(archives[-1].split("-")[1].split(".")[0]) + 1 if archives else 1
+        path = os.path.join(archive_dir, f"corpus-{number:05d}.md.gz")
+        open(path, "ab").close()
+        return path
+
+
+# Process-wide writer shared by all crawlers
+_writer: Optional[MarkdownWriter] = None
+_writer_lock = asyncio.Lock()
+
+
+async def get_markdown_writer() -> MarkdownWriter:
+    """Get (and lazily start) the shared Markdown writer
+
+    The output mode is read from the 'markdown_output' system setting when the
+    writer is first created.
+    """
+    global _writer
+    if _writer is None:
+        # Concurrent crawlers must not each create (and leak) a writer
+        async with _writer_lock:
+            if _writer is None:
+                from database import get_system_setting
+                mode = await get_system_setting('markdown_output', 'files')
+                writer = MarkdownWriter(mode=mode if mode in OUTPUT_MODES else 'files')
+                await writer.start()
+                _writer = writer
+    return _writer
+
+
+async def close_markdown_writer():
+    """Flush pending writes and stop the shared writer"""
+    global _writer
+    async with _writer_lock:
+        if _writer is not None:
+            await _writer.close()
+            _writer = None
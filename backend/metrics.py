@@ -0,0 +1,332 @@
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from tracing import span
+
+# Latency buckets in seconds, from cache hits to slow API calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric family with a fixed set of label names
+
+    Samples are plain dict entries keyed by label values, so updates from the
+    crawler's hot path cost a dict lookup and an addition. Everything runs on
+    the event loop thread, so no locking is needed.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[tuple, object] = {}
+
+    def _key(self, labels: Dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def remove(self, **labels):
+        """Drop the samples matching the given labels (e.g. a finished task)"""
+        for key in [k for k in self._values
+                    if all(k[self.label_names.index(n)] == str(v) for n, v in labels.items())]:
+            del self._values[key]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        sample = self._values.get(key)
+        if sample is None:
+            # [per-bucket counts..., +Inf count], sum
+            sample = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        sample[0][bisect_left(self.buckets, value)] += 1
+        sample[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metric families plus collectors that read live state at scrape time
+
+    Queue depths, cache sizes and throttle state already live in their
+    components; collectors copy them into gauges only when /metrics is
+    scraped, so they cost nothing while crawling.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"✗ Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ========== Crawl pipeline ==========
+
+STAGE_SECONDS = registry.register(Histogram(
+    "crawl_stage_duration_seconds",
+    "Time spent in each crawl pipeline stage",
+    ["stage", "task", "lang"]
+))
+STAGE_ERRORS = registry.register(Counter(
+    "crawl_stage_errors_total",
+    "Crawl pipeline stages that raised, by exception type",
+    ["stage", "task", "error"]
+))
+TERMS_CRAWLED = registry.register(Counter(
+    "crawl_terms_total",
+    "Terms finished by the crawler, by result",
+    ["task", "result"]
+))
+TERMS_IN_FLIGHT = registry.register(Gauge(
+    "crawl_terms_in_flight",
+    "Terms currently being crawled",
+    ["task"]
+))
+
+# ========== Wikipedia API ==========
+
+HTTP_RESPONSES = registry.register(Counter(
+    "wiki_http_responses_total",
+    "Wikipedia API responses by host and HTTP status ('error' for transport failures)",
+    ["host", "code"]
+))
+HTTP_SECONDS = registry.register(Histogram(
+    "wiki_http_request_duration_seconds",
+    "Wikipedia API request latency, excluding rate limiter and throttle waits",
+    ["host"]
+))
+HOST_WAITING = registry.register(Gauge(
+    "wiki_rate_limiter_queued",
+    "Requests waiting for a rate limiter token",
+    ["host"]
+))
+HOST_IN_FLIGHT = registry.register(Gauge(
+    "wiki_host_in_flight",
+    "Requests in flight per host",
+    ["host"]
+))
+HOST_LIMIT = registry.register(Gauge(
+    "wiki_host_concurrency_limit",
+    "Current adaptive concurrency limit per host",
+    ["host"]
+))
+HOST_CIRCUIT_OPEN = registry.register(Gauge(
+    "wiki_host_circuit_open",
+    "1 while the host's circuit breaker is open or half-open",
+    ["host"]
+))
+
+# ========== Caches, queues and SQLite ==========
+
+CACHE_REQUESTS = registry.register(Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"]
+))
+QUEUE_DEPTH = registry.register(Gauge(
+    "queue_depth",
+    "Items waiting in internal queues",
+    ["queue"]
+))
+SQLITE_LOCKED = registry.register(Counter(
+    "sqlite_locked_total",
+    "Database operations that gave up waiting for the SQLite write lock",
+    ["stage"]
+))
+SQLITE_LOCK_WAIT = registry.register(Histogram(
+    "sqlite_lock_wait_seconds",
+    "Time spent acquiring the SQLite write lock at the start of a write transaction",
+    ["stage"]
+))
+
+# Pipeline stage being timed, for metrics recorded deeper down (lock waits)
+_current_stage: ContextVar[str] = ContextVar("current_stage", default="")
+
+
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+@contextmanager
+def stage_timer(stage: str, task_id=None, lang: str = ""):
+    """Time one pipeline stage and count its failures
+
+    Inside a sampled trace the stage is also recorded as a span.
+
+    Write-lock waits inside the stage are recorded in sqlite_lock_wait_seconds
+    under its name (see connect_db); operations that time out waiting for the
+    lock are also counted in sqlite_locked_total.
+    """
+    task = "" if task_id is None else task_id
+    started = time.perf_counter()
+    stage_token = _current_stage.set(stage)
+    try:
+        with span(stage, lang=lang) if lang else span(stage):
+            yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=stage, task=task, error=type(e).__name__)
+        if "database is locked" in str(e):
+            SQLITE_LOCKED.inc(stage=stage)
+        raise
+    finally:
+        _current_stage.reset(stage_token)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, task=task, lang=lang)
+
+
+def forget_task(task_id):
+    """Drop a task's samples once it stops crawling in this process
+
+    Every per-task series is removed, so /metrics doesn't grow with each
+    task ever run; scrapers see the task's counters end like a reset.
+    """
+    for metric in (STAGE_SECONDS, STAGE_ERRORS, TERMS_CRAWLED, TERMS_IN_FLIGHT):
+        metric.remove(task=task_id)
+
+
+def _collect_hosts():
+    from rate_limiter import get_rate_limiter
+    from throttle import get_throttle_status
+
+    for host, bucket in get_rate_limiter()._buckets.items():
+        HOST_WAITING.set(bucket.queued, host=host)
+    for status in get_throttle_status():
+        HOST_IN_FLIGHT.set(status["in_flight"], host=status["host"])
+        HOST_LIMIT.set(status["concurrency_limit"], host=status["host"])
+        HOST_CIRCUIT_OPEN.set(0 if status["state"] == "closed" else 1, host=status["host"])
+
+
+def _collect_queues():
+    import markdown_writer
+    import zh_convert
+
+    writer = markdown_writer._writer
+    QUEUE_DEPTH.set(writer.queue.qsize() if writer else 0, queue="markdown")
+    converter = zh_convert._converter
+    QUEUE_DEPTH.set(len(converter._pending) if converter else 0, queue="zh_convert")
+    QUEUE_DEPTH.set(len(converter._inflight) if converter else 0, queue="zh_convert_in_flight")
+
+
+registry.add_collector(_collect_hosts)
+registry.add_collector(_collect_queues)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return registry.render()
+
+
+async def serve_metrics(port: int, host: str = "0.0.0.0") -> asyncio.AbstractServer:
+    """Serve /metrics over plain HTTP, for processes without the API (worker.py)"""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request_line.split(b" ")[1] if request_line.count(b" ") >= 2 else b""
+            if path.split(b"?")[0] == b"/metrics":
+                status, body = "200 OK", render_metrics().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"✓ Metrics served on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,144 @@
+import hashlib
+import re
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# MinHash / LSH parameters
+# 128 permutations split into 16 bands of 8 rows gives an LSH threshold of
+# roughly (1/16)^(1/8) ~= 0.7 Jaccard similarity.
+NUM_PERM = 128
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+
+# Hash family h(x) = (a * x + b) mod p with p = 2^31 - 1, so a * x fits in uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_MAX_HASH = np.uint32((1 << 31) - 1)
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+# Upper bound on shingles hashed in one vectorized step (NUM_PERM x this many uint64s)
+_MAX_SHINGLES_PER_STEP = 32768
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so formatting differences don't matter"""
+    return _WHITESPACE.sub(" ", (text or "").lower()).strip()
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """Hash the character shingles of a text to 31-bit integers
+
+    Character shingles work for both space-delimited languages and Chinese.
+    """
+    text = normalize_text(text)
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    return hashes % _PRIME
+
+
+def compute_signatures(texts: List[str]) -> np.ndarray:
+    """Compute MinHash signatures for a batch of texts
+
+    Returns a (len(texts), NUM_PERM) uint32 array. Shingles of many documents
+    are hashed together in one (NUM_PERM x shingles) numpy operation and reduced
+    per document with np.minimum.reduceat. Empty texts get an all-max signature.
+    """
+    signatures = np.full((len(texts), NUM_PERM), _MAX_HASH, dtype=np.uint32)
+
+    pending = []  # (row index, shingle hashes)
+    pending_size = 0
+
+    def flush():
+        nonlocal pending, pending_size
+        if not pending:
+            return
+        rows = [row for row, _ in pending]
+        chunks = [hashes for _, hashes in pending]
+        offsets = np.cumsum([0] + [len(c) for c in chunks[:-1]])
+        all_hashes = np.concatenate(chunks)
+
+        # (NUM_PERM, total_shingles) permuted hashes
+        permuted = (_PERM_A[:, None] * all_hashes[None, :] + _PERM_B[:, None]) % _PRIME
+        mins = np.minimum.reduceat(permuted, offsets, axis=1)
+        signatures[rows] = mins.T.astype(np.uint32)
+
+        pending = []
+        pending_size = 0
+
+    for i, text in enumerate(texts):
+        hashes = shingle_hashes(text)
+        if len(hashes) == 0:
+            continue
+        if pending_size + len(hashes) > _MAX_SHINGLES_PER_STEP:
+            flush()
+        pending.append((i, hashes))
+        pending_size += len(hashes)
+    flush()
+
+    return signatures
+
+
+def band_hashes(signature: np.ndarray) -> List[int]:
+    """Hash each LSH band of a signature to a signed 64-bit bucket key"""
+    bands = np.ascontiguousarray(signature, dtype=np.uint32).reshape(NUM_BANDS, ROWS_PER_BAND)
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in bands
+    ]
+
+
+def signature_to_blob(signature: np.ndarray) -> bytes:
+    return np.ascontiguousarray(signature, dtype="<u4").tobytes()
+
+
+def blob_to_signature(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def is_empty_signature(signature: np.ndarray) -> bool:
+    return bool(np.all(signature == _MAX_HASH))
+
+
+def estimate_similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity: fraction of matching MinHash rows"""
+    return float(np.mean(sig_a == sig_b))
+
+
+def cluster_duplicates(pairs: Iterable[Tuple[int, int, float]]) -> Dict[int, Tuple[int, float]]:
+    """Group near-duplicate pairs into clusters around their oldest term
+
+    pairs: (term_id_a, term_id_b, similarity) tuples that passed the threshold.
+    Returns {duplicate_term_id: (kept_term_id, similarity)}. Terms are visited
+    oldest (lowest id) first; a term not yet claimed is kept, and claims every
+    unclaimed term it was directly paired with. Duplicates never chain through
+    an intermediate term, and the similarity is the one to the kept term.
+    """
+    neighbors = {}
+    for a, b, similarity in pairs:
+        neighbors.setdefault(a, {})[b] = similarity
+        neighbors.setdefault(b, {})[a] = similarity
+
+    duplicates = {}
+    for term_id in sorted(neighbors):
+        if term_id in duplicates:
+            continue
+        for other, similarity in neighbors[term_id].items():
+            if other > term_id and other not in duplicates:
+                duplicates[other] = (term_id, similarity)
+    return duplicates
@@ -12,10 +12,13 @@ class TermResponse(BaseModel):
 
 class BatchTaskCreate(BaseModel):
     terms: List[str]
-    crawl_interval: int = 3
+    crawl_interval: int = 3  # Legacy: pacing is done by the shared per-host rate limiter
+    priority: int = 0  # Higher-priority tasks get rate-limited requests first
     max_depth: int = 1
     max_terms_per_layer: int = 10
     target_languages: List[str] = ['en', 'zh']  # Default to English and Chinese
+    intro_chars: Optional[int] = None  # Fetch only the lead section, cut to this many characters
+    skip_associations: bool = False  # Don't fetch categories/links for the association graph
 
 class BatchTaskResponse(BaseModel):
     task_id: int
@@ -30,7 +33,12 @@ class TaskStatus(BaseModel):
     failed_terms: int
     progress_percent: float
     max_depth: int = 1
+    priority: int = 0
     target_languages: List[str] = ['en', 'zh']
+    intro_chars: Optional[int] = None
+    skip_associations: bool = False
+    ingest_progress_percent: Optional[float] = None  # Upload ingestion progress while 'importing'
+    ingest_error: Optional[str] = None
     created_at: str
     updated_at: str
 
@@ -0,0 +1,112 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Dict, Optional
+
+# Sustained requests per second allowed against each Wikipedia host, shared by
+# every task in the process (and across processes when RATE_LIMIT_SHARED=1)
+DEFAULT_RATE_PER_HOST = float(os.environ.get("RATE_LIMIT_PER_HOST", "5"))
+DEFAULT_BURST = float(os.environ.get("RATE_LIMIT_BURST", "5"))
+SHARED_ACROSS_PROCESSES = os.environ.get("RATE_LIMIT_SHARED", "0") == "1"
+
+
+class TokenBucket:
+    """Token bucket for one host, granting waiters in priority order
+
+    Waiters with a higher priority are served first; equal priorities are
+    served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._waiters = []  # heap of (-priority, seq, future)
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority: int = 0):
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._seq), future))
+        self._schedule()
+        await future
+
+    def _schedule(self):
+        if self._wakeup is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self.tokens) / self.rate)
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._grant)
+
+    def _grant(self):
+        self._wakeup = None
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Waiter was cancelled
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+        self._schedule()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+class HostRateLimiter:
+    """Process-wide rate limiter keyed by host
+
+    Every Wikipedia request goes through acquire(host), so the total request
+    rate per host stays bounded no matter how many tasks run concurrently,
+    while idle hosts keep their full budget. With shared=True a token must also
+    be taken from a bucket stored in the database, which bounds the combined
+    rate of all API and worker processes using the same corpus.db.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_PER_HOST, burst: float = DEFAULT_BURST,
+                 shared: bool = SHARED_ACROSS_PROCESSES):
+        self.rate = rate
+        self.burst = burst
+        self.shared = shared
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, host: str) -> TokenBucket:
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    async def acquire(self, host: str, priority: int = 0):
+        """Wait until a request to host may be sent"""
+        await self.bucket(host).acquire(priority)
+
+        if self.shared:
+            from database import take_rate_limit_token
+            while True:
+                wait = await take_rate_limit_token(host, self.rate, self.burst)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+
+_limiter: Optional[HostRateLimiter] = None
+
+
+def get_rate_limiter() -> HostRateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = HostRateLimiter()
+    return _limiter
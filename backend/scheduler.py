@@ -1,22 +1,68 @@
 import asyncio
 import json
-import wikipediaapi
+import os
+import random
+import socket
+import uuid
 from typing import Dict, Callable, List
 from database import (
     update_task_status, 
     update_term_status, 
     update_task_counters,
-    get_pending_terms,
     get_task_status,
-    get_task_terms,
+    get_existing_task_terms,
     save_term_associations,
     add_terms_to_task,
-    get_system_setting
+    get_system_setting,
+    index_term_signatures,
+    acquire_job,
+    heartbeat_job,
+    release_job,
+    claim_terms,
+    record_term_failure,
+    requeue_failed_terms,
+    get_next_retry_delay,
+    reclaim_expired_leases,
+    get_resumable_tasks,
+    complete_task_if_done
+)
+from markdown_writer import get_markdown_writer, render_markdown
+from metrics import stage_timer, forget_task, TERMS_CRAWLED, TERMS_IN_FLIGHT
+from tracing import start_trace
+from zh_convert import ZH_VARIANTS, get_zh_converter
+from wiki_client import (
+    get_wiki_client, truncate_summary, is_transient_error,
+    WikiPageNotFoundError, DEFAULT_USER_AGENT
 )
 
-# Global dictionary to track running tasks
+# Local handles of the tasks this process is crawling.
+# The durable state lives in the crawl_jobs table and the term leases.
 running_tasks: Dict[int, asyncio.Task] = {}
 
+# Identity used for job and term leases
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# A lease not renewed for this long is considered abandoned (crashed worker)
+LEASE_SECONDS = 60
+HEARTBEAT_INTERVAL = LEASE_SECONDS / 3
+REAPER_INTERVAL = 30
+
+# Transient failures are retried with jittered exponential backoff until a
+# term has failed MAX_ATTEMPTS times
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+
+# Article links kept as associations per term; only this many are requested
+ASSOCIATION_LINK_LIMIT = 20
+
+# Terms of one task crawled at the same time
+TERM_CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", "8"))
+
+# 'inline': the API process crawls its own tasks.
+# 'external': the API only enqueues; standalone workers (worker.py) crawl.
+CRAWL_MODE = os.environ.get("CRAWL_MODE", "inline")
+
 # Common Wikipedia languages with their native names
 # Order: English first, then Traditional Chinese, Simplified Chinese, then alphabetically by code
 SUPPORTED_LANGUAGES = {
@@ -43,58 +89,118 @@ SUPPORTED_LANGUAGES = {
     'uk': 'Українська (Ukrainian)',
 }
 
+def retry_backoff(attempts: int, retry_after: float = None) -> float:
+    """Delay before the next attempt after `attempts` earlier failures
+    
+    Exponential in the number of attempts with the upper half jittered, so
+    terms that failed together don't all come back at once. Never shorter
+    than the server's Retry-After.
+    """
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempts)
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    return max(delay, retry_after or 0)
+
+
+def build_associations(category_titles: List[str], link_titles: List[str]) -> List[Dict]:
+    """Turn a page's category and link titles into term associations
+    
+    Maintenance categories are dropped; only the first ASSOCIATION_LINK_LIMIT
+    links are kept to avoid spam. link_titles must be article (namespace 0)
+    links: titles such as "Star Wars: Episode IV" contain colons too.
+    """
+    associations = []
+    
+    # Categories
+    for cat_title in category_titles:
+        if not cat_title.startswith("Category:All articles") and \
+           not cat_title.startswith("Category:Articles") and \
+           not cat_title.startswith("Category:Webarchive") and \
+           not cat_title.startswith("Category:CS1"):
+            clean_cat = cat_title.replace("Category:", "")
+            associations.append({
+                "target_term": clean_cat,
+                "association_type": "category",
+                "weight": 0.5
+            })
+    
+    # Links (Limit to the top few to avoid spam)
+    for title in link_titles[:ASSOCIATION_LINK_LIMIT]:
+        associations.append({
+            "target_term": title,
+            "association_type": "link",
+            "weight": 1.0
+        })
+    
+    return associations
+
+
+def discover_terms(associations: List[Dict], existing_set: set) -> List[str]:
+    """Pick link targets not yet in the task (lowercased in existing_set) for the next depth"""
+    new_terms = []
+    for assoc in associations:
+        target = assoc['target_term']
+        if target.lower() not in existing_set and assoc['association_type'] == 'link':
+            new_terms.append(target)
+            existing_set.add(target.lower())
+    
+    # Limit new terms per source
+    return new_terms[:10]
+
+
 class BatchCrawler:
-    def __init__(self, task_id: int, crawl_interval: int = 3, max_depth: int = 1, target_languages: List[str] = None, user_agent: str = None):
+    def __init__(self, task_id: int, crawl_interval: int = 3, max_depth: int = 1, target_languages: List[str] = None, user_agent: str = None, priority: int = 0):
         self.task_id = task_id
+        # Legacy per-task delay; request pacing is now done by the shared per-host rate limiter
         self.crawl_interval = crawl_interval
         self.max_depth = max_depth
         self.target_languages = target_languages or ['en', 'zh']
+        self.priority = priority
+        # Intro-only extraction limit in characters; None fetches full extracts
+        self.intro_chars = None
+        # Don't fetch categories and links just for the association graph
+        self.skip_associations = False
         self.should_stop = False
         
         # User-Agent is explicitly set to comply with Wikimedia User-Agent Policy
         # Use provided user_agent or fallback to default
-        default_ua = 'TermCorpusBot/1.0 (Educational Project; mailto:your-email@example.com)'
-        self.USER_AGENT = user_agent or default_ua
+        self.USER_AGENT = user_agent or DEFAULT_USER_AGENT
         
-        # Initialize Wikipedia API instances dynamically for each language
-        self.wiki_instances = {}
-        for lang in self.target_languages:
-            self.wiki_instances[lang] = wikipediaapi.Wikipedia(
-                user_agent=self.USER_AGENT,
-                language=lang
-            )
-    
-    def get_wiki_instance(self, lang: str):
-        """Get or create a Wikipedia instance for a language"""
-        if lang not in self.wiki_instances:
-            self.wiki_instances[lang] = wikipediaapi.Wikipedia(
-                user_agent=self.USER_AGENT,
-                language=lang
-            )
-        return self.wiki_instances[lang]
+        # Shared client: all fetches go through the process-wide host rate limiter
+        self.client = get_wiki_client(self.USER_AGENT)
     
     async def crawl_single_term(self, term_record: Dict) -> Dict:
-        """Crawl a single term from Wikipedia in multiple languages"""
+        """Crawl a single term from Wikipedia in multiple languages
+        
+        A sampled share of terms is traced (tracing.py), with spans for each
+        stage, HTTP request and SQL statement.
+        """
+        with start_trace("crawl_term", task_id=self.task_id, term=term_record['term'],
+                         depth=term_record.get('depth_level', 0), attempt=(term_record.get('attempts') or 0) + 1):
+            return await self._crawl_term(term_record)
+    
+    async def _crawl_term(self, term_record: Dict) -> Dict:
         term = term_record['term']
         term_id = term_record['id']
         try:
-            # Mark as crawling
-            await update_term_status(self.task_id, term, "crawling")
+            # The term was already moved to 'crawling' under our lease by claim_terms
             
             # Always start with English to get the base page
-            await asyncio.sleep(0)  # Yield control
-            wiki_en = self.get_wiki_instance('en')
-            page_en = wiki_en.page(term)
+            with stage_timer("fetch", self.task_id, "en"):
+                page_en = await self.client.fetch_page('en', term, self.priority, self.intro_chars)
             
-            if not page_en.exists():
-                raise Exception(f"Term '{term}' not found in English Wikipedia")
+            if page_en is None:
+                raise WikiPageNotFoundError(f"Term '{term}' not found in English Wikipedia")
             
             # Get English data first (always needed for associations and as base)
-            en_summary = page_en.summary[0:1000] + "..." if len(page_en.summary) > 1000 else page_en.summary
-            en_url = page_en.fullurl
+            en_summary = self.summary_of(page_en)
+            en_url = page_en['url']
+            
+            # Get langlinks for other languages ({lang: title})
+            langlinks = page_en['langlinks']
             
-            # Get langlinks for other languages
-            langlinks = page_en.langlinks
+            # Chinese variants share one zh page: fetch it once, then derive each script
+            zh_targets = [lang for lang in self.target_languages if lang in ZH_VARIANTS]
+            zh_translations = await self.fetch_zh_variants(langlinks, zh_targets) if zh_targets else {}
             
             # Build translations dictionary for all target languages
             translations = {}
@@ -104,55 +210,18 @@ class BatchCrawler:
                         'summary': en_summary,
                         'url': en_url
                     }
-                elif lang in ['zh', 'zh-tw']:
-                    # Both simplified and traditional Chinese use 'zh' langlink
-                    # We then convert based on the target variant
-                    if 'zh' in langlinks:
-                        zh_title = langlinks['zh'].title
-                        wiki_zh = self.get_wiki_instance('zh')
-                        page_zh = wiki_zh.page(zh_title)
-                        
-                        if page_zh.exists():
-                            raw_summary = page_zh.summary[0:1000] + "..." if len(page_zh.summary) > 1000 else page_zh.summary
-                            
-                            # Convert based on target variant
-                            try:
-                                import zhconv
-                                if lang == 'zh':
-                                    # Simplified Chinese
-                                    raw_summary = zhconv.convert(raw_summary, 'zh-cn')
-                                else:
-                                    # Traditional Chinese (zh-tw)
-                                    raw_summary = zhconv.convert(raw_summary, 'zh-tw')
-                            except ImportError:
-                                pass
-                            
-                            translations[lang] = {
-                                'summary': raw_summary,
-                                'url': page_zh.fullurl
-                            }
-                        else:
-                            translations[lang] = {
-                                'summary': 'Translation not found.',
-                                'url': ''
-                            }
-                    else:
-                        translations[lang] = {
-                            'summary': 'Translation not found.',
-                            'url': ''
-                        }
+                elif lang in zh_translations:
+                    translations[lang] = zh_translations[lang]
                 elif lang in langlinks:
                     # Get translated page for other languages
-                    lang_title = langlinks[lang].title
-                    wiki_lang = self.get_wiki_instance(lang)
-                    page_lang = wiki_lang.page(lang_title)
+                    with stage_timer("fetch", self.task_id, lang):
+                        page_lang = await self.client.fetch_page(lang, langlinks[lang], self.priority,
+                                                                 self.intro_chars)
                     
-                    if page_lang.exists():
-                        raw_summary = page_lang.summary[0:1000] + "..." if len(page_lang.summary) > 1000 else page_lang.summary
-                        
+                    if page_lang is not None:
                         translations[lang] = {
-                            'summary': raw_summary,
-                            'url': page_lang.fullurl
+                            'summary': self.summary_of(page_lang),
+                            'url': page_lang['url']
                         }
                     else:
                         translations[lang] = {
@@ -170,36 +239,12 @@ class BatchCrawler:
             zh_url = translations.get('zh', {}).get('url', '')
             
             # Extract Associations (from English page)
-            associations = []
-            
-            # Categories
-            for cat_title in page_en.categories:
-                if not cat_title.startswith("Category:All articles") and \
-                   not cat_title.startswith("Category:Articles") and \
-                   not cat_title.startswith("Category:Webarchive") and \
-                   not cat_title.startswith("Category:CS1"):
-                    clean_cat = cat_title.replace("Category:", "")
-                    associations.append({
-                        "target_term": clean_cat,
-                        "association_type": "category",
-                        "weight": 0.5
-                    })
-
-            # Links (Limit to top 20 to avoid spam)
-            link_count = 0
-            for title in page_en.links:
-                if link_count >= 20: break
-                # Skip namespaces
-                if ":" not in title: 
-                    associations.append({
-                        "target_term": title,
-                        "association_type": "link",
-                        "weight": 1.0
-                    })
-                    link_count += 1
+            with stage_timer("associations", self.task_id, "en"):
+                associations = await self.fetch_associations(page_en['title'])
 
             if associations:
-                await save_term_associations(term_id, associations)
+                with stage_timer("db_write", self.task_id):
+                    await save_term_associations(term_id, associations)
                 
             result = {
                 "term": term,
@@ -212,138 +257,201 @@ class BatchCrawler:
             }
             
             # Save to Markdown
-            await self.save_to_markdown(result)
+            with stage_timer("markdown", self.task_id):
+                await self.save_to_markdown(result)
             
             # Update database with success - include translations JSON
             translations_json = json.dumps(translations, ensure_ascii=False)
-            await update_term_status(
-                self.task_id, term, "completed",
-                en_summary, en_url, zh_summary, zh_url,
-                translations=translations_json
-            )
+            with stage_timer("db_write", self.task_id):
+                await update_term_status(
+                    self.task_id, term, "completed",
+                    en_summary, en_url, zh_summary, zh_url,
+                    translations=translations_json
+                )
+            
+            # Keep the near-duplicate index up to date incrementally
+            try:
+                with stage_timer("signature_index", self.task_id):
+                    await index_term_signatures([(term_id, en_summary)])
+            except Exception as e:
+                print(f"Error indexing signature for {term}: {e}")
             
             return result
             
         except Exception as e:
-            # Update database with failure
+            # Transient errors are retried automatically; permanent ones fail the term
             error_msg = str(e)
-            await update_term_status(
-                self.task_id, term, "failed",
-                error_message=error_msg
-            )
+            retry_delay = None
+            if is_transient_error(e) and (term_record.get('attempts') or 0) + 1 < MAX_ATTEMPTS:
+                retry_delay = retry_backoff(term_record.get('attempts') or 0, getattr(e, 'retry_after', None))
+                error_msg = f"{error_msg} (retrying in {retry_delay:.0f}s)"
+            await record_term_failure(term_id, error_msg, retry_delay)
             raise e
     
-    async def save_to_markdown(self, result: Dict):
-        """Save result to Markdown file"""
-        import os
+    async def fetch_associations(self, title: str) -> List[Dict]:
+        """Category and link associations of an English page
+        
+        Tasks with skip_associations fetch only the links depth crawling
+        needs: none at max_depth 1, and no categories.
+        """
+        categories, links = [], []
+        if not self.skip_associations:
+            categories = await self.client.fetch_categories('en', title, self.priority)
+        if not self.skip_associations or self.max_depth > 1:
+            links = await self.client.fetch_links('en', title, self.priority, ASSOCIATION_LINK_LIMIT)
+        return build_associations(categories, links)
+    
+    def summary_of(self, page: Dict) -> str:
+        """Summary to store for a fetched page
+        
+        Intro-only extracts were already cut to length by the server.
+        """
+        return page['summary'] if self.intro_chars else truncate_summary(page['summary'])
+    
+    async def fetch_zh_variants(self, langlinks, zh_targets: List[str]) -> Dict:
+        """Fetch the zh page once and convert its summary to every requested variant
         
-        OUTPUT_DIR = "output"
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        Both simplified and traditional Chinese use the 'zh' langlink; the
+        conversion runs in the shared process pool.
+        """
+        not_found = {lang: {'summary': 'Translation not found.', 'url': ''} for lang in zh_targets}
+        if 'zh' not in langlinks:
+            return not_found
         
-        filename = f"{result['term'].replace(' ', '_').replace('/', '_')}.md"
-        filepath = os.path.join(OUTPUT_DIR, filename)
+        with stage_timer("fetch", self.task_id, "zh"):
+            page_zh = await self.client.fetch_page('zh', langlinks['zh'], self.priority, self.intro_chars)
+        
+        if page_zh is None:
+            return not_found
+        
+        raw_summary = self.summary_of(page_zh)
+        zh_url = page_zh['url']
+        
+        with stage_timer("zh_convert", self.task_id, "zh"):
+            converted = await get_zh_converter().convert(
+                raw_summary, [ZH_VARIANTS[lang] for lang in zh_targets]
+            )
+        return {
+            lang: {'summary': converted[ZH_VARIANTS[lang]], 'url': zh_url}
+            for lang in zh_targets
+        }
+    
+    async def save_to_markdown(self, result: Dict):
+        """Queue result for the background Markdown writer"""
+        try:
+            writer = await get_markdown_writer()
+            await writer.submit(result['term'], render_markdown(result, SUPPORTED_LANGUAGES))
+        except Exception as e:
+            print(f"Error saving Markdown file: {e}")
+    
+    async def heartbeat(self):
+        """Keep the job and term leases alive while the crawler runs"""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                if not await heartbeat_job(self.task_id, WORKER_ID, LEASE_SECONDS):
+                    print(f"✗ Task {self.task_id} lease was lost, stopping crawler")
+                    self.should_stop = True
+                    return
+            except Exception as e:
+                print(f"✗ Heartbeat failed for task {self.task_id}: {str(e)}")
+    
+    async def load_task_config(self):
+        """Load max_depth, target_languages and extraction settings for the task from the database"""
+        task_info = await get_task_status(self.task_id)
+        if task_info:
+            if 'max_depth' in task_info:
+                self.max_depth = task_info['max_depth'] or 1
+            if 'target_languages' in task_info and task_info['target_languages']:
+                self.target_languages = task_info['target_languages'].split(',')
+            self.priority = task_info.get('priority') or 0
+            self.intro_chars = task_info.get('intro_chars') or None
+            self.skip_associations = bool(task_info.get('skip_associations'))
+        return task_info
+    
+    async def process_term(self, term_record: Dict):
+        """Crawl one claimed term, queue discovered terms and update counters"""
+        term = term_record['term']
+        current_depth = term_record.get('depth_level', 0)
         
+        TERMS_IN_FLIGHT.inc(task=self.task_id)
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(f"# {result['term']}\n\n")
-                
-                # Write all translations
-                for lang, data in result.get('translations', {}).items():
-                    lang_name = SUPPORTED_LANGUAGES.get(lang, lang.upper())
-                    f.write(f"## {lang_name}\n")
-                    f.write(f"{data.get('summary', 'N/A')}\n\n")
-                    if data.get('url'):
-                        f.write(f"[Link]({data['url']})\n\n")
+            result = await self.crawl_single_term(term_record)
+            TERMS_CRAWLED.inc(task=self.task_id, result="completed")
+            langs_found = [k for k, v in result.get('translations', {}).items() if v.get('summary') and v.get('summary') != 'Translation not found.']
+            print(f"✓ Successfully crawled: {term} (Depth: {current_depth}, Languages: {', '.join(langs_found)})")
+            
+            # Handle Depth Crawling
+            next_depth = current_depth + 1
+            if next_depth < self.max_depth and result.get('associations'):
+                # Terms discovered meanwhile by other crawls of this task
+                # (here or in other workers) are skipped by add_terms_to_task
+                with stage_timer("discovery", self.task_id):
+                    existing_set = await get_existing_task_terms(
+                        self.task_id, [a['target_term'] for a in result['associations']])
+                    new_terms = discover_terms(result['associations'], existing_set)
                     
+                    if new_terms:
+                        added = await add_terms_to_task(self.task_id, new_terms, next_depth, term_record['id'])
+                        if added:
+                            print(f"  -> Discovered {added} new terms from {term} (will be depth {next_depth})")
+            
         except Exception as e:
-            print(f"Error saving Markdown file: {e}")
+            TERMS_CRAWLED.inc(task=self.task_id, result="failed")
+            print(f"✗ Failed to crawl {term}: {str(e)}")
+        finally:
+            TERMS_IN_FLIGHT.dec(task=self.task_id)
+        
+        # Update task counters
+        with stage_timer("db_write", self.task_id):
+            await update_task_counters(self.task_id)
     
     async def run(self):
-        """Run the batch crawling process"""
+        """Run the batch crawling process
+        
+        The caller must hold the task's job lease (see start_batch_crawl).
+        """
+        heartbeat = asyncio.create_task(self.heartbeat())
+        in_flight = set()
         try:
             # Update task status to running
             await update_task_status(self.task_id, "running")
             
             # Load task config if not set
-            task_info = await get_task_status(self.task_id)
-            if task_info:
-                if 'max_depth' in task_info:
-                    self.max_depth = task_info['max_depth'] or 1
-                if 'target_languages' in task_info and task_info['target_languages']:
-                    self.target_languages = task_info['target_languages'].split(',')
-                    # Reinitialize wiki instances with correct languages
-                    self.wiki_instances = {}
-                    for lang in self.target_languages:
-                        self.wiki_instances[lang] = wikipediaapi.Wikipedia(
-                            user_agent=self.USER_AGENT,
-                            language=lang
-                        )
+            await self.load_task_config()
             
+            # Terms are crawled concurrently; the per-host throttle decides how
+            # many of their requests actually reach Wikipedia at once
             while not self.should_stop:
-                # Get all pending terms
-                # We fetch inside the loop to catch new terms added during crawling (depth > 1)
-                pending_terms = await get_pending_terms(self.task_id)
-                
-                if not pending_terms:
+                # Check cancellation
+                if (await get_task_status(self.task_id))['status'] == 'cancelled':
+                    self.should_stop = True
                     break
                 
-                # Check cancellation again
-                if (await get_task_status(self.task_id))['status'] == 'cancelled':
-                     self.should_stop = True
-                     break
-
-                processed_in_this_batch = 0
+                # Claim pending terms under our lease as slots free up
+                # We claim inside the loop to catch new terms added during crawling (depth > 1)
+                free_slots = TERM_CONCURRENCY - len(in_flight)
+                if free_slots > 0:
+                    claimed_terms = await claim_terms(self.task_id, WORKER_ID, free_slots, LEASE_SECONDS)
+                    for term_record in claimed_terms:
+                        in_flight.add(asyncio.create_task(self.process_term(term_record)))
                 
-                for term_record in pending_terms:
-                    if self.should_stop:
-                        await update_task_status(self.task_id, "cancelled")
+                if not in_flight:
+                    # Nothing claimable: wait for scheduled retries, if any
+                    retry_delay = await get_next_retry_delay(self.task_id)
+                    if retry_delay is None:
                         break
-                    
-                    term = term_record['term']
-                    current_depth = term_record.get('depth_level', 0)
-                    
-                    try:
-                        result = await self.crawl_single_term(term_record)
-                        langs_found = [k for k, v in result.get('translations', {}).items() if v.get('summary') and v.get('summary') != 'Translation not found.']
-                        print(f"✓ Successfully crawled: {term} (Depth: {current_depth}, Languages: {', '.join(langs_found)})")
-                        
-                        # Handle Depth Crawling
-                        next_depth = current_depth + 1
-                        if next_depth < self.max_depth and result.get('associations'):
-                            new_terms = []
-                            existing_terms_in_task = await get_task_terms(self.task_id)
-                            existing_set = {t['term'].lower() for t in existing_terms_in_task}
-                            
-                            for assoc in result['associations']:
-                                target = assoc['target_term']
-                                if target.lower() not in existing_set and assoc['association_type'] == 'link':
-                                    new_terms.append(target)
-                                    existing_set.add(target.lower())
-                            
-                            # Limit new terms per source
-                            new_terms = new_terms[:10]
-                            
-                            if new_terms:
-                                print(f"  -> Discovered {len(new_terms)} new terms from {term} (will be depth {next_depth})")
-                                await add_terms_to_task(self.task_id, new_terms, next_depth, term_record['id'])
-                        
-                    except Exception as e:
-                        print(f"✗ Failed to crawl {term}: {str(e)}")
-                    
-                    # Update task counters
-                    await update_task_counters(self.task_id)
-                    
-                    processed_in_this_batch += 1
-                    
-                    # Wait for the specified interval before next request
-                    await asyncio.sleep(self.crawl_interval)
+                    await asyncio.sleep(min(max(retry_delay, 1), REAPER_INTERVAL))
+                    continue
                 
-                if processed_in_this_batch == 0:
-                   break
+                _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            
+            if in_flight:
+                # Let terms already being crawled finish before giving up the lease
+                await asyncio.gather(*in_flight, return_exceptions=True)
             
-            # Mark task as completed if not cancelled and no more pending terms
-            if not self.should_stop and not await get_pending_terms(self.task_id):
-                await update_task_status(self.task_id, "completed")
+            # Mark task as completed if not cancelled and nothing is pending or in flight
+            if not self.should_stop and await complete_task_if_done(self.task_id):
                 print(f"✓ Task {self.task_id} completed successfully")
         
         except Exception as e:
@@ -351,6 +459,19 @@ class BatchCrawler:
             await update_task_status(self.task_id, "failed")
         
         finally:
+            heartbeat.cancel()
+            # Only left over when the crawler itself was cancelled
+            for term_task in in_flight:
+                term_task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            # Give up the lease; unfinished claimed terms go back to 'pending'
+            try:
+                await release_job(self.task_id, WORKER_ID)
+            except Exception as e:
+                print(f"✗ Error releasing task {self.task_id}: {str(e)}")
+            
+            forget_task(self.task_id)
             # Remove from running tasks
             if self.task_id in running_tasks:
                 del running_tasks[self.task_id]
@@ -361,10 +482,20 @@ class BatchCrawler:
 
 
 async def start_batch_crawl(task_id: int, crawl_interval: int = 3):
-    """Start a batch crawl task in the background"""
+    """Start a batch crawl task in the background
+    
+    In external mode the task is only marked 'running'; workers claim its terms.
+    """
+    if CRAWL_MODE == 'external':
+        await update_task_status(task_id, "running")
+        return None
+    
     if task_id in running_tasks:
         raise Exception(f"Task {task_id} is already running")
     
+    if not await acquire_job(task_id, WORKER_ID, LEASE_SECONDS):
+        raise Exception(f"Task {task_id} is already running on another worker")
+    
     # Get user agent settings
     user_agent = await get_system_setting('user_agent')
     
@@ -379,6 +510,12 @@ async def start_batch_crawl(task_id: int, crawl_interval: int = 3):
 async def cancel_batch_crawl(task_id: int):
     """Cancel a running batch crawl task"""
     if task_id not in running_tasks:
+        # The task may be owned by another worker: it stops when it sees the status
+        # An 'importing' task stops ingesting its upload the same way
+        task_info = await get_task_status(task_id)
+        if task_info and task_info['status'] in ('running', 'importing'):
+            await update_task_status(task_id, "cancelled")
+            return
         raise Exception(f"Task {task_id} is not running")
     
     task = running_tasks[task_id]
@@ -394,28 +531,71 @@ async def cancel_batch_crawl(task_id: int):
 
 async def retry_failed_terms(task_id: int, crawl_interval: int = 3):
     """Retry all failed terms in a task"""
-    # Reset failed terms to pending
-    from database import get_failed_terms
-    import aiosqlite
+    # Reset failed terms to pending in one statement
+    count = await requeue_failed_terms(task_id)
     
-    failed_terms = await get_failed_terms(task_id)
-    
-    if not failed_terms:
+    if not count:
         return 0
     
-    async with aiosqlite.connect("corpus.db") as db:
-        for term_record in failed_terms:
-            await db.execute("""
-                UPDATE terms
-                SET status = 'pending', error_message = NULL, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (term_record['id'],))
-        await db.commit()
+    # Start crawling again unless this process is still crawling the task
+    if task_id not in running_tasks:
+        await start_batch_crawl(task_id, crawl_interval)
+    
+    return count
+
+
+async def resume_unfinished_tasks() -> list:
+    """Reclaim abandoned work and resume tasks no live worker owns
+    
+    Expired term leases go back to 'pending', so a resumed task continues from
+    the last committed term without redoing completed ones.
+    """
+    reclaimed = await reclaim_expired_leases()
+    if reclaimed:
+        print(f"✓ Reclaimed {reclaimed} terms from expired leases")
     
-    # Start crawling again
-    await start_batch_crawl(task_id, crawl_interval)
+    # Workers pick running tasks up on their own
+    if CRAWL_MODE == 'external':
+        return []
     
-    return len(failed_terms)
+    resumed = []
+    for task_info in await get_resumable_tasks():
+        task_id = task_info['id']
+        if task_id in running_tasks:
+            continue
+        try:
+            await start_batch_crawl(task_id, task_info['crawl_interval'])
+            resumed.append(task_id)
+            print(f"✓ Resumed task {task_id}")
+        except Exception as e:
+            print(f"✗ Could not resume task {task_id}: {str(e)}")
+    return resumed
+
+
+async def run_job_reaper(interval: int = REAPER_INTERVAL):
+    """Periodically reclaim expired leases and resume orphaned tasks"""
+    while True:
+        try:
+            await resume_unfinished_tasks()
+        except Exception as e:
+            print(f"✗ Error in job reaper: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+async def shutdown_crawlers():
+    """Stop local crawlers without cancelling their tasks
+    
+    The tasks stay 'running' and their leases are released, so they resume on
+    the next startup (or on another worker).
+    """
+    tasks = list(running_tasks.values())
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
 
 def get_supported_languages():
@@ -0,0 +1,175 @@
+"""Dictionary-trained zstd compression of stored summaries
+
+en_summary, zh_summary and the translations JSON are short texts that
+compress poorly one by one, but well against a dictionary trained on the
+corpus itself. Values of at least MIN_COMPRESS_CHARS are stored as zstd
+frames (BLOBs) compressed with their field's dictionary: 'en', 'zh', and
+'translations' for the multilingual JSON. Shorter values stay plain TEXT,
+so SQL checks such as zh_summary = 'Translation not found.' keep working.
+So does everything while zstandard isn't installed or no dictionary has
+been trained yet.
+
+Each frame records the id of its dictionary, so rows compressed with an
+older dictionary still decode after retraining. Values are decompressed
+only when read: decode_summary() in Python, or unz() in SQL.
+"""
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Union
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Compressed column -> dictionary it is compressed with
+FIELD_DICTIONARIES = {
+    "en_summary": "en",
+    "zh_summary": "zh",
+    "translations": "translations",
+}
+
+# Shorter values are stored as TEXT: a zstd frame would barely be smaller
+MIN_COMPRESS_CHARS = 64
+
+# Size of each trained dictionary
+DICTIONARY_BYTES = 64 * 1024
+
+# Values sampled per dictionary for training, and the fewest worth training on
+TRAINING_SAMPLES = 20_000
+MIN_TRAINING_SAMPLES = 500
+
+# Level 6 keeps writes well under 0.1 ms per summary
+ZSTD_LEVEL = 6
+
+# Fixed COVER parameters: searching for the best ones takes minutes for ~1% more
+COVER_SEGMENT_SIZE = 1024
+COVER_DMER_SIZE = 8
+
+_lock = threading.Lock()
+# dict_id -> ZstdCompressionDict, for every dictionary in the live database
+_dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+# dictionary name -> dict_id of the one new values are compressed with
+_active: Dict[str, int] = {}
+# zstd (de)compressors aren't thread-safe: one set per thread, dropped
+# when the dictionaries are reloaded
+_local = threading.local()
+_generation = 0
+# Database to load unknown dictionaries from (set by load_dictionaries)
+_database_file: Optional[str] = None
+
+
+def load_dictionaries(rows: List[tuple], database_file: str = None):
+    """Replace the registry with all (dict_id, name, dictionary) rows of a database
+
+    Rows come oldest first; the last per name is active. Replacing rather
+    than merging matters after a restore: new values must never be
+    compressed with a dictionary the live database doesn't have.
+    """
+    global _database_file, _generation
+    if database_file:
+        _database_file = database_file
+    if not ZSTD_AVAILABLE:
+        return
+    dictionaries, active = {}, {}
+    for dict_id, name, data in rows:
+        dictionaries[dict_id] = _dictionaries.get(dict_id) or zstandard.ZstdCompressionDict(data)
+        active[name] = dict_id
+    with _lock:
+        _dictionaries.clear()
+        _dictionaries.update(dictionaries)
+        _active.clear()
+        _active.update(active)
+        _generation += 1
+
+
+def active_dictionaries() -> Dict[str, int]:
+    return dict(_active)
+
+
+def train_dictionary(samples: List[str]) -> bytes:
+    """Train a dictionary on sample values; takes about a second, call it in a thread"""
+    trained = zstandard.train_dictionary(DICTIONARY_BYTES, [s.encode("utf-8") for s in samples],
+                                         k=COVER_SEGMENT_SIZE, d=COVER_DMER_SIZE, level=ZSTD_LEVEL)
+    return trained.as_bytes()
+
+
+def dictionary_id(data: bytes) -> int:
+    return zstandard.ZstdCompressionDict(data).dict_id()
+
+
+def _thread_cache(kind: str) -> Dict:
+    if getattr(_local, "generation", None) != _generation:
+        _local.__dict__.clear()
+        _local.generation = _generation
+    return _local.__dict__.setdefault(kind, {})
+
+
+def _compressor(dict_id: int) -> "zstandard.ZstdCompressor":
+    compressors = _thread_cache("compressors")
+    compressor = compressors.get(dict_id)
+    if compressor is None:
+        compressor = compressors[dict_id] = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL, dict_data=_dictionaries[dict_id])
+    return compressor
+
+
+def _decompressor(dict_id: int) -> "zstandard.ZstdDecompressor":
+    decompressors = _thread_cache("decompressors")
+    decompressor = decompressors.get(dict_id)
+    if decompressor is None:
+        if dict_id not in _dictionaries:
+            _load_missing(dict_id)
+        decompressor = decompressors[dict_id] = zstandard.ZstdDecompressor(
+            dict_data=_dictionaries[dict_id])
+    return decompressor
+
+
+def _load_missing(dict_id: int):
+    """Fetch a dictionary trained by another process since ours were loaded"""
+    if _database_file is None:
+        raise ValueError(f"Unknown summary dictionary {dict_id}")
+    conn = sqlite3.connect(_database_file)
+    try:
+        row = conn.execute("SELECT dictionary FROM summary_dictionaries WHERE dict_id = ?",
+                           (dict_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise ValueError(f"Unknown summary dictionary {dict_id}")
+    with _lock:
+        _dictionaries[dict_id] = zstandard.ZstdCompressionDict(row[0])
+
+
+def encode_summary(value: Optional[str], field: str) -> Union[str, bytes, None]:
+    """Value to store in a summary column: compressed when worthwhile, else unchanged"""
+    if not isinstance(value, str) or len(value) < MIN_COMPRESS_CHARS:
+        return value
+    dict_id = _active.get(FIELD_DICTIONARIES[field])
+    if dict_id is None:
+        return value
+    return _compressor(dict_id).compress(value.encode("utf-8"))
+
+
+def decode_summary(value: Union[str, bytes, None]) -> Optional[str]:
+    """Stored summary column value as text (also registered as the SQL function unz)"""
+    if not isinstance(value, bytes):
+        return value
+    if not ZSTD_AVAILABLE:
+        raise RuntimeError("Summaries are zstd-compressed; install the zstandard package to read them")
+    dict_id = zstandard.get_frame_parameters(value).dict_id
+    return _decompressor(dict_id).decompress(value).decode("utf-8")
+
+
+def decode_term(term: Dict) -> Dict:
+    """Decompress the summary fields of a term row dict in place"""
+    for field in FIELD_DICTIONARIES:
+        if isinstance(term.get(field), bytes):
+            term[field] = decode_summary(term[field])
+    return term
+
+
+def register_functions(conn: sqlite3.Connection):
+    """Make unz(value) available in SQL on a connection"""
+    conn.create_function("unz", 1, decode_summary, deterministic=True)
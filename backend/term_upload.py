@@ -0,0 +1,174 @@
+"""Streaming ingestion of uploaded term lists
+
+Uploads are copied to a temporary file and ingested in the background, so
+the request returns as soon as the file is on disk. Terms are parsed line
+by line (TXT) or row by row (CSV, first column), de-duplicated against a
+scratch SQLite file instead of an in-memory set, and appended to the task
+in chunks, one transaction each. Memory stays flat no matter how large the
+list is. While ingesting, the task is 'importing' and its total_terms and
+ingest_bytes_read grow as chunks land.
+"""
+import asyncio
+import csv
+import io
+import os
+import sqlite3
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from database import append_uploaded_terms, finish_term_upload
+
+# Upload bytes copied to disk per read
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Terms parsed, de-duplicated and inserted per transaction
+INGEST_CHUNK_TERMS = 10_000
+
+# Background ingestions running in this process, by task
+ingest_tasks: Dict[int, asyncio.Task] = {}
+
+
+async def save_upload(file, suffix: str) -> Tuple[str, int]:
+    """Copy an upload to a temporary file in chunks; returns (path, size)"""
+    fd, path = tempfile.mkstemp(prefix="terms-upload-", suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                await asyncio.to_thread(out.write, chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size
+
+
+class TermFileReader:
+    """Reads unique terms from an uploaded file in chunks
+
+    Runs in a worker thread. Terms already seen are tracked in a scratch
+    SQLite table next to the upload, so the first occurrence of each term
+    wins, as with dict.fromkeys, without holding the list in memory.
+    """
+
+    def __init__(self, path: str, is_csv: bool):
+        self.path = path
+        self.raw = open(path, "rb")
+        self.text = io.TextIOWrapper(self.raw, encoding="utf-8", newline="" if is_csv else None)
+        self.rows = csv.reader(self.text) if is_csv else None
+        self.seen_path = path + ".seen.db"
+        try:
+            self.seen = sqlite3.connect(self.seen_path, check_same_thread=False)
+            self.seen.execute("PRAGMA journal_mode=OFF")
+            self.seen.execute("PRAGMA synchronous=OFF")
+            self.seen.execute("CREATE TABLE IF NOT EXISTS seen (term TEXT PRIMARY KEY) WITHOUT ROWID")
+        except BaseException:
+            self.text.close()
+            raise
+        self.duplicates = 0
+
+    def _next_term(self) -> Optional[str]:
+        """Next non-empty term, or None at the end of the file"""
+        if self.rows is not None:
+            for row in self.rows:
+                if row and row[0].strip():
+                    return row[0].strip()
+            return None
+        for line in self.text:
+            if line.strip():
+                return line.strip()
+        return None
+
+    def next_chunk(self, size: int = INGEST_CHUNK_TERMS) -> Tuple[List[str], int]:
+        """Up to size new unique terms and the bytes read so far; [] at the end"""
+        terms = []
+        cursor = self.seen.cursor()
+        while len(terms) < size:
+            term = self._next_term()
+            if term is None:
+                break
+            cursor.execute("INSERT OR IGNORE INTO seen (term) VALUES (?)", (term,))
+            if cursor.rowcount:
+                terms.append(term)
+            else:
+                self.duplicates += 1
+        self.seen.commit()
+        return terms, self.raw.tell()
+
+    def close(self):
+        self.text.close()
+        self.seen.close()
+        remove_upload_files(self.path)
+
+
+def remove_upload_files(path: str):
+    """Delete an upload and its scratch de-duplication database"""
+    for file_path in (path, path + ".seen.db"):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+async def ingest_upload(task_id: int, path: str, is_csv: bool, autostart: bool = False, crawl_interval: int = 3):
+    """Append the terms of an uploaded file to an 'importing' task
+
+    The task becomes 'pending' when done (and starts crawling if autostart),
+    or 'failed' with ingest_error set. Ingestion stops early if the task is
+    cancelled or deleted meanwhile.
+    """
+    reader = None
+    total = 0
+    try:
+        reader = await asyncio.to_thread(TermFileReader, path, is_csv)
+        while True:
+            terms, bytes_read = await asyncio.to_thread(reader.next_chunk)
+            if not terms:
+                break
+            if not await append_uploaded_terms(task_id, terms, bytes_read):
+                print(f"✗ Upload for task {task_id} stopped: task is no longer importing")
+                return
+            total += len(terms)
+
+        if total == 0:
+            await finish_term_upload(task_id, "No valid terms found in file")
+        else:
+            await finish_term_upload(task_id)
+            print(f"✓ Task {task_id}: ingested {total} terms ({reader.duplicates} duplicates skipped)")
+            if autostart:
+                from scheduler import start_batch_crawl
+                await start_batch_crawl(task_id, crawl_interval)
+    except asyncio.CancelledError:
+        await finish_term_upload(task_id, "Upload ingestion was interrupted")
+        raise
+    except Exception as e:
+        error = f"Error processing file: {e}"
+        if isinstance(e, UnicodeDecodeError):
+            error = "Error processing file: not valid UTF-8 text"
+        print(f"✗ Task {task_id}: {error}")
+        await finish_term_upload(task_id, error)
+    finally:
+        if reader is not None:
+            await asyncio.to_thread(reader.close)
+        else:
+            # The reader was never created (or its creation was cancelled)
+            remove_upload_files(path)
+        ingest_tasks.pop(task_id, None)
+
+
+def start_ingest(task_id: int, path: str, is_csv: bool, autostart: bool = False, crawl_interval: int = 3) -> asyncio.Task:
+    """Ingest an upload in the background"""
+    task = asyncio.create_task(ingest_upload(task_id, path, is_csv, autostart, crawl_interval))
+    ingest_tasks[task_id] = task
+    return task
+
+
+async def shutdown_ingests():
+    """Stop running ingestions; their tasks are marked failed"""
+    for task in list(ingest_tasks.values()):
+        task.cancel()
+    if ingest_tasks:
+        await asyncio.gather(*list(ingest_tasks.values()), return_exceptions=True)
@@ -0,0 +1,16 @@
+from minhash import cluster_duplicates
+
+
+def test_cluster_keeps_oldest_term():
+    assert cluster_duplicates([(2, 5, 0.9), (2, 3, 0.95)]) == {3: (2, 0.95), 5: (2, 0.9)}
+
+
+def test_cluster_does_not_chain_through_intermediate_terms():
+    # 1 and 4 were never compared, so 4 must not be reported as a duplicate of 1
+    duplicates = cluster_duplicates([(1, 2, 0.85), (2, 3, 0.85), (3, 4, 0.85)])
+    assert duplicates == {2: (1, 0.85), 4: (3, 0.85)}
+
+
+def test_cluster_reports_similarity_to_kept_term():
+    duplicates = cluster_duplicates([(1, 2, 0.8), (1, 3, 0.82), (2, 3, 0.99)])
+    assert duplicates == {2: (1, 0.8), 3: (1, 0.82)}
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+# AIMD concurrency bounds per host
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+INITIAL_CONCURRENCY = 2
+ADDITIVE_INCREASE = 1
+MULTIPLICATIVE_DECREASE = 0.5
+
+# Requests slower than this count as a congestion signal
+LATENCY_TARGET = 2.0
+
+# Circuit breaker: open after this many consecutive failures, probe after the cooldown
+FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+# Used when a throttling response carries no usable Retry-After
+DEFAULT_RETRY_AFTER = 5.0
+
+
+class HostThrottle:
+    """Adaptive concurrency controller and circuit breaker for one host
+
+    The number of concurrent requests grows by ADDITIVE_INCREASE after each
+    window of `limit` healthy responses and is cut by MULTIPLICATIVE_DECREASE
+    on throttling (429/503/maxlag) or slow responses. Throttling also pauses
+    the host for the server's Retry-After. After FAILURE_THRESHOLD consecutive
+    failures the breaker opens: no requests go out until BREAKER_COOLDOWN has
+    passed, then a single probe decides whether to close it again.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.limit = float(INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.state = "closed"  # closed | open | half_open
+        self.consecutive_failures = 0
+        self.paused_until = 0.0
+        self.stats = {"success": 0, "throttled": 0, "errors": 0}
+
+        self._healthy_in_window = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._changed = asyncio.Condition()
+
+    def _admission_delay(self) -> Optional[float]:
+        """Seconds to wait before a new request may start, or None if it may start now"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.state == "open":
+            remaining = self._opened_at + BREAKER_COOLDOWN - now
+            if remaining > 0:
+                return remaining
+            self.state = "half_open"
+        if self.state == "half_open":
+            return None if not self._probe_in_flight else 1.0
+        if self.in_flight >= int(self.limit):
+            # Woken by the condition when a slot frees up
+            return 1.0
+        return None
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrent request slot for this host"""
+        async with self._changed:
+            while True:
+                delay = self._admission_delay()
+                if delay is None:
+                    break
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+            if self.state == "half_open":
+                self._probe_in_flight = True
+        try:
+            yield self
+        finally:
+            async with self._changed:
+                self.in_flight -= 1
+                self._probe_in_flight = False
+                self._changed.notify_all()
+
+    def record_success(self, latency: float):
+        self.stats["success"] += 1
+        self.consecutive_failures = 0
+        if self.state != "closed":
+            self.state = "closed"
+
+        if latency > LATENCY_TARGET:
+            self._decrease()
+            return
+
+        self._healthy_in_window += 1
+        if self._healthy_in_window >= int(self.limit):
+            self.limit = min(MAX_CONCURRENCY, self.limit + ADDITIVE_INCREASE)
+            self._healthy_in_window = 0
+
+    def record_throttled(self, retry_after: float = None):
+        """429/503/maxlag: back off multiplicatively and honor Retry-After"""
+        self.stats["throttled"] += 1
+        self._decrease()
+        pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        self._record_failure()
+
+    def record_error(self):
+        """Timeouts, connection errors and other 5xx responses"""
+        self.stats["errors"] += 1
+        self._decrease()
+        self._record_failure()
+
+    def _decrease(self):
+        self.limit = max(MIN_CONCURRENCY, self.limit * MULTIPLICATIVE_DECREASE)
+        self._healthy_in_window = 0
+
+    def _record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= FAILURE_THRESHOLD:
+            if self.state != "open":
+                print(f"✗ Circuit opened for {self.host} after {self.consecutive_failures} failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        return {
+            "host": self.host,
+            "concurrency_limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1),
+            **self.stats
+        }
+
+
+_throttles: Dict[str, HostThrottle] = {}
+
+
+def get_host_throttle(host: str) -> HostThrottle:
+    if host not in _throttles:
+        _throttles[host] = HostThrottle(host)
+    return _throttles[host]
+
+
+def get_throttle_status() -> list:
+    return [throttle.snapshot() for throttle in _throttles.values()]
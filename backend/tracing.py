@@ -0,0 +1,180 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Share of crawled terms that get a trace (0 disables tracing)
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.01"))
+
+# Finished traces kept in memory for /api/debug/traces
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", "1000"))
+
+# Optional JSON Lines file every finished trace is appended to
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+
+# Spans kept per trace; a term with thousands of SQL statements stays bounded
+MAX_SPANS_PER_TRACE = 500
+
+# SQL and other long attributes are cut to this many characters
+MAX_ATTRIBUTE_CHARS = 300
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "started", "duration", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[int], attributes: Dict):
+        self.trace = trace
+        self.span_id = len(trace.spans)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.started - self.trace.started) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "error": self.error,
+            "attributes": {k: _attribute(v) for k, v in self.attributes.items()},
+        }
+
+
+class Trace:
+    def __init__(self, name: str, attributes: Dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root = self.add_span(name, None, attributes)
+
+    def add_span(self, name: str, parent_id: Optional[int], attributes: Dict) -> Optional[Span]:
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped += 1
+            return None
+        span = Span(self, name, parent_id, attributes)
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> Dict:
+        root = self.root
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "task_id": root.attributes.get("task_id"),
+            "term": root.attributes.get("term"),
+            "started_at": self.started_at,
+            "duration_ms": round(root.duration * 1000, 2) if root.duration is not None else None,
+            "error": root.error,
+            "dropped_spans": self.dropped,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+def _attribute(value):
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    value = str(value)
+    return value if len(value) <= MAX_ATTRIBUTE_CHARS else value[:MAX_ATTRIBUTE_CHARS] + "..."
+
+
+# Span currently open in this asyncio task (None outside sampled traces)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+_traces: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+_file_lock = threading.Lock()
+
+
+@contextmanager
+def start_trace(name: str, sample_rate: float = None, **attributes):
+    """Start a trace for one unit of work (a crawled term), if it is sampled
+
+    Yields the root span, or None when the work isn't sampled; spans opened
+    inside an unsampled trace cost a context variable lookup.
+    """
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or random.random() >= rate:
+        token = _current_span.set(None)
+        try:
+            yield None
+        finally:
+            _current_span.reset(token)
+        return
+
+    trace = Trace(name, attributes)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace.root
+    except BaseException as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.root.duration = time.perf_counter() - trace.root.started
+        _finish(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Open a child span of the current span; a no-op outside sampled traces"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.trace.add_span(name, parent.span_id, attributes)
+    if child is None:
+        yield None
+        return
+
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        child.duration = time.perf_counter() - child.started
+
+
+def tracing_active() -> bool:
+    """Whether the current code runs inside a sampled trace"""
+    return _current_span.get() is not None
+
+
+def _finish(trace: Trace):
+    data = trace.to_dict()
+    _traces.append(data)
+    if TRACE_FILE:
+        try:
+            with _file_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(data, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"✗ Error writing trace: {e}")
+
+
+def get_traces(task_id: int = None, min_duration_ms: float = None, slowest: bool = False,
+               limit: int = 50) -> List[Dict]:
+    """Finished traces from the ring buffer, newest (or slowest) first"""
+    traces = [t for t in reversed(_traces)
+              if (task_id is None or t["task_id"] == task_id)
+              and (min_duration_ms is None or (t["duration_ms"] or 0) >= min_duration_ms)]
+    if slowest:
+        traces.sort(key=lambda t: t["duration_ms"] or 0, reverse=True)
+    return traces[:limit]
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+from urllib.parse import urlencode
+
+import httpx
+
+from metrics import CACHE_REQUESTS
+
+# 'off': talk to Wikipedia directly
+# 'record': talk to Wikipedia and store every successful response in the archive
+# 'replay': serve every request from the archive, with no network access
+ARCHIVE_MODES = ('off', 'record', 'replay')
+ARCHIVE_MODE = os.environ.get("WIKI_ARCHIVE_MODE", "off")
+ARCHIVE_FILE = os.environ.get("WIKI_ARCHIVE", "wiki_archive.db")
+
+# Parameters that don't change the response and are left out of the key
+IGNORED_PARAMS = {"maxlag"}
+
+# Response headers kept in the archive
+KEPT_HEADERS = ("content-type",)
+
+
+def request_key(request: httpx.Request) -> str:
+    """Stable key for a request: host, path and sorted query parameters"""
+    params = sorted((k, v) for k, v in request.url.params.multi_items() if k not in IGNORED_PARAMS)
+    raw = f"{request.method} {request.url.host}{request.url.path}?{urlencode(params)}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseArchive:
+    """Upstream responses stored zlib-compressed in a SQLite file, keyed by request"""
+
+    def __init__(self, path: str = ARCHIVE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                content_type TEXT,
+                body BLOB NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+        self.stats = {"recorded": 0, "replayed": 0, "missing": 0}
+
+    def get(self, key: str) -> Optional[tuple]:
+        """(status, content_type, body) of an archived response, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, content_type, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], zlib.decompress(row[2])
+
+    def put(self, key: str, url: str, status: int, content_type: str, body: bytes):
+        with self._lock:
+            self._db.execute("""
+                INSERT OR REPLACE INTO responses (key, url, status, content_type, body, recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, url, status, content_type, zlib.compress(body, 6), time.time()))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards requests upstream and archives every 200 response"""
+
+    def __init__(self, archive: ResponseArchive, inner: httpx.AsyncBaseTransport = None):
+        self.archive = archive
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+
+        # The body is already decoded: drop encoding and framing headers
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+        if response.status_code == 200:
+            await asyncio.to_thread(
+                self.archive.put, request_key(request), str(request.url),
+                response.status_code, response.headers.get("content-type"), body
+            )
+            self.archive.stats["recorded"] += 1
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves requests from the archive; requests never recorded get a 404"""
+
+    def __init__(self, archive: ResponseArchive):
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        archived = await asyncio.to_thread(self.archive.get, request_key(request))
+        if archived is None:
+            self.archive.stats["missing"] += 1
+            CACHE_REQUESTS.inc(cache="wiki_archive", result="miss")
+            return httpx.Response(404, text=f"Not in archive: {request.url}", request=request)
+
+        status, content_type, body = archived
+        self.archive.stats["replayed"] += 1
+        CACHE_REQUESTS.inc(cache="wiki_archive", result="hit")
+        headers = {"content-type": content_type} if content_type else {}
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+
+_archive: Optional[ResponseArchive] = None
+
+
+def get_wiki_transport(mode: str = None) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for the configured archive mode (None means httpx's default)"""
+    global _archive
+    mode = mode or ARCHIVE_MODE
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"WIKI_ARCHIVE_MODE must be one of {', '.join(ARCHIVE_MODES)}")
+    if mode == 'off':
+        return None
+
+    if _archive is None:
+        _archive = ResponseArchive()
+        print(f"✓ Wikipedia responses: {mode} ({ARCHIVE_FILE})")
+    if mode == 'record':
+        return RecordingTransport(_archive)
+    return ReplayTransport(_archive)
+
+
+def close_wiki_archive():
+    global _archive
+    if _archive is not None:
+        print(f"✓ Archive closed: {_archive.stats}")
+        _archive.close()
+        _archive = None
@@ -0,0 +1,286 @@
+import os
+import time
+from contextlib import aclosing, nullcontext
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from metrics import HTTP_RESPONSES, HTTP_SECONDS
+from tracing import span
+from rate_limiter import HostRateLimiter, get_rate_limiter
+from throttle import get_host_throttle
+from wiki_archive import ARCHIVE_MODE, get_wiki_transport, close_wiki_archive
+
+# MediaWiki Action API endpoint per language; overridable to point at a mirror
+API_URL_TEMPLATE = os.environ.get("WIKI_API_URL", "https://{lang}.wikipedia.org/w/api.php")
+
+DEFAULT_USER_AGENT = 'TermCorpusBot/1.0 (Educational Project; mailto:your-email@example.com)'
+
+REQUEST_TIMEOUT = 30.0
+
+# Summaries are cut to this many characters (plus "...")
+SUMMARY_MAX_CHARS = 1000
+
+# Largest character limit the TextExtracts API accepts (exchars)
+INTRO_MAX_CHARS = 1200
+
+# Ask the servers to refuse requests while database replication lag exceeds
+# this many seconds, as recommended for bots
+MAXLAG = 5
+
+# Throttling responses retried per request before giving up
+THROTTLE_RETRIES = 3
+
+
+class WikiThrottledError(Exception):
+    """A host kept answering 429/503/maxlag after all retries"""
+
+    def __init__(self, host: str, retry_after: float = None):
+        self.host = host
+        self.retry_after = retry_after
+        hint = f" (retry after {retry_after:.0f}s)" if retry_after is not None else ""
+        super().__init__(f"{host} is throttling requests{hint}")
+
+
+class WikiPageNotFoundError(Exception):
+    """The requested page doesn't exist; retrying won't help"""
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed fetch is worth retrying later
+
+    Timeouts, connection errors, 5xx responses and throttling are transient;
+    missing pages, 4xx responses and API errors are permanent.
+    """
+    if isinstance(error, (WikiThrottledError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code in (408, 429)
+    return False
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def truncate_summary(summary: str, max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    return summary[0:max_chars] + "..." if len(summary) > max_chars else summary
+
+
+def lead_section(extract: str) -> str:
+    """Text before the first section heading of a plain-text extract"""
+    cut = extract.find("\n\n==")
+    if cut == -1:
+        cut = extract.find("\n==")
+    return (extract if cut == -1 else extract[:cut]).strip()
+
+
+class WikiClient:
+    """Async client for the MediaWiki Action API
+
+    Every request goes through the shared per-host rate limiter, so all tasks
+    in the process together stay within the allowed request rate of each
+    language host, and through the host's adaptive throttle (throttle.py),
+    which sizes concurrency to what the host currently sustains. In record
+    and replay mode the transport comes from wiki_archive.py.
+    """
+
+    def __init__(self, user_agent: str = None, limiter: HostRateLimiter = None):
+        self.user_agent = user_agent or DEFAULT_USER_AGENT
+        self.limiter = limiter or get_rate_limiter()
+        # Replayed responses come from the local archive: no pacing needed
+        self.offline = ARCHIVE_MODE == 'replay'
+        self.http = httpx.AsyncClient(
+            headers={"User-Agent": self.user_agent},
+            timeout=REQUEST_TIMEOUT,
+            follow_redirects=True,
+            transport=get_wiki_transport()
+        )
+
+    @staticmethod
+    def api_url(lang: str) -> str:
+        return API_URL_TEMPLATE.format(lang=lang)
+
+    async def api_get(self, lang: str, params: Dict, priority: int = 0) -> Dict:
+        """Send one API request through the host's throttle and rate limiter
+
+        Throttling responses (429, 503 or a maxlag error) shrink the host's
+        concurrency, pause it for the Retry-After and are retried up to
+        THROTTLE_RETRIES times before WikiThrottledError is raised.
+        """
+        url = self.api_url(lang)
+        host = urlparse(url).netloc
+        throttle = get_host_throttle(host)
+        query = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "maxlag": str(MAXLAG),
+            **params
+        }
+
+        retry_after = None
+        for attempt in range(THROTTLE_RETRIES + 1):
+            with span("http", host=host, prop=params.get("prop", ""), title=params.get("titles", ""),
+                      attempt=attempt + 1) as request_span:
+                waited = time.monotonic()
+                async with (throttle.slot() if not self.offline else nullcontext()):
+                    if not self.offline:
+                        await self.limiter.acquire(host, priority)
+
+                    started = time.monotonic()
+                    if request_span:
+                        # Time spent waiting for a concurrency slot and a rate limiter token
+                        request_span.set(wait_ms=round((started - waited) * 1000, 2))
+
+                    try:
+                        response = await self.http.get(url, params=query)
+                    except httpx.TransportError:
+                        throttle.record_error()
+                        HTTP_RESPONSES.inc(host=host, code="error")
+                        raise
+                    latency = time.monotonic() - started
+                    HTTP_RESPONSES.inc(host=host, code=response.status_code)
+                    HTTP_SECONDS.observe(latency, host=host)
+                    if request_span:
+                        request_span.set(status=response.status_code)
+
+                    if response.status_code in (429, 503):
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        throttle.record_throttled(retry_after)
+                        continue
+                    if response.status_code >= 500:
+                        throttle.record_error()
+                    response.raise_for_status()
+
+                    data = response.json()
+                    error = data.get("error")
+                    if error and error.get("code") == "maxlag":
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        throttle.record_throttled(retry_after)
+                        continue
+
+                    throttle.record_success(latency)
+                    if error:
+                        raise Exception(f"MediaWiki API error ({lang}): {error.get('info', error)}")
+                    return data
+
+        raise WikiThrottledError(host, retry_after)
+
+    async def query_pages(self, lang: str, params: Dict, priority: int = 0):
+        """Run a prop query, following continuations; yields each response's first page"""
+        params = dict(params)
+        while True:
+            data = await self.api_get(lang, params, priority)
+            pages = data.get("query", {}).get("pages", [])
+            if pages:
+                yield pages[0]
+            if "continue" not in data:
+                return
+            params.update(data["continue"])
+
+    async def fetch_page(self, lang: str, title: str, priority: int = 0,
+                         intro_chars: int = None) -> Optional[Dict]:
+        """Fetch a page's summary, URL and language links
+
+        Returns None if the page doesn't exist, otherwise a dict with
+        'title', 'summary' (lead section, untruncated), 'url' and
+        'langlinks' ({lang: title}).
+
+        With intro_chars, only the lead section is requested and the server
+        cuts it to about that many characters (at a sentence or word
+        boundary), instead of sending the extract of the whole page.
+        """
+        params = {
+            "prop": "extracts|info|langlinks",
+            "titles": title,
+            "redirects": "1",
+            "explaintext": "1",
+            "exsectionformat": "wiki",
+            "inprop": "url",
+            "lllimit": "max",
+        }
+        if intro_chars:
+            params["exintro"] = "1"
+            params["exchars"] = str(min(intro_chars, INTRO_MAX_CHARS))
+        page = None
+        async for part in self.query_pages(lang, params, priority):
+            if part.get("missing") or part.get("invalid"):
+                return None
+            if page is None:
+                page = {
+                    "title": part["title"],
+                    "summary": "",
+                    "url": part.get("fullurl", ""),
+                    "langlinks": {}
+                }
+            if "extract" in part:
+                page["summary"] = lead_section(part["extract"])
+            if "fullurl" in part:
+                page["url"] = part["fullurl"]
+            for link in part.get("langlinks", []):
+                page["langlinks"][link["lang"]] = link["title"]
+        return page
+
+    async def fetch_categories(self, lang: str, title: str, priority: int = 0) -> List[str]:
+        """Fetch all category titles of a page"""
+        categories = []
+        async for part in self.query_pages(lang, {
+            "prop": "categories",
+            "titles": title,
+            "cllimit": "max",
+        }, priority):
+            categories.extend(c["title"] for c in part.get("categories", []))
+        return categories
+
+    async def fetch_links(self, lang: str, title: str, priority: int = 0, limit: int = None) -> List[str]:
+        """Fetch outgoing article (namespace 0) link titles of a page
+
+        With a limit, at most that many are requested and no continuation is
+        followed once they have arrived; otherwise all links are fetched.
+        """
+        links = []
+        async with aclosing(self.query_pages(lang, {
+            "prop": "links",
+            "titles": title,
+            "plnamespace": "0",
+            "pllimit": str(limit) if limit else "max",
+        }, priority)) as parts:
+            async for part in parts:
+                links.extend(link["title"] for link in part.get("links", []))
+                if limit and len(links) >= limit:
+                    return links[:limit]
+        return links
+
+    async def close(self):
+        await self.http.aclose()
+
+
+# Clients shared per User-Agent so connections are pooled across tasks
+_clients: Dict[str, WikiClient] = {}
+
+
+def get_wiki_client(user_agent: str = None) -> WikiClient:
+    user_agent = user_agent or DEFAULT_USER_AGENT
+    if user_agent not in _clients:
+        _clients[user_agent] = WikiClient(user_agent)
+    return _clients[user_agent]
+
+
+async def close_wiki_clients():
+    for client in list(_clients.values()):
+        await client.close()
+    _clients.clear()
+    close_wiki_archive()
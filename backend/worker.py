@@ -0,0 +1,152 @@
+"""Standalone crawl worker
+
+Claims pending terms of running tasks from the shared `terms` table and
+crawls them outside the API process. Run any number of these next to the API
+started with CRAWL_MODE=external:
+
+    CRAWL_MODE=external python -m uvicorn main:app --port 8000
+    python worker.py --batch-size 10 --metrics-port 9100
+
+All processes must point at the same database file (CORPUS_DB).
+"""
+import argparse
+import asyncio
+import signal
+
+from database import (
+    init_database,
+    claim_terms,
+    heartbeat_terms,
+    release_terms,
+    reclaim_expired_leases,
+    complete_task_if_done,
+    get_task_status,
+    get_system_setting
+)
+from scheduler import BatchCrawler, WORKER_ID, LEASE_SECONDS, HEARTBEAT_INTERVAL, TERM_CONCURRENCY
+from markdown_writer import close_markdown_writer
+from zh_convert import close_zh_converter
+from wiki_client import close_wiki_clients
+from metrics import serve_metrics
+
+
+class CrawlWorker:
+    def __init__(self, batch_size: int = 10, poll_interval: float = 5.0, metrics_port: int = None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.metrics_port = metrics_port
+        self.should_stop = False
+
+    async def heartbeat(self):
+        """Keep the leases of claimed terms alive"""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await heartbeat_terms(WORKER_ID, LEASE_SECONDS)
+            except Exception as e:
+                print(f"✗ Heartbeat failed: {str(e)}")
+
+    async def get_crawler(self, task_id: int, crawlers: dict):
+        """Get a crawler configured for the task (cached for one batch)
+
+        Terms are crawled concurrently, so the cache holds futures: the first
+        term of a task creates its crawler and the others wait for it.
+        """
+        if task_id not in crawlers:
+            crawlers[task_id] = asyncio.ensure_future(self.create_crawler(task_id))
+        return await crawlers[task_id]
+
+    async def create_crawler(self, task_id: int) -> BatchCrawler:
+        user_agent = await get_system_setting('user_agent')
+        task_info = await get_task_status(task_id)
+        crawler = BatchCrawler(task_id, task_info['crawl_interval'], user_agent=user_agent)
+        await crawler.load_task_config()
+        return crawler
+
+    async def run_batch(self) -> int:
+        """Claim and crawl one batch of terms; returns the number claimed"""
+        claimed_terms = await claim_terms(None, WORKER_ID, self.batch_size, LEASE_SECONDS)
+        crawlers = {}
+        touched_tasks = set()
+
+        slots = asyncio.Semaphore(TERM_CONCURRENCY)
+
+        async def crawl(term_record):
+            async with slots:
+                if self.should_stop:
+                    return
+
+                task_id = term_record['task_id']
+                # Skip terms of tasks cancelled after the claim; they're released below
+                task_info = await get_task_status(task_id)
+                if not task_info or task_info['status'] != 'running':
+                    return
+
+                crawler = await self.get_crawler(task_id, crawlers)
+                await crawler.process_term(term_record)
+                touched_tasks.add(task_id)
+
+        try:
+            # Crawled concurrently; the per-host throttle bounds the requests in flight
+            await asyncio.gather(*(crawl(term_record) for term_record in claimed_terms))
+        finally:
+            # Anything claimed but not crawled goes back to the queue
+            await release_terms(WORKER_ID)
+
+        for task_id in touched_tasks:
+            if await complete_task_if_done(task_id):
+                print(f"✓ Task {task_id} completed successfully")
+
+        return len(claimed_terms)
+
+    async def run(self):
+        await init_database()
+        print(f"✓ Worker {WORKER_ID} started")
+
+        # The API's /metrics only covers its own process
+        metrics_server = await serve_metrics(self.metrics_port) if self.metrics_port else None
+        heartbeat = asyncio.create_task(self.heartbeat())
+        try:
+            while not self.should_stop:
+                # Any worker may reclaim terms abandoned by a crashed one
+                await reclaim_expired_leases()
+
+                if not await self.run_batch():
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            heartbeat.cancel()
+            if metrics_server:
+                metrics_server.close()
+            await release_terms(WORKER_ID)
+            await close_markdown_writer()
+            close_zh_converter()
+            await close_wiki_clients()
+            print(f"✓ Worker {WORKER_ID} stopped")
+
+    def stop(self):
+        """Finish the current term and exit"""
+        self.should_stop = True
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Standalone Wikipedia crawl worker")
+    parser.add_argument("--batch-size", type=int, default=10, help="Terms claimed per batch")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds to wait when the queue is empty")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port")
+    args = parser.parse_args()
+
+    worker = CrawlWorker(args.batch_size, args.poll_interval, args.metrics_port)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+
+    await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
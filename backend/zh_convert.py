@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from metrics import CACHE_REQUESTS
+
+# Target language code -> zhconv locale
+ZH_VARIANTS = {
+    'zh': 'zh-cn',     # Simplified Chinese
+    'zh-tw': 'zh-tw',  # Traditional Chinese
+}
+
+try:
+    import zhconv  # noqa: F401
+    ZHCONV_AVAILABLE = True
+except ImportError:
+    ZHCONV_AVAILABLE = False
+
+
+def _convert_batch(items: List[tuple]) -> List[str]:
+    """Convert a batch of (text, locale) pairs; runs in a worker process"""
+    import zhconv
+    return [zhconv.convert(text, locale) for text, locale in items]
+
+
+class ZhConverter:
+    """Chinese script conversion off the event loop
+
+    zhconv is pure-Python and CPU-bound, so conversions are collected for a few
+    milliseconds and sent to a process pool in one batch. Results are memoized
+    by (content hash, locale), and identical in-flight requests share a future.
+    """
+
+    def __init__(self, max_workers: int = 2, batch_size: int = 64,
+                 batch_delay: float = 0.01, cache_size: int = 10000):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.cache_size = cache_size
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._pending: List[tuple] = []  # (key, text, locale)
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def convert(self, text: str, locales: List[str]) -> Dict[str, str]:
+        """Convert one text to several locales, returning {locale: converted}"""
+        if not text or not ZHCONV_AVAILABLE:
+            return {locale: text for locale in locales}
+
+        content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        results = {}
+        waiting = {}
+        for locale in locales:
+            key = (content_hash, locale)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                results[locale] = self._cache[key]
+                CACHE_REQUESTS.inc(cache="zh_convert", result="hit")
+            else:
+                waiting[locale] = self._enqueue(key, text, locale)
+                CACHE_REQUESTS.inc(cache="zh_convert", result="miss")
+
+        for locale, future in waiting.items():
+            results[locale] = await future
+        return results
+
+    async def convert_many(self, texts: List[str], locales: List[str]) -> List[Dict[str, str]]:
+        """Convert many texts to several locales at once, for bulk imports
+
+        Cache misses go to the pool directly, split evenly across its
+        workers, instead of a round trip per text.
+        """
+        if not ZHCONV_AVAILABLE:
+            return [{locale: text for locale in locales} for text in texts]
+
+        keys = [hashlib.sha1(text.encode("utf-8")).hexdigest() if text else None for text in texts]
+        found, missing = {}, {}
+        for text, content_hash in zip(texts, keys):
+            for locale in locales if content_hash else ():
+                key = (content_hash, locale)
+                if key in found or key in missing:
+                    continue
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+                    CACHE_REQUESTS.inc(cache="zh_convert", result="hit")
+                else:
+                    missing[key] = (text, locale)
+                    CACHE_REQUESTS.inc(cache="zh_convert", result="miss")
+
+        if missing:
+            items = list(missing.items())
+            size = max(self.batch_size, -(-len(items) // self.max_workers))
+            chunks = [items[i:i + size] for i in range(0, len(items), size)]
+            pool = None
+            try:
+                submitted = [self._submit([item for _, item in chunk]) for chunk in chunks]
+                pool = self._pool
+                results = await asyncio.gather(*submitted)
+            except BrokenProcessPool:
+                self._reset_pool(pool)
+                raise
+            for chunk, result in zip(chunks, results):
+                for (key, _), value in zip(chunk, result):
+                    found[key] = value
+                    self._cache[key] = value
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        batch = []
+        for text, content_hash in zip(texts, keys):
+            if not content_hash:
+                batch.append({locale: text for locale in locales})
+                continue
+            batch.append({locale: found[(content_hash, locale)] for locale in locales})
+        return batch
+
+    def _enqueue(self, key: tuple, text: str, locale: str) -> asyncio.Future:
+        if key in self._inflight:
+            return self._inflight[key]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        self._pending.append((key, text, locale))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        try:
+            pool_future = self._submit([(text, locale) for _, text, locale in batch])
+        except BrokenProcessPool as e:
+            self._fail(batch, e)
+            return
+        pool = self._pool
+        pool_future.add_done_callback(lambda f: self._resolve(batch, f, pool))
+
+    def _submit(self, items: List[tuple]) -> asyncio.Future:
+        """Send a batch to the pool, replacing the pool once if a worker died"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            try:
+                return loop.run_in_executor(self._pool, _convert_batch, items)
+            except BrokenProcessPool:
+                self._reset_pool()
+                if attempt:
+                    raise
+
+    def _reset_pool(self, pool: Optional[ProcessPoolExecutor] = None):
+        """Drop a pool whose worker died; the next batch starts a fresh one
+
+        With pool given, only that pool is dropped, not one that already replaced it.
+        """
+        if self._pool is not None and pool in (None, self._pool):
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _fail(self, batch: List[tuple], error: Optional[BaseException]):
+        """Fail (or, without an error, cancel) every waiter of a batch"""
+        for key, _, _ in batch:
+            future = self._inflight.pop(key, None)
+            if future is not None and not future.done():
+                if error is None:
+                    future.cancel()
+                else:
+                    future.set_exception(error)
+
+    def _resolve(self, batch: List[tuple], pool_future: asyncio.Future, pool: ProcessPoolExecutor):
+        if pool_future.cancelled():
+            self._fail(batch, None)
+            return
+        error = pool_future.exception()
+        if error is not None:
+            if isinstance(error, BrokenProcessPool):
+                self._reset_pool(pool)
+            self._fail(batch, error)
+            return
+        converted = pool_future.result()
+
+        for i, (key, text, _) in enumerate(batch):
+            future = self._inflight.pop(key, None)
+            self._cache[key] = converted[i]
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            if future is not None and not future.done():
+                future.set_result(converted[i])
+
+    def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._reset_pool()
+        # Batches cancelled by the shutdown resolve through _resolve; these never left
+        self._fail(self._pending, None)
+        self._pending = []
+
+
+# Process-wide converter shared by all crawlers
+_converter: Optional[ZhConverter] = None
+
+
+def get_zh_converter() -> ZhConverter:
+    global _converter
+    if _converter is None:
+        _converter = ZhConverter()
+    return _converter
+
+
+def close_zh_converter():
+    global _converter
+    if _converter is not None:
+        _converter.close()
+        _converter = None